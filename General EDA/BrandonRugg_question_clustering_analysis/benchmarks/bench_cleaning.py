@@ -0,0 +1,70 @@
+"""
+Benchmark the batch cleaner (clean_series) against the per-row .apply path.
+
+Usage:
+    python bench_cleaning.py                      # synthetic WeFarm-like corpus (synthetic_corpus.py)
+    python bench_cleaning.py --parquet PATH       # question_content from a parquet file
+    python bench_cleaning.py --rows 500000 --repeat 3
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'src'))
+from cleaning import minimal_clean, strip_prefixes, clean_text, clean_series
+from synthetic_corpus import generate_corpus
+
+APPLY_FUNCTIONS = {
+    "minimal": minimal_clean,
+    "prefixes": strip_prefixes,
+    "full": clean_text,
+}
+
+
+def load_texts(parquet_path, rows, seed=42):
+    if parquet_path:
+        import duckdb
+        return duckdb.execute(
+            "SELECT question_content FROM read_parquet(?) "
+            "WHERE question_content IS NOT NULL LIMIT ?",
+            [parquet_path, rows]
+        ).df()["question_content"]
+
+    # One row per response, so questions repeat as in the full dataset
+    return generate_corpus(rows, seed=seed)[0]["question_content"]
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--parquet", default=None, help="Parquet file with a question_content column")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = load_texts(args.parquet, args.rows)
+    n = len(texts)
+    print(f"{n:,} rows, {texts.nunique():,} distinct")
+    print(f"{'mode':<10}{'apply rows/s':>16}{'batch rows/s':>16}{'speedup':>10}")
+
+    for mode, func in APPLY_FUNCTIONS.items():
+        expected = texts.apply(func)
+        if not expected.equals(clean_series(texts, mode)):
+            raise AssertionError(f"clean_series(mode='{mode}') output differs from .apply({func.__name__})")
+
+        t_apply = best_time(lambda: texts.apply(func), args.repeat)
+        t_batch = best_time(lambda: clean_series(texts, mode), args.repeat)
+        print(f"{mode:<10}{n / t_apply:>16,.0f}{n / t_batch:>16,.0f}{t_apply / t_batch:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
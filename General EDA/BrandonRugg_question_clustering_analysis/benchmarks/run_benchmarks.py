@@ -0,0 +1,303 @@
+"""
+Benchmark the pipeline on a synthetic WeFarm-like corpus and record the results per git revision.
+
+Usage:
+    python run_benchmarks.py                                   # 10k and 100k rows, every suite
+    python run_benchmarks.py --scales 10k,100k,1m --suites cleaning,load
+    python run_benchmarks.py --compare                          # also compare with the previous revision
+
+Suites (run in this order; later ones reuse the clustering output):
+    cleaning   clean_text / minimal_clean, per-row .apply and clean_series
+    tokenize   preprocess_series (clean -> tokenize -> lemmatize, needs WordNet)
+    cluster    cluster_with_umap_hdbscan on synthetic embeddings of the distinct questions, then
+               build_knn_graph on the same memory-mapped matrix and a clustering that reuses the graph
+    recluster  recluster_noise and one round of recluster_noise_rounds on the clustering's noise points
+    summarize  summarize_clusters on the cleaned questions
+    load       load_clustered_questions from the corpus parquet and from a question_dataset build
+
+Each row of results/benchmarks.csv holds the best of --repeat runs with its
+CPU time and peak RSS (from instrumentation.tracer), the scale and the git
+revision, so timings from different versions can be compared on one machine.
+The file is tracked by git despite the project's *.csv ignore rule: commit
+it with the change it measures, so the history travels with the code.
+Clustering 1M rows takes a long time; use --suites to leave it out.
+"""
+import argparse
+import contextlib
+import io
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.append(str(BENCH_DIR.parent / 'src'))
+sys.path.append(str(BENCH_DIR))
+
+from instrumentation import tracer
+from synthetic_corpus import write_corpus
+
+SUITES = ["cleaning", "tokenize", "cluster", "recluster", "summarize", "load"]
+RESULTS_PATH = BENCH_DIR / "results" / "benchmarks.csv"
+DATA_DIR = BENCH_DIR / "data"
+
+# Same settings as the topic notebooks; min_cluster_size shrinks for small corpora
+UMAP_PARAMS = dict(n_neighbors=30, n_components=5, metric='cosine', random_state=42)
+HDBSCAN_PARAMS = dict(min_cluster_size=250, min_samples=10, metric='euclidean', cluster_selection_method='eom')
+
+# -------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------
+
+def parse_scale(text):
+    """'10k' -> 10_000, '1m' -> 1_000_000."""
+    text = text.strip().lower().replace("_", "")
+    factor = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * factor)
+
+
+def git_revision():
+    """Short HEAD hash, with '-dirty' if tracked files under the project changed."""
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=BENCH_DIR, capture_output=True, text=True).stdout.strip()
+
+    revision = git("rev-parse", "--short", "HEAD") or "unknown"
+    if git("status", "--porcelain", "--untracked-files=no", "--", str(BENCH_DIR.parent)):
+        revision += "-dirty"
+    return revision
+
+
+def measure(name, func, repeat):
+    """
+    Run func() `repeat` times with its prints silenced. Returns the last
+    result and the stage record of the fastest run.
+    """
+    best = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()), tracer.stage(f"bench:{name}") as rec:
+            result = func()
+        if best is None or rec["wall_seconds"] < best["wall_seconds"]:
+            best = rec
+    return result, best
+
+
+# -------------------------------------------------------------------
+# Suites
+# -------------------------------------------------------------------
+
+class Benchmark:
+    """All suites at one scale. Inputs are generated once and cached in data_dir."""
+
+    def __init__(self, n_rows, repeat, data_dir):
+        self.n_rows = n_rows
+        self.repeat = repeat
+        self.paths = write_corpus(data_dir / f"corpus_{n_rows}", n_rows)
+        self.rows = pd.read_parquet(self.paths["rows"], columns=["question_content"])["question_content"]
+        self.questions = pd.read_parquet(self.paths["questions"])
+        self.results = []
+        self._clustered = None
+
+    def record(self, benchmark, rec, n_items):
+        self.results.append({
+            "benchmark": benchmark,
+            "n_rows": self.n_rows,
+            "n_items": n_items,
+            "repeat": self.repeat,
+            "seconds": rec["wall_seconds"],
+            "cpu_seconds": rec["cpu_seconds"],
+            "peak_rss_mb": rec.get("peak_rss_mb"),
+            "items_per_second": n_items / rec["wall_seconds"] if rec["wall_seconds"] else None,
+        })
+        print(f"  {benchmark:<40}{rec['wall_seconds']:>10.3f}s{n_items / rec['wall_seconds']:>14,.0f} items/s")
+
+    def run(self, name, func, n_items, repeat=None):
+        result, rec = measure(name, func, repeat or self.repeat)
+        self.record(name, rec, n_items)
+        return result
+
+    # ---- Suites -------------------------------------------------------
+    def cleaning(self):
+        from cleaning import minimal_clean, clean_text, clean_series
+
+        texts = self.rows
+        for mode, func in [("minimal", minimal_clean), ("full", clean_text)]:
+            self.run(f"{func.__name__}[apply]", lambda: texts.apply(func), len(texts))
+            self.run(f"{func.__name__}[clean_series]", lambda: clean_series(texts, mode), len(texts))
+
+    def tokenize(self):
+        import cleaning
+
+        def run():
+            cleaning.cached_lemmatizer = cleaning.CachedLemmatizer()  # time a cold cache every run
+            return cleaning.preprocess_series(self.rows, n_jobs=1)
+        self.run("preprocess_series[n_jobs=1]", run, len(self.rows))
+
+    def cluster(self):
+        from clustering_analysis import build_knn_graph, cluster_with_umap_hdbscan
+
+        embeddings = np.load(self.paths["embeddings"], mmap_mode="r")
+
+        hdbscan_params = {**HDBSCAN_PARAMS,
+                          'min_cluster_size': min(HDBSCAN_PARAMS['min_cluster_size'], max(25, len(embeddings) // 100))}
+
+        def run():
+            return cluster_with_umap_hdbscan(None, embeddings=embeddings, umap_params=UMAP_PARAMS,
+                                             hdbscan_params=hdbscan_params)
+        # UMAP dominates and compiles its numba code on the first call: time one run
+        result_df, umap_embeddings, _ = self.run("cluster_with_umap_hdbscan", run, len(embeddings), repeat=1)
+        self._clustered = (result_df["cluster"].to_numpy(), umap_embeddings)
+
+        # kNN reuse, straight from the read-only memmap
+        knn_graph = self.run("build_knn_graph[memmap]",
+                             lambda: build_knn_graph(embeddings, n_neighbors=UMAP_PARAMS["n_neighbors"],
+                                                     metric=UMAP_PARAMS["metric"]), len(embeddings), repeat=1)
+
+        def run_with_graph():
+            return cluster_with_umap_hdbscan(None, embeddings=embeddings, umap_params=UMAP_PARAMS,
+                                             hdbscan_params=hdbscan_params, knn_graph=knn_graph)
+        self.run("cluster_with_umap_hdbscan[knn_graph]", run_with_graph, len(embeddings), repeat=1)
+
+    def clustered(self):
+        if self._clustered is None:
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.cluster()
+            self.results.pop()
+        return self._clustered
+
+    def recluster(self):
+        from clustering_analysis import recluster_noise, recluster_noise_rounds
+
+        labels, umap_embeddings = self.clustered()
+        n_noise = int((labels == -1).sum())
+        if n_noise < 2 * 50:
+            print(f"  recluster_noise: skipped ({n_noise} noise points)")
+            return
+        self.run("recluster_noise", lambda: recluster_noise(umap_embeddings, labels), n_noise)
+
+        def one_round():
+            with contextlib.redirect_stdout(io.StringIO()):
+                return recluster_noise_rounds(umap_embeddings, labels, max_rounds=1)
+        self.run("recluster_noise_rounds[max_rounds=1]", one_round, n_noise)
+
+    def summarize(self):
+        from cleaning import clean_series
+        from clustering_analysis import summarize_clusters
+
+        labels, _ = self.clustered()
+        df = pd.DataFrame({
+            "Q_basic_clean": clean_series(self.questions["question_content"], "full"),
+            "cluster": labels,
+        })
+        df = df[df["cluster"] != -1]
+        self.run("summarize_clusters", lambda: summarize_clusters(df, sample_questions=5), len(df))
+
+    def load(self):
+        from processing_and_visualization import load_clustered_questions
+        from question_dataset import build_question_dataset
+
+        # A cluster file for the English maize questions, like save_question_clusters writes
+        q = self.questions
+        maize = q[(q["question_topic"] == "maize") & (q["question_language"] == "eng")]
+        cluster_path = Path(self.paths["rows"]).parent / "question_clusters_maize.parquet"
+        if not cluster_path.exists():
+            pd.DataFrame({
+                "question_id": maize["question_id"].astype("int32"),
+                "meta_label": np.int32(0),
+                "cluster": (maize["intent"] % 7).astype("int32"),
+                "umap_x": np.float32(0),
+                "umap_y": np.float32(0),
+            }).to_parquet(cluster_path, index=False)
+
+        dataset_dir = Path(self.paths["rows"]).parent / "dataset"
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_question_dataset(self.paths["rows"], dataset_dir)
+
+        self.run("load_clustered_questions[parquet]",
+                 lambda: load_clustered_questions(self.paths["rows"], cluster_path, "maize"), len(maize))
+        self.run("load_clustered_questions[dataset]",
+                 lambda: load_clustered_questions(dataset_dir, cluster_path, "maize"), len(maize))
+
+
+# -------------------------------------------------------------------
+# Results
+# -------------------------------------------------------------------
+
+def save_results(rows, path=RESULTS_PATH):
+    """Append this run's rows to the results CSV (created with a header if new)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df = pd.DataFrame(rows)
+    df.to_csv(path, mode="a", header=not path.exists(), index=False)
+    return df
+
+
+def compare_with_previous(current, path=RESULTS_PATH, threshold=0.10):
+    """
+    Print each benchmark's time relative to the latest run of a different
+    revision on this host. Slower by more than `threshold` is flagged.
+    """
+    history = pd.read_csv(path)
+    revision = current["revision"].iloc[0]
+    host = current["host"].iloc[0]
+    previous = history[(history["revision"] != revision) & (history["host"] == host)]
+    if previous.empty:
+        print("No earlier revision on this host to compare with.")
+        return None
+
+    previous = previous.sort_values("timestamp").groupby(["benchmark", "n_rows"]).tail(1)
+    merged = current.merge(previous, on=["benchmark", "n_rows"], suffixes=("", "_prev"))
+    merged["ratio"] = merged["seconds"] / merged["seconds_prev"]
+
+    print(f"\nCompared with earlier revisions on {host}:")
+    for _, r in merged.iterrows():
+        flag = "  SLOWER" if r["ratio"] > 1 + threshold else ""
+        print(f"  {r['benchmark']:<40}{r['n_rows']:>10,}  {r['seconds']:>8.3f}s vs "
+              f"{r['seconds_prev']:>8.3f}s ({r['revision_prev']}): {r['ratio']:.2f}x{flag}")
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default="10k,100k", help="Comma-separated corpus sizes in rows, e.g. 10k,100k,1m")
+    parser.add_argument("--suites", default=",".join(SUITES), help=f"Comma-separated subset of {SUITES}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--data-dir", default=str(DATA_DIR), help="Cache folder for the synthetic corpora")
+    parser.add_argument("--results", default=str(RESULTS_PATH))
+    parser.add_argument("--compare", action="store_true", help="Compare with the latest run of another revision")
+    args = parser.parse_args()
+
+    suites = [s.strip() for s in args.suites.split(",") if s.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"Unknown suites {sorted(unknown)}. Expected some of {SUITES}.")
+
+    meta = {
+        "timestamp": pd.Timestamp.now(tz="UTC").isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+    }
+    print(f"Revision {meta['revision']} on {meta['host']}")
+
+    rows = []
+    for scale in args.scales.split(","):
+        n_rows = parse_scale(scale)
+        print(f"\n{n_rows:,} rows")
+        bench = Benchmark(n_rows, args.repeat, Path(args.data_dir))
+        for suite in [s for s in SUITES if s in suites]:
+            t0 = time.time()
+            getattr(bench, suite)()
+            print(f"  ({suite} suite: {time.time() - t0:.1f}s)")
+        rows += [{**meta, **r} for r in bench.results]
+
+    current = save_results(rows, Path(args.results))
+    print(f"\nAppended {len(current)} results to {args.results}")
+    if args.compare:
+        compare_with_previous(current, Path(args.results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Generate a synthetic WeFarm-like SMS corpus offline, for benchmarks.
+
+The rows follow the raw export: one row per response, so every question
+repeats once per answer, all columns as strings. Questions are drawn from
+per-topic templates and wrapped in the SMS boilerplate the cleaners remove
+("Q:", "QA <name> asks:", "Reply Q45 followed by your response",
+"OptOut*196#", leading numbers, stray whitespace), with misspellings and
+re-asked questions. Each question also has an `intent` (topic + template), and
+synthetic_embeddings turns intents into clusterable sentence-embedding-like
+vectors, so clustering can be benchmarked without a SentenceTransformer.
+
+Usage:
+    python synthetic_corpus.py OUT_DIR --rows 100000     # corpus_100000.parquet etc.
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# -------------------------------------------------------------------
+# Vocabulary
+# -------------------------------------------------------------------
+
+# topic -> (share of questions, templates, slot fillers); None = unlabeled
+TOPICS = {
+    None: (0.35, [
+        "Where can I get a loan to start {x} farming?",
+        "How much is 1 kg of {x} at the market?",
+        "When will the rains start in {place}?",
+        "Which bank gives farmers loans for {x}?",
+        "How can I join a farmers group in {place}?",
+        "What is the price of {x} this season?",
+        "Is organic farming profitable for {x}?",
+        "Where can I sell my {x} at a good price?",
+    ], ["maize", "beans", "poultry", "dairy", "coffee", "tomatoes", "potatoes", "bananas"]),
+    "maize": (0.15, [
+        "Which maize variety matures in {n} months?",
+        "What fertilizer is good for maize, {x} or CAN?",
+        "How do I control {x} in my maize?",
+        "When is the best time to plant maize in {place}?",
+        "Why are my maize leaves turning {color}?",
+        "How many bags of maize can I get from one acre using {x}?",
+    ], ["DAP", "fall armyworm", "stalk borer", "striga", "urea", "NPK", "manure"]),
+    "chicken": (0.12, [
+        "What is the best feed for {x}?",
+        "How do I treat {x} in my {n} hens?",
+        "Why are my chickens not laying eggs after {n} weeks?",
+        "How many eggs should a {x} lay per day?",
+        "My chicken have {x}, what can I do?",
+        "At what age should I vaccinate {x} against newcastle?",
+    ], ["layers", "broilers", "kienyeji", "chicks", "newcastle disease", "coccidiosis", "diarrhea"]),
+    "cattle": (0.08, [
+        "My cow has stopped eating, what can I do about {x}?",
+        "How can I increase milk production in my {x}?",
+        "What is the best fodder for {x} cows?",
+        "How do I treat {x} in cattle?",
+    ], ["friesian", "jersey", "ayrshire", "east coast fever", "mastitis", "ticks", "napier grass"]),
+    "beans": (0.06, [
+        "How do I control {x} in beans?",
+        "Which bean variety does well in {place}?",
+        "Why are my bean flowers falling off after {n} days?",
+    ], ["aphids", "bean fly", "rust", "root rot", "weevils"]),
+    "coffee": (0.05, [
+        "How do I control {x} in coffee?",
+        "When should I prune my coffee after {n} years?",
+        "What fertilizer should I use for coffee with {x}?",
+    ], ["coffee berry disease", "leaf rust", "antestia bug", "CAN", "manure"]),
+    "potato": (0.05, [
+        "How do I prevent {x} in potatoes?",
+        "Where can I get certified {x} seed potatoes?",
+        "How long do potatoes take to mature in {place}?",
+    ], ["late blight", "bacterial wilt", "shangi", "dutch robjin", "kenya mpya"]),
+    "tomato": (0.05, [
+        "Why are my tomatoes {x}?",
+        "What spray controls {x} on tomatoes?",
+        "How many days do tomatoes take to ripen in {place}?",
+    ], ["cracking", "rotting at the bottom", "tuta absoluta", "whiteflies", "early blight"]),
+    "pig": (0.05, [
+        "What do I feed {x} to grow fast?",
+        "How do I treat {x} in pigs?",
+        "At what age can a sow have piglets after {n} months?",
+    ], ["weaners", "piglets", "african swine fever", "mange", "worms"]),
+    "goat": (0.04, [
+        "Which goat breed is best for {x}?",
+        "How do I treat {x} in goats?",
+    ], ["milk", "meat", "galla", "toggenburg", "pneumonia", "foot rot"]),
+}
+
+PLACES = ["Kitale", "Eldoret", "Nakuru", "Meru", "Kisii", "Mbale", "Masaka", "Gulu", "Arusha", "Embu"]
+COLORS = ["yellow", "purple", "brown", "white"]
+NAMES = ["Mary Wanjiku", "John Okello", "Grace Atieno", "Peter Mwangi", "Sarah Nakato", "James Kiprop"]
+
+# Non-English questions keep the topic but use a short phrase in that language
+LANGUAGES = {"eng": 0.8, "swa": 0.12, "lug": 0.08}
+FOREIGN_PHRASES = {
+    "swa": ["Naomba ushauri kuhusu {x}", "Nifanye nini kuhusu {x}?", "Bei ya {x} ni ngapi?"],
+    "lug": ["Nsaba okumanya ku {x}", "Nkole ntya ku {x}?"],
+}
+
+# (probability, wrapper) for the SMS boilerplate around a question
+WRAPPERS = [
+    (0.30, "Q: {q}"),
+    (0.15, "QA {name} asks: {q}"),
+    (0.05, "Q. q{lq}"),
+    (0.05, "{q} OptOut*196#"),
+    (0.05, "Reply Q{num} followed by your response {q}"),
+    (0.03, "  {num}  {q}"),
+    (0.03, "{q} Reply followed"),
+    (0.04, "{q} \n\tthanks"),
+]
+
+
+# -------------------------------------------------------------------
+# Corpus
+# -------------------------------------------------------------------
+
+def _misspell(text, rng):
+    """Drop or double one random letter (SMS-style typo)."""
+    i = int(rng.integers(1, max(len(text) - 1, 2)))
+    if not text[i - 1].isalpha():
+        return text
+    if rng.random() < 0.5:
+        return text[:i - 1] + text[i:]
+    return text[:i] + text[i - 1] + text[i:]
+
+
+def _question_texts(n_questions, rng):
+    """Return (question_content, question_topic, question_language, intent) arrays."""
+    topics = list(TOPICS)
+    shares = np.array([TOPICS[t][0] for t in topics])
+    topic_idx = rng.choice(len(topics), size=n_questions, p=shares / shares.sum())
+
+    # intent = running template number across all topics
+    template_offsets = np.cumsum([0] + [len(TOPICS[t][1]) for t in topics])
+    languages = rng.choice(list(LANGUAGES), size=n_questions, p=list(LANGUAGES.values()))
+    wrapper_p = np.array([p for p, _ in WRAPPERS])
+    wrapper_idx = rng.choice(len(WRAPPERS) + 1, size=n_questions, p=np.append(wrapper_p, 1 - wrapper_p.sum()))
+
+    texts = np.empty(n_questions, dtype=object)
+    intents = np.empty(n_questions, dtype=np.int64)
+    for i in range(n_questions):
+        topic = topics[topic_idx[i]]
+        _, templates, fillers = TOPICS[topic]
+        t = int(rng.integers(len(templates)))
+        intents[i] = template_offsets[topic_idx[i]] + t
+        x = fillers[int(rng.integers(len(fillers)))]
+
+        if languages[i] == "eng":
+            q = templates[t].format(x=x, n=int(rng.integers(2, 13)), place=PLACES[int(rng.integers(len(PLACES)))],
+                                    color=COLORS[int(rng.integers(len(COLORS)))])
+            if rng.random() < 0.08:
+                q = _misspell(q, rng)
+            if rng.random() < 0.15:
+                q = q.lower()
+        else:
+            phrases = FOREIGN_PHRASES[languages[i]]
+            q = phrases[int(rng.integers(len(phrases)))].format(x=x)
+
+        w = wrapper_idx[i]
+        if w < len(WRAPPERS):
+            q = WRAPPERS[w][1].format(q=q, lq=q.lower(), name=NAMES[int(rng.integers(len(NAMES)))],
+                                      num=int(rng.integers(1, 500)))
+        texts[i] = q
+
+    # Re-asked questions: ~30% copy the previous question of the same intent verbatim
+    repeat = np.flatnonzero(rng.random(n_questions) < 0.3)
+    if len(repeat):
+        order = np.lexsort((np.arange(n_questions), intents))
+        prev = np.empty(n_questions, dtype=np.int64)
+        prev[order] = np.r_[order[0], order[:-1]]
+        same = intents[prev[repeat]] == intents[repeat]
+        texts[repeat[same]] = texts[prev[repeat[same]]]
+
+    topic_values = np.array(topics, dtype=object)[topic_idx]
+    return texts, topic_values, languages, intents
+
+
+def generate_corpus(n_rows, seed=42, mean_responses=3.0):
+    """
+    Build a raw-export-like corpus with `n_rows` rows (question x response).
+
+    Returns:
+        rows: DataFrame with the 24 raw export columns, all strings (question_topic
+              None for unlabeled questions), one row per response
+        questions: one row per question_id with question_content,
+                   question_topic, question_language, intent and n_responses
+    """
+    rng = np.random.default_rng(seed)
+
+    # Responses per question (at least one): shifted geometric with the given mean
+    n_questions = max(1, int(np.ceil(n_rows / mean_responses)))
+    n_responses = rng.geometric(1 / mean_responses, size=n_questions)
+    cut = np.searchsorted(np.cumsum(n_responses), n_rows)
+    n_questions = min(cut + 1, n_questions)
+    n_responses = n_responses[:n_questions]
+    n_responses[-1] -= max(0, n_responses.sum() - n_rows)
+    if n_responses.sum() < n_rows:
+        n_responses[-1] += n_rows - n_responses.sum()
+
+    texts, topics, languages, intents = _question_texts(n_questions, rng)
+    question_ids = rng.permutation(np.arange(10_000, 10_000 + 4 * n_questions))[:n_questions]
+    user_ids = rng.integers(1, max(2, n_questions // 5), size=n_questions)
+    sent = (pd.Timestamp("2017-01-01", tz="UTC")
+            + pd.to_timedelta(rng.integers(0, 4 * 365 * 86400, size=n_questions), unit="s"))
+
+    questions = pd.DataFrame({
+        "question_id": question_ids,
+        "question_content": texts,
+        "question_topic": topics,
+        "question_language": languages,
+        "intent": intents,
+        "n_responses": n_responses,
+    })
+
+    # ---- Expand to one row per response ------------------------------------
+    q = np.repeat(np.arange(n_questions), n_responses)
+    n = len(q)
+    str_ids = question_ids.astype(str)
+    sent_str = sent.strftime("%Y-%m-%d %H:%M:%S+00").to_numpy()
+    genders = np.array(["male", "female", None], dtype=object)
+    countries = np.array(["ke", "ug", "tz"], dtype=object)
+
+    rows = pd.DataFrame({
+        "question_id": str_ids[q],
+        "question_user_id": user_ids.astype(str)[q],
+        "question_language": languages[q],
+        "question_content": texts[q],
+        "question_topic": topics[q],
+        "question_sent": sent_str[q],
+        "response_id": np.arange(1, n + 1).astype(str),
+        "response_user_id": rng.integers(1, max(2, n // 10), size=n).astype(str),
+        "response_language": languages[q],
+        "response_content": np.where(rng.random(n) < 0.5, "Use certified seed and manure", "Consult an extension officer"),
+        "response_topic": topics[q],
+        "response_sent": sent_str[q],
+        "question_user_type": "farmer",
+        "question_user_status": "active",
+        "question_user_country_code": countries[user_ids % 3][q],
+        "question_user_gender": genders[user_ids % 3][q],
+        "question_user_dob": "1988-10-20",
+        "question_user_created_at": "2017-01-01 00:00:00+00",
+        "response_user_type": "farmer",
+        "response_user_status": "active",
+        "response_user_country_code": countries[rng.integers(0, 3, size=n)],
+        "response_user_gender": genders[rng.integers(0, 3, size=n)],
+        "response_user_dob": "1990-01-01",
+        "response_user_created_at": "2017-01-01 00:00:00+00",
+    })
+    return rows, questions
+
+
+def synthetic_embeddings(intents, dim=384, noise=0.9, outlier_share=0.3, seed=42):
+    """
+    Unit-norm float32 vectors, one per question, scattered around a random
+    direction per intent (questions of one template end up near each other,
+    like sentence embeddings of paraphrases). `noise` sets how much the
+    intents overlap; `outlier_share` of the questions get a random direction
+    instead, so HDBSCAN leaves some noise as it does on the real data.
+    """
+    rng = np.random.default_rng(seed)
+    intents = np.asarray(intents)
+    centers = rng.standard_normal((intents.max() + 1, dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+
+    X = rng.standard_normal((len(intents), dim), dtype=np.float32) * np.float32(noise / np.sqrt(dim))
+    X += centers[intents]
+    outliers = rng.random(len(intents)) < outlier_share
+    X[outliers] = rng.standard_normal((outliers.sum(), dim), dtype=np.float32)
+    X /= np.linalg.norm(X, axis=1, keepdims=True)
+    return X
+
+
+def write_corpus(out_dir, n_rows, seed=42, dim=384):
+    """
+    Write corpus_{n_rows}.parquet (raw rows), questions_{n_rows}.parquet and
+    embeddings_{n_rows}.npy to out_dir, unless they already exist.
+
+    Returns a dict of the three paths.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = {
+        "rows": out_dir / f"corpus_{n_rows}.parquet",
+        "questions": out_dir / f"questions_{n_rows}.parquet",
+        "embeddings": out_dir / f"embeddings_{n_rows}.npy",
+    }
+    if all(p.exists() for p in paths.values()):
+        print(f"Synthetic corpus with {n_rows:,} rows already exists. Skipping.")
+        return paths
+
+    rows, questions = generate_corpus(n_rows, seed=seed)
+    rows.to_parquet(paths["rows"], index=False)
+    questions.to_parquet(paths["questions"], index=False)
+    np.save(paths["embeddings"], synthetic_embeddings(questions["intent"].to_numpy(), dim=dim, seed=seed))
+    print(f"Wrote synthetic corpus: {len(rows):,} rows, {len(questions):,} questions")
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("out_dir")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+
+    write_corpus(args.out_dir, args.rows, seed=args.seed, dim=args.dim)
+
+
+if __name__ == "__main__":
+    main()
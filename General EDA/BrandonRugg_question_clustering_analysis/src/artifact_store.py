@@ -0,0 +1,347 @@
+import hashlib
+import io
+import json
+import os
+import time
+from collections.abc import Mapping
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# -------------------------------------------------------------------
+# Fingerprints of input data and parameters
+# -------------------------------------------------------------------
+
+_CHUNK_ROWS = 65_536
+
+
+def _update_array(h, arr):
+    arr = np.asarray(arr)
+    h.update(f"ndarray:{arr.dtype.str}:{arr.shape}".encode())
+    if arr.dtype == object:
+        for value in arr.ravel():
+            _update(h, value)
+        return
+    flat = arr.reshape(len(arr), -1) if arr.ndim else arr.reshape(1, 1)
+    # Chunked, so memory-mapped matrices are hashed without loading them whole
+    for start in range(0, len(flat), _CHUNK_ROWS):
+        h.update(np.ascontiguousarray(flat[start:start + _CHUNK_ROWS]).tobytes())
+
+
+def _update_frame(h, df):
+    h.update(f"DataFrame:{list(map(str, df.columns))}:{list(map(str, df.dtypes))}:{len(df)}".encode())
+    for column in df.columns:
+        values = df[column]
+        if values.dtype == object and len(values) and isinstance(values.iloc[0], np.ndarray):
+            _update_array(h, np.vstack(values.to_numpy()))  # e.g. the 'embedding' column
+        else:
+            _update_array(h, pd.util.hash_pandas_object(values, index=False).to_numpy())
+
+
+def _update(h, obj):
+    if isinstance(obj, pd.DataFrame):
+        _update_frame(h, obj)
+    elif isinstance(obj, pd.Series):
+        _update_frame(h, obj.to_frame())
+    elif isinstance(obj, np.ndarray):
+        _update_array(h, obj)
+    elif isinstance(obj, Mapping):
+        h.update(b"dict")
+        for key in sorted(obj, key=str):
+            h.update(str(key).encode())
+            _update(h, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        h.update(f"seq:{len(obj)}".encode())
+        for value in obj:
+            _update(h, value)
+    elif hasattr(obj, "get_params"):
+        # Estimators (UMAP, HDBSCAN, ...) are identified by class and parameters
+        h.update(type(obj).__name__.encode())
+        _update(h, {k: v for k, v in obj.get_params(deep=False).items()
+                    if not k.startswith("precomputed")})
+    else:
+        h.update(f"{type(obj).__name__}:{obj!r}".encode())
+
+
+def fingerprint(*parts, length=16):
+    """
+    Hex digest identifying input data and parameters, e.g.
+    fingerprint(embeddings, umap_params, hdbscan_params). Arrays and
+    DataFrames are hashed by content, dicts by sorted items, estimators by
+    class and get_params(). Equal inputs always give the same fingerprint.
+    """
+    h = hashlib.blake2b(digest_size=length)
+    for part in parts:
+        _update(h, part)
+    return h.hexdigest()
+
+
+def content_fingerprint(obj):
+    """
+    Fingerprint of an object's content: arrays and DataFrames as in
+    fingerprint(), anything else (e.g. a fitted model) by its pickled bytes.
+    """
+    if isinstance(obj, (np.ndarray, pd.DataFrame, pd.Series)):
+        return fingerprint(obj)
+    import pickle
+    return hashlib.blake2b(pickle.dumps(obj, protocol=4), digest_size=16).hexdigest()
+
+
+def _file_checksum(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 22), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# -------------------------------------------------------------------
+# Artifact store
+# -------------------------------------------------------------------
+
+MANIFEST_NAME = "artifact_manifest.json"
+
+
+class ArtifactStore:
+    """
+    Folder of saved results with a manifest (artifact_manifest.json) recording,
+    for every artifact, its file, kind, size, checksum, creation time and the
+    fingerprint of the inputs it was computed from.
+
+    Formats:
+        numpy arrays  .npy, loaded memory-mapped (zero-copy); with
+                      compress=True, .npy.zst (zstd), loaded into memory
+        DataFrames    .parquet (zstd)
+        anything else .pkl via joblib (compress=True uses zlib)
+
+    Files and the manifest are written to a temporary file and renamed, so an
+    interrupted save never leaves a half-written artifact behind a valid
+    manifest entry. status() tells a re-run whether an artifact is a cache
+    hit, stale (saved from other inputs), invalid (file missing, size or
+    checksum mismatch) or missing.
+
+    Names are relative paths without extension, e.g. "maize/3f9c0e1a2b4d5c6e/umap_embedding".
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._manifest_path = self.root / MANIFEST_NAME
+
+    # ---- Manifest ---------------------------------------------------------
+    def manifest(self):
+        if not self._manifest_path.exists():
+            return {"artifacts": {}, "latest": {}}
+        return json.loads(self._manifest_path.read_text())
+
+    def _write_manifest(self, manifest):
+        tmp = Path(f"{self._manifest_path}.tmp")
+        tmp.write_text(json.dumps(manifest, indent=2))
+        os.replace(tmp, self._manifest_path)
+
+    def latest(self, key):
+        """Fingerprint most recently saved under `key` (e.g. a topic), or None."""
+        return self.manifest()["latest"].get(key)
+
+    def set_latest(self, key, fingerprint):
+        manifest = self.manifest()
+        manifest["latest"][key] = fingerprint
+        self._write_manifest(manifest)
+
+    def entries(self):
+        """One row per artifact: name, file, kind, bytes, created, fingerprint, ..."""
+        artifacts = self.manifest()["artifacts"]
+        return pd.DataFrame([{"name": name, **entry} for name, entry in artifacts.items()])
+
+    # ---- Save ---------------------------------------------------------------
+    def save(self, name, obj, fingerprint=None, compress=False):
+        """Write `obj` atomically and record it in the manifest. Returns the file path."""
+        if isinstance(obj, pd.DataFrame):
+            kind, suffix = "parquet", ".parquet"
+        elif isinstance(obj, np.ndarray):
+            kind, suffix = ("npy_zst", ".npy.zst") if compress else ("npy", ".npy")
+        else:
+            kind, suffix = "pickle", ".pkl"
+
+        path = self.root / f"{name}{suffix}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(f"{path}.tmp")
+
+        if kind == "parquet":
+            obj.to_parquet(tmp, compression="zstd")
+        elif kind == "npy":
+            with open(tmp, "wb") as f:
+                np.save(f, obj)
+        elif kind == "npy_zst":
+            import pyarrow as pa
+            buffer = io.BytesIO()
+            np.save(buffer, obj)
+            raw_bytes = buffer.getbuffer().nbytes
+            tmp.write_bytes(pa.compress(buffer.getvalue(), codec="zstd", asbytes=True))
+        else:
+            joblib.dump(obj, tmp, compress=3 if compress else 0)
+        os.replace(tmp, path)
+
+        entry = {
+            "file": path.relative_to(self.root).as_posix(),
+            "kind": kind,
+            "bytes": path.stat().st_size,
+            "checksum": _file_checksum(path),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "fingerprint": fingerprint,
+        }
+        if isinstance(obj, np.ndarray):
+            entry.update(shape=list(obj.shape), dtype=obj.dtype.str)
+            if kind == "npy_zst":
+                entry["raw_bytes"] = raw_bytes
+        elif kind == "parquet":
+            entry["rows"] = len(obj)
+
+        manifest = self.manifest()
+        old = manifest["artifacts"].get(name)
+        if old and old["file"] != entry["file"] and (self.root / old["file"]).exists():
+            os.remove(self.root / old["file"])  # e.g. re-saved uncompressed
+        manifest["artifacts"][name] = entry
+        self._write_manifest(manifest)
+        return path
+
+    # ---- Check --------------------------------------------------------------
+    def status(self, name, fingerprint=None, verify=False):
+        """
+        'hit'     saved, file intact and (if given) saved from the same fingerprint
+        'stale'   saved and intact, but from a different fingerprint
+        'invalid' in the manifest but the file is missing, or its size (or,
+                  with verify=True, checksum) does not match
+        'missing' never saved (a file may exist from before the manifest)
+        """
+        entry = self.manifest()["artifacts"].get(name)
+        if entry is None:
+            return "missing"
+        path = self.root / entry["file"]
+        if not path.exists() or path.stat().st_size != entry["bytes"]:
+            return "invalid"
+        if verify and _file_checksum(path) != entry["checksum"]:
+            return "invalid"
+        if fingerprint is not None and entry["fingerprint"] != fingerprint:
+            return "stale"
+        return "hit"
+
+    # ---- Load ---------------------------------------------------------------
+    def load(self, name, mmap=True, columns=None):
+        """
+        Load one artifact. .npy arrays are memory-mapped read-only unless
+        mmap=False; `columns` selects parquet columns.
+        """
+        entry = self.manifest()["artifacts"].get(name)
+        if entry is None:
+            raise KeyError(f"No artifact '{name}' in {self.root}.")
+        path = self.root / entry["file"]
+        if not path.exists() or path.stat().st_size != entry["bytes"]:
+            raise ValueError(f"Artifact '{name}' is invalid ({path} is missing or was modified). Save it again.")
+
+        kind = entry["kind"]
+        if kind == "npy":
+            return np.load(path, mmap_mode="r" if mmap else None)
+        if kind == "npy_zst":
+            import pyarrow as pa
+            data = pa.decompress(path.read_bytes(), decompressed_size=entry["raw_bytes"], codec="zstd", asbytes=True)
+            return np.load(io.BytesIO(data))
+        if kind == "parquet":
+            return pd.read_parquet(path, columns=columns, memory_map=True)
+        return joblib.load(path)
+
+    def remove(self, name):
+        manifest = self.manifest()
+        entry = manifest["artifacts"].pop(name, None)
+        if entry is not None:
+            (self.root / entry["file"]).unlink(missing_ok=True)
+            self._write_manifest(manifest)
+
+
+# -------------------------------------------------------------------
+# Versioned topic clustering artifacts (save_topic_files / TopicModel)
+# -------------------------------------------------------------------
+
+TOPIC_ARTIFACTS = ("umap_embedding", "clustered_df", "hdbscan_model", "umap_reducer")
+
+
+class ArtifactSet(Mapping):
+    """
+    Read-only mapping over one saved version of a topic's artifacts. Nothing
+    is read until an artifact is accessed; arrays come back memory-mapped.
+    """
+
+    def __init__(self, store, prefix, names):
+        self.store = store
+        self.prefix = prefix
+        self.fingerprint = prefix.rsplit("/", 1)[-1]
+        self._names = list(names)
+        self._loaded = {}
+
+    def __getitem__(self, name):
+        if name not in self._names:
+            raise KeyError(name)
+        if name not in self._loaded:
+            self._loaded[name] = self.store.load(f"{self.prefix}/{name}")
+        return self._loaded[name]
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def load(self, name, **kwargs):
+        """Load without caching, passing options to ArtifactStore.load (e.g. columns=[...])."""
+        if name not in self._names:
+            raise KeyError(name)
+        return self.store.load(f"{self.prefix}/{name}", **kwargs)
+
+
+def topic_status(store, topic, fingerprint, names=TOPIC_ARTIFACTS, verify=False):
+    """{artifact name: status} for one topic version (see ArtifactStore.status)."""
+    return {name: store.status(f"{topic}/{fingerprint}/{name}", fingerprint, verify=verify) for name in names}
+
+
+def save_topic_artifacts(store, topic, artifacts, fingerprint, compress=False, overwrite=False):
+    """
+    Save {name: object} under {topic}/{fingerprint}/ and mark the version as
+    the topic's latest. Artifacts already saved intact for this fingerprint
+    are skipped (cache hits) unless overwrite=True; invalid ones are rewritten.
+
+    Returns {name: status before saving}.
+    """
+    before = topic_status(store, topic, fingerprint, names=list(artifacts))
+    for name, obj in artifacts.items():
+        if before[name] == "hit" and not overwrite:
+            print(f"{topic}/{name} already saved for fingerprint {fingerprint}. Skipping save.")
+            continue
+        if before[name] == "invalid":
+            print(f"{topic}/{name} for fingerprint {fingerprint} is invalid. Saving again.")
+        path = store.save(f"{topic}/{fingerprint}/{name}", obj, fingerprint=fingerprint, compress=compress)
+        print(f"Saved {path.relative_to(store.root).as_posix()}")
+
+    store.set_latest(topic, fingerprint)
+    return before
+
+
+def load_topic_artifacts(store, topic, fingerprint=None):
+    """
+    Lazily open a saved topic version (default: the latest saved). Raises
+    FileNotFoundError if there is none and ValueError if any artifact is invalid.
+    """
+    fingerprint = fingerprint or store.latest(topic)
+    if fingerprint is None:
+        raise FileNotFoundError(f"No saved artifacts for topic '{topic}' in {store.root}.")
+
+    prefix = f"{topic}/{fingerprint}"
+    names = [name.rsplit("/", 1)[-1] for name in store.manifest()["artifacts"] if name.startswith(prefix + "/")]
+    if not names:
+        raise FileNotFoundError(f"No saved artifacts for topic '{topic}' with fingerprint {fingerprint}.")
+
+    invalid = [name for name, st in topic_status(store, topic, fingerprint, names).items() if st != "hit"]
+    if invalid:
+        raise ValueError(f"Invalid artifacts for topic '{topic}' ({fingerprint}): {invalid}. Save them again.")
+    return ArtifactSet(store, prefix, names)
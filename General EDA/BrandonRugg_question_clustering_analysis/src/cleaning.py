@@ -1,7 +1,17 @@
+import json
+import os
 import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+
+import numpy as np
+import pandas as pd
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
 
+from instrumentation import tracer
+
 # -------------------------------------------------------------------
 # Minimal cleaning
 # -------------------------------------------------------------------
@@ -77,6 +87,93 @@ def clean_text(text: str) -> str:
 
     return text.strip()
 
+# -------------------------------------------------------------------
+# Batch cleaning (whole column at a time)
+# -------------------------------------------------------------------
+
+RE_MINIMAL_PREFIX = re.compile(r'^(Q[:.]?|QA [^:]+ asks:)\s*', re.IGNORECASE)
+
+# Numbers -> num_token and punctuation removal fused into one pass. The two
+# rules never touch each other's output (digits are word characters and
+# "num_token" has no punctuation), so a single scan matches running them in order.
+RE_NUM_OR_PUNCT = re.compile(r"(\d+)|[^\w\s]")
+
+CLEAN_MODES = ("minimal", "prefixes", "full")
+
+
+def _num_or_punct(match):
+    return "num_token" if match.group(1) is not None else ""
+
+
+def _clean_values_minimal(values):
+    # " ".join(str.split()) is the same as collapsing \s+ and stripping:
+    # re's \s and str.split() share Python's definition of whitespace
+    values = [" ".join(v.split()) for v in values]
+    sub = RE_MINIMAL_PREFIX.sub
+    return [sub("", v) for v in values]
+
+
+def _clean_values_prefixes(values):
+    for pattern in (RE_OPTOUT, RE_LEADING_NUM, RE_ASKS, RE_Q_NUM,
+                    RE_Q_WORD_SAFE, RE_REPLY_FOLLOWED):
+        sub = pattern.sub
+        values = [sub("", v) for v in values]
+    return [v.strip() for v in values]
+
+
+def _clean_values_full(values):
+    values = _clean_values_prefixes(values)
+    sub = RE_NUM_OR_PUNCT.sub
+    values = [sub(_num_or_punct, v) for v in values]
+    sub = RE_STANDALONE_Q.sub
+    return [" ".join(sub("", v).split()) for v in values]
+
+
+_BATCH_CLEANERS = {
+    "minimal": _clean_values_minimal,
+    "prefixes": _clean_values_prefixes,
+    "full": _clean_values_full,
+}
+
+
+def clean_series(series, mode="minimal"):
+    """
+    Clean a whole text column at once. Output matches the per-row functions
+    exactly, but is much faster on the raw data:
+      - each distinct string is cleaned once and broadcast back (questions
+        repeat once per response in the full dataset)
+      - the rules run as one pass per rule over the whole column, with the
+        number/punctuation rules fused and whitespace handled by str.split
+
+    Args:
+        series (pd.Series): Raw text column.
+        mode (str): "minimal" (= minimal_clean), "prefixes" (= strip_prefixes)
+                    or "full" (= clean_text).
+
+    Returns a Series with the same index and name. Missing values stay missing.
+    """
+    if mode not in _BATCH_CLEANERS:
+        raise ValueError(f"Unknown mode '{mode}'. Expected one of {CLEAN_MODES}.")
+
+    return _map_unique(series, _BATCH_CLEANERS[mode], stage=f"clean_series_{mode}")
+
+
+def _map_unique(series, func, stage):
+    """
+    Apply `func` (list of strings -> list of strings) to the distinct values of
+    `series` only, then broadcast the results back to every row by index.
+    Recorded on the tracer as `stage` (n_unique = distinct values processed).
+    """
+    with tracer.stage(stage, rows_in=len(series)) as rec:
+        codes, uniques = pd.factorize(series)
+        results = np.empty(len(uniques) + 1, dtype=object)
+        results[:-1] = func(list(uniques))
+        results[-1] = np.nan  # code -1 (missing) picks the last slot
+        rec["rows_out"] = len(series)
+        rec["n_unique"] = len(uniques)
+
+    return pd.Series(results.take(codes), index=series.index, name=series.name)
+
 # -------------------------------------------------------------------
 # Tokenization + lemmatization
 # -------------------------------------------------------------------
@@ -85,14 +182,165 @@ stop_words = set(stopwords.words("english"))
 lemmatizer = WordNetLemmatizer()
 
 
+class CachedLemmatizer:
+    """
+    WordNetLemmatizer with a bounded LRU cache in front of it. The SMS
+    vocabulary is small and Zipfian, so almost every call after warm-up is a
+    dictionary lookup instead of a WordNet query.
+
+    The vocabulary -> lemma table can be saved and preloaded so that new
+    processes (e.g. preprocess_series workers) start warm.
+
+    Args:
+        max_size (int, optional): Maximum cached tokens; the least recently
+                                  used entry is evicted past this. None = unbounded.
+        base (optional): Object with a .lemmatize(token) method. Defaults to
+                         the module-level WordNetLemmatizer.
+    """
+
+    def __init__(self, max_size=200_000, base=None):
+        self.max_size = max_size
+        self.base = base if base is not None else lemmatizer
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+    def lemmatize(self, token):
+        cache = self._cache
+        lemma = cache.get(token)
+        if lemma is not None:
+            cache.move_to_end(token)
+            self.hits += 1
+            return lemma
+
+        self.misses += 1
+        lemma = self.base.lemmatize(token)
+        cache[token] = lemma
+        if self.max_size is not None and len(cache) > self.max_size:
+            cache.popitem(last=False)
+            self.evictions += 1
+        return lemma
+
+    def lemmatize_tokens(self, tokens):
+        lemmatize = self.lemmatize
+        return [lemmatize(t) for t in tokens]
+
+    def stats(self):
+        """Return hit/miss/eviction counters and the current hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._cache),
+            'max_size': self.max_size,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = 0
+
+    def save(self, path):
+        """Write the cached vocabulary -> lemma table to a JSON file (LRU order)."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self._cache, f, ensure_ascii=False)
+
+    def load(self, path):
+        """
+        Preload a table written by save(). Loaded entries count as neither hits
+        nor misses; if the table is larger than max_size, the most recently
+        used entries are kept.
+        """
+        with open(path, encoding="utf-8") as f:
+            table = json.load(f)
+
+        items = list(table.items())
+        if self.max_size is not None:
+            items = items[-self.max_size:]
+        self._cache.update(items)
+
+        while self.max_size is not None and len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        return self
+
+
+cached_lemmatizer = CachedLemmatizer()
+
+
 def tokenize(text: str):
     text = text.lower()
     return [w for w in text.split() if w not in stop_words]
 
 
 def lemmatize_tokens(tokens):
-    return [lemmatizer.lemmatize(t) for t in tokens]
+    return cached_lemmatizer.lemmatize_tokens(tokens)
+
+
+def process_text(text: str) -> str:
+    """
+    Full preprocessing for TF-IDF: clean_text -> tokenize -> lemmatize,
+    joined back into a single string.
+    """
+    cleaned = clean_text(text)
+    tokens = tokenize(cleaned)
+    lemmas = lemmatize_tokens(tokens)
+    return " ".join(lemmas)
+
+# -------------------------------------------------------------------
+# Parallel preprocessing of a whole column
+# -------------------------------------------------------------------
+
+def _init_preprocess_worker(lemma_table=None):
+    # stop_words is built once when the worker imports this module; WordNet is
+    # loaded lazily, so touch the lemmatizer here rather than in the first chunk
+    lemmatizer.lemmatize("warmup")
+    if lemma_table is not None:
+        cached_lemmatizer.load(lemma_table)
+
+
+def _preprocess_chunk(texts):
+    cleaned = _clean_values_full(texts)
+    return [" ".join(lemmatize_tokens(tokenize(t))) for t in cleaned]
+
+
+def preprocess_series(series, n_jobs=None, chunk_size=20_000, lemma_table=None):
+    """
+    Same output as series.apply(process_text), built for the full dataset:
+      - texts are deduplicated first (questions repeat once per response),
+        so each distinct question is cleaned and lemmatized only once
+      - the distinct texts are split into chunks and processed across a
+        process pool; each worker loads the stopwords and lemmatizer once
+      - results are broadcast back to every row by index
+
+    Args:
+        series (pd.Series): Raw text column (e.g. questions['question_content']).
+        n_jobs (int, optional): Worker processes. Defaults to os.cpu_count().
+                                n_jobs=1 runs in the current process.
+        chunk_size (int): Distinct texts sent to a worker at a time.
+        lemma_table (str, optional): Table saved by CachedLemmatizer.save(),
+                                     preloaded into every worker's lemma cache.
+
+    Returns a Series with the same index and name. Missing values stay missing.
+    """
+    n_jobs = n_jobs or os.cpu_count() or 1
 
+    def process_unique(texts):
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
 
+        if n_jobs == 1 or len(chunks) <= 1:
+            if lemma_table is not None:
+                cached_lemmatizer.load(lemma_table)
+            results = [_preprocess_chunk(chunk) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_jobs, len(chunks)),
+                                     initializer=_init_preprocess_worker,
+                                     initargs=(lemma_table,)) as executor:
+                results = list(executor.map(_preprocess_chunk, chunks))
 
+        return list(chain.from_iterable(results))
 
+    return _map_unique(series, process_unique, stage="preprocess_series")
@@ -0,0 +1,612 @@
+import json
+import os
+from functools import lru_cache
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import NearestNeighbors
+
+from artifact_store import ArtifactStore, load_topic_artifacts
+from cleaning import clean_series
+
+# -------------------------------------------------------------------
+# Assign new questions to the clusters of a saved topic
+# -------------------------------------------------------------------
+
+def _neighbour_vote(dists, neighbour_labels, max_distance):
+    """
+    Majority cluster per row of an (n, k) neighbour label matrix. Rows whose
+    nearest neighbour is farther than max_distance are noise (-1) with
+    confidence 0.
+    """
+    if len(neighbour_labels) == 0:
+        return np.empty(0, dtype=neighbour_labels.dtype), np.empty(0)
+    codes, classes = pd.factorize(neighbour_labels.ravel())
+    codes = codes.reshape(neighbour_labels.shape)
+
+    counts = np.zeros((len(codes), len(classes)), dtype=np.int32)
+    np.add.at(counts, (np.arange(len(codes))[:, None], codes), 1)
+    labels = np.asarray(classes)[counts.argmax(axis=1)]
+    confidence = counts.max(axis=1) / codes.shape[1]
+
+    too_far = dists[:, 0] > max_distance
+    labels = np.where(too_far, -1, labels)
+    confidence = np.where(too_far, 0.0, confidence)
+    return labels, confidence
+
+
+def _unit_rows(X):
+    return X / np.maximum(np.linalg.norm(X, axis=1, keepdims=True), 1e-12)
+
+
+class TopicModel:
+    """
+    Saved UMAP + HDBSCAN clustering of one topic, loaded once and used to
+    assign clusters to new questions without re-clustering the topic.
+
+    Reads the artifacts written by save_topic_files (the latest version of
+    the topic, or the one with the given `fingerprint`):
+        umap_reducer    fitted UMAP (save_topic_files(..., reducer=...))
+        umap_embedding  reduced embeddings of the clustered questions (memory-mapped)
+        clustered_df    final cluster (and meta_label) of each question
+        hdbscan_model   fitted HDBSCAN
+        compressor      embedding compression the UMAP was fit behind (optional)
+    Folders saved before the artifact store ({topic}_umap_reducer.pkl etc.)
+    are still read.
+
+    New points are projected with UMAP.transform and take the majority final
+    cluster of their n_neighbors nearest clustered questions in UMAP space
+    (so clusters recovered by recluster_noise are assigned too). Points whose
+    nearest clustered question is farther than `max_distance` (by default the
+    typical neighbourhood radius of the clustered questions) are noise (-1).
+
+    If the clusterer was fit with the `hdbscan` package and prediction_data=True,
+    method="approximate_predict" uses hdbscan.approximate_predict first and
+    falls back to the neighbour vote for points it leaves as noise.
+    """
+
+    def __init__(self, data_dir, topic, cluster_col='cluster', meta_col='meta_label',
+                 n_neighbors=15, max_distance=None, fingerprint=None):
+        self.topic = topic
+        self.cluster_col = cluster_col
+        self.meta_col = meta_col
+        self.n_neighbors = n_neighbors
+
+        store = ArtifactStore(data_dir)
+        if fingerprint is not None or store.latest(topic) is not None:
+            self.reducer, self.clusterer, self.umap_embedding, labels_df, self.compressor = self._load_artifacts(
+                store, topic, fingerprint, [cluster_col, meta_col])
+        else:
+            self.reducer, self.clusterer, self.umap_embedding, labels_df = self._load_legacy_files(
+                data_dir, topic, [cluster_col, meta_col])
+            self.compressor = None
+        if len(labels_df) != len(self.umap_embedding):
+            raise ValueError(f"The clustered df of '{topic}' has {len(labels_df)} rows "
+                             f"but the UMAP embedding has {len(self.umap_embedding)}.")
+
+        self.labels = labels_df[cluster_col].to_numpy()
+        self.cluster_to_meta = None
+        if meta_col in labels_df.columns:
+            self.cluster_to_meta = labels_df.groupby(cluster_col)[meta_col].first().to_dict()
+
+        # Nearest-exemplar index over clustered (non-noise) questions
+        clustered = self.labels != -1
+        self._exemplar_codes, self._classes = pd.factorize(self.labels[clustered])
+        self._index = NearestNeighbors(n_neighbors=n_neighbors).fit(self.umap_embedding[clustered])
+
+        if max_distance is None:
+            # Neighbourhood radius of clustered questions: 99th percentile of the
+            # distance to their n_neighbors-th neighbour, over a seeded sample
+            sample = self.umap_embedding[clustered]
+            if len(sample) > 10_000:
+                sample = sample[np.random.RandomState(42).choice(len(sample), 10_000, replace=False)]
+            dists, _ = self._index.kneighbors(sample, n_neighbors=n_neighbors + 1)
+            max_distance = float(np.percentile(dists[:, -1], 99))
+        self.max_distance = max_distance
+
+    @staticmethod
+    def _load_artifacts(store, topic, fingerprint, label_cols):
+        artifacts = load_topic_artifacts(store, topic, fingerprint)
+        if "umap_reducer" not in artifacts:
+            raise FileNotFoundError(
+                f"No UMAP reducer saved for '{topic}' ({artifacts.fingerprint}). Re-run "
+                "cluster_with_umap_hdbscan(..., return_reducer=True) and pass the reducer to save_topic_files."
+            )
+        # Only the label columns are needed, not the stored embeddings
+        import pyarrow.parquet as pq
+        df_path = store.root / store.manifest()["artifacts"][f"{artifacts.prefix}/clustered_df"]["file"]
+        columns = [c for c in label_cols if c in pq.read_schema(df_path).names]
+        return (artifacts["umap_reducer"], artifacts["hdbscan_model"], artifacts["umap_embedding"],
+                artifacts.load("clustered_df", columns=columns), artifacts.get("compressor"))
+
+    @staticmethod
+    def _load_legacy_files(data_dir, topic, label_cols):
+        reducer_path = os.path.join(data_dir, f"{topic}_umap_reducer.pkl")
+        if not os.path.exists(reducer_path):
+            raise FileNotFoundError(
+                f"{reducer_path} not found. Re-run cluster_with_umap_hdbscan(..., return_reducer=True) "
+                "and pass the reducer to save_topic_files."
+            )
+        import pyarrow.parquet as pq
+        df_path = os.path.join(data_dir, f"{topic}_clustered_df.parquet")
+        columns = [c for c in label_cols if c in pq.read_schema(df_path).names]
+        return (joblib.load(reducer_path),
+                joblib.load(os.path.join(data_dir, f"{topic}_hdbscan_model.pkl")),
+                np.asarray(joblib.load(os.path.join(data_dir, f"{topic}_umap_embedding.pkl"))),
+                pd.read_parquet(df_path, columns=columns))
+
+    def project(self, embeddings):
+        """Sentence embeddings as the UMAP was fit on them (compressed, if the topic was)."""
+        X = np.asarray(embeddings, dtype=np.float32)
+        return X if self.compressor is None else self.compressor.project(X)
+
+    def transform(self, embeddings):
+        """Project sentence embeddings into the topic's UMAP space."""
+        return self.reducer.transform(self.project(embeddings))
+
+    def assign(self, umap_points):
+        """
+        Assign points already in UMAP space.
+
+        Returns (labels, confidence) where confidence is the share of the
+        n_neighbors nearest clustered questions that voted for the label.
+        """
+        dists, idx = self._index.kneighbors(umap_points)
+        return _neighbour_vote(dists, self._classes[self._exemplar_codes[idx]], self.max_distance)
+
+    def predict(self, embeddings, method="knn"):
+        """Assign sentence embeddings; returns (labels, confidence, umap_points)."""
+        umap_points = self.transform(embeddings)
+        labels, confidence = self.assign(umap_points)
+
+        if method == "approximate_predict":
+            import hdbscan
+            hdb_labels, strengths = hdbscan.approximate_predict(self.clusterer, umap_points)
+            use_hdb = hdb_labels != -1
+            labels = np.where(use_hdb, hdb_labels, labels)
+            confidence = np.where(use_hdb, strengths, confidence)
+        elif method != "knn":
+            raise ValueError(f"Unknown method '{method}'. Use 'knn' or 'approximate_predict'.")
+
+        return labels, confidence, umap_points
+
+    def meta_labels(self, labels):
+        if self.cluster_to_meta is None:
+            return None
+        return pd.Series(labels).map(self.cluster_to_meta).to_numpy()
+
+
+@lru_cache(maxsize=8)
+def _cached_topic_model(data_dir, topic, n_neighbors, version):
+    fingerprint = version if isinstance(version, str) else None
+    return TopicModel(data_dir, topic, n_neighbors=n_neighbors, fingerprint=fingerprint)
+
+
+def load_topic_model(data_dir, topic, n_neighbors=15):
+    """
+    Load (once per saved version) the clustering for a topic. The cache is
+    keyed on the topic's latest fingerprint in the artifact store (the
+    reducer file's mtime for legacy folders), so re-saving a topic with
+    save_topic_files, from this process or another, loads the new version.
+    """
+    version = ArtifactStore(data_dir).latest(topic)
+    if version is None:
+        reducer_path = os.path.join(data_dir, f"{topic}_umap_reducer.pkl")
+        version = os.path.getmtime(reducer_path) if os.path.exists(reducer_path) else None
+    return _cached_topic_model(data_dir, topic, n_neighbors, version)
+
+
+def predict_clusters(
+        texts_or_embeddings,
+        topic,
+        data_dir=None,
+        model=None,
+        model_name='all-MiniLM-L6-v2',
+        batch_size=10_000,
+        method="knn",
+        n_neighbors=15
+    ):
+    """
+    Assign clusters and meta labels to new questions using a topic's saved
+    UMAP + HDBSCAN models, in batches.
+
+    Args:
+        texts_or_embeddings: raw question texts (cleaned with minimal_clean and
+                             encoded) or an (n, 384) embedding matrix (may be
+                             memory-mapped, e.g. from consolidate_shards).
+        topic (str): Topic name used with save_topic_files.
+        data_dir (str): Folder with the saved topic files. Defaults to $DATA_DIR.
+        model (optional): SentenceTransformer-style encoder for raw texts.
+        batch_size (int): Questions transformed at a time.
+        method (str): "knn" (nearest clustered questions) or "approximate_predict"
+                      (hdbscan package clusterers with prediction data).
+
+    Returns a DataFrame with 'cluster', 'confidence', 'meta_label' (if saved)
+    and the UMAP coordinates 'umap_0', 'umap_1', ..., one row per input, in
+    input order.
+    """
+    data_dir = data_dir or os.getenv("DATA_DIR")
+    topic_model = load_topic_model(data_dir, topic, n_neighbors)
+
+    if isinstance(texts_or_embeddings, pd.Series):
+        texts_or_embeddings = texts_or_embeddings.tolist()
+    is_text = (
+        len(texts_or_embeddings) > 0 and isinstance(texts_or_embeddings[0], str)
+    )
+    if is_text and model is None:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_name)
+
+    results = []
+    for start in range(0, len(texts_or_embeddings), batch_size):
+        batch = texts_or_embeddings[start:start + batch_size]
+        if is_text:
+            texts = clean_series(pd.Series(list(batch)), mode="minimal").tolist()
+            batch = model.encode(texts, batch_size=64, show_progress_bar=False)
+
+        labels, confidence, umap_points = topic_model.predict(batch, method=method)
+        batch_df = pd.DataFrame({'cluster': labels, 'confidence': confidence})
+        meta = topic_model.meta_labels(labels)
+        if meta is not None:
+            batch_df['meta_label'] = meta
+        for dim in range(umap_points.shape[1]):
+            batch_df[f'umap_{dim}'] = umap_points[:, dim]
+        results.append(batch_df)
+
+        print(f"Assigned {min(start + batch_size, len(texts_or_embeddings)):,} / {len(texts_or_embeddings):,} questions")
+
+    if not results:
+        return pd.DataFrame(columns=['cluster', 'confidence'])
+    return pd.concat(results, ignore_index=True)
+
+# -------------------------------------------------------------------
+# Incremental clustering: assign new questions, re-cluster the leftovers
+# -------------------------------------------------------------------
+
+class _GrowableArray:
+    """
+    Append-only array with spare capacity. Capacity doubles when full, so
+    appending a batch costs O(batch) amortized instead of re-copying
+    everything appended so far.
+    """
+
+    def __init__(self, dtype, width=None, values=None):
+        self._dtype = dtype
+        self._width = width
+        self._data = None
+        self._n = 0
+        if values is not None:
+            self.append(values)
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def values(self):
+        """The appended rows (a view: writes go to the buffer)."""
+        if self._data is None:
+            return np.empty((0,) if self._width is None else (0, self._width), dtype=self._dtype)
+        return self._data[:self._n]
+
+    def append(self, rows):
+        rows = np.asarray(rows, dtype=self._dtype)
+        end = self._n + len(rows)
+        if self._data is None or end > len(self._data):
+            grown = np.empty((max(end, 2 * self._n, 1_024),) + rows.shape[1:], dtype=self._dtype)
+            if self._data is not None:
+                grown[:self._n] = self._data[:self._n]
+            self._data = grown
+        self._data[self._n:end] = rows
+        self._n = end
+
+
+class IncrementalClusterer:
+    """
+    Keep a saved topic clustering up to date as new questions arrive, without
+    refitting UMAP + HDBSCAN on the whole topic.
+
+    Each batch passed to add() is projected with the topic's UMAP and voted on
+    by its nearest clustered questions (as in predict_clusters), including
+    questions in clusters created by earlier re-clusterings. Points with
+    confidence >= min_confidence keep their cluster. The rest go to a residual
+    pool, and once `pool_threshold` new points have reached the pool since the
+    last re-clustering, the pool is re-clustered with recluster_noise. New
+    clusters get ids above every existing one. Pool points that are still
+    noise stay in the pool for the next round.
+
+    UMAP.transform places even unfamiliar questions next to training points,
+    so a point whose nearest training question in the original embedding space
+    is farther than `max_raw_distance` (by default the 99th percentile of the
+    UMAP training neighbourhood radius) is novel: it can only join a cluster
+    created here, by a vote of that cluster's members in the original space.
+
+    All work is on the new points: the saved topic's indexes (including one
+    over the training embeddings, built once here) are only queried, the
+    added questions are kept in growable buffers, and the new clusters have
+    their own small index. The cost of add() depends on the batch, not on
+    how many questions were added before.
+
+    Args:
+        data_dir, topic: Saved topic files (see TopicModel / save_topic_files).
+        min_confidence (float): Minimum share of neighbour votes to accept an assignment.
+        pool_threshold (int): New residual points that trigger a re-clustering.
+        hdbscan_params (dict, optional): Passed to recluster_noise.
+        n_neighbors (int): Neighbours that vote on each point.
+        max_raw_distance (float, optional): Novelty cut-off in the original embedding space.
+
+    Example:
+        inc = IncrementalClusterer(data_dir, "maize", pool_threshold=2_000)
+        batch = inc.add(new_embeddings, ids=new_question_ids)
+        inc.save_state(os.path.join(data_dir, "maize_incremental"))
+    """
+
+    def __init__(self, data_dir, topic, min_confidence=0.6, pool_threshold=5_000,
+                 hdbscan_params=None, n_neighbors=15, max_raw_distance=None):
+        self.model = TopicModel(data_dir, topic, n_neighbors=n_neighbors)
+        self.min_confidence = min_confidence
+        self.pool_threshold = pool_threshold
+        self.hdbscan_params = hdbscan_params
+        self.n_neighbors = n_neighbors
+
+        used = [self.model.labels.max()]
+        if getattr(self.model.clusterer, "labels_", None) is not None:
+            used.append(np.max(self.model.clusterer.labels_))
+        self.next_label = int(max(used)) + 1
+        self._raw_index = self._build_raw_index()
+        self.max_raw_distance = max_raw_distance if max_raw_distance is not None else self._raw_radius()
+
+        # Every question added so far, in order
+        self._reset_buffers()
+        self._new_since_recluster = 0
+
+        # Members of clusters created here, searched alongside the saved topic
+        # (UMAP space) and on their own for novel points (original space)
+        self._new_index = None
+        self._new_raw_index = None
+        self._new_members = np.empty(0, dtype=np.int64)
+
+    def _reset_buffers(self, ids=None, points=None, raw=None, labels=None, confidence=None, in_pool=None,
+                       new_cluster=None):
+        self._buffers = {
+            "ids": _GrowableArray(object, values=ids),
+            "points": _GrowableArray(np.float32, self.model.umap_embedding.shape[1], values=points),
+            "raw": _GrowableArray(np.float32, values=raw),
+            "labels": _GrowableArray(np.int64, values=labels),
+            "confidence": _GrowableArray(np.float64, values=confidence),
+            "in_pool": _GrowableArray(bool, values=in_pool),
+            "new_cluster": _GrowableArray(bool, values=new_cluster),  # member of a cluster created here
+        }
+
+    @property
+    def _ids(self):
+        return self._buffers["ids"].values
+
+    @property
+    def _points(self):
+        return self._buffers["points"].values
+
+    @property
+    def _raw(self):
+        return self._buffers["raw"].values if len(self._buffers["raw"]) else None
+
+    @property
+    def _labels(self):
+        return self._buffers["labels"].values
+
+    @property
+    def _confidence(self):
+        return self._buffers["confidence"].values
+
+    @property
+    def _in_pool(self):
+        return self._buffers["in_pool"].values
+
+    def __len__(self):
+        return len(self._buffers["ids"])
+
+    @property
+    def pool_size(self):
+        return int(self._in_pool.sum())
+
+    # ---- Novelty in the original embedding space -------------------------
+
+    def _build_raw_index(self):
+        """
+        Index over UMAP's training embeddings, for when UMAP kept no search
+        index of its own (small topics, or a fit on a precomputed kNN graph).
+        Cosine distances are searched as euclidean distances between unit
+        vectors, which a ball tree supports.
+        """
+        reducer = self.model.reducer
+        if getattr(reducer, "_knn_search_index", None) is not None:
+            return None
+        raw = np.asarray(reducer._raw_data, dtype=np.float32)
+        if reducer.metric == 'cosine':
+            return NearestNeighbors(algorithm='ball_tree').fit(_unit_rows(raw))
+        return NearestNeighbors(metric=reducer.metric).fit(raw)
+
+    def _raw_kneighbors(self, X, k):
+        """Distances to the k nearest training questions in UMAP's input metric (no search index)."""
+        if self.model.reducer.metric == 'cosine':
+            dists, _ = self._raw_index.kneighbors(_unit_rows(X), n_neighbors=k)
+            return dists ** 2 / 2  # |a - b|^2 = 2 - 2 cos for unit vectors
+        return self._raw_index.kneighbors(X, n_neighbors=k)[0]
+
+    def _raw_radius(self):
+        """99th percentile of the distance from a training question to its n_neighbors-th neighbour."""
+        reducer = self.model.reducer
+        if getattr(reducer, "_knn_dists", None) is not None:
+            return float(np.percentile(reducer._knn_dists[:, -1], 99))
+
+        # No neighbour graph kept: query a sample of the training questions
+        raw = np.asarray(reducer._raw_data, dtype=np.float32)
+        sample = raw
+        if len(raw) > 2_000:
+            sample = raw[np.random.RandomState(42).choice(len(raw), 2_000, replace=False)]
+        k = min(reducer.n_neighbors, len(raw) - 1)
+        return float(np.percentile(self._raw_kneighbors(sample, k + 1)[:, k], 99))
+
+    def _raw_nearest_distance(self, embeddings):
+        """Distance from each point to its nearest training question, in the UMAP input metric."""
+        reducer = self.model.reducer
+        X = np.asarray(embeddings, dtype=np.float32)
+        if self._raw_index is None:
+            return reducer._knn_search_index.query(X, k=1)[1][:, 0]
+        return self._raw_kneighbors(X, 1)[:, 0]
+
+    # ---- Assignment -------------------------------------------------------
+
+    def _assign(self, umap_points):
+        k = self.n_neighbors
+        dists, idx = self.model._index.kneighbors(umap_points)
+        neighbour_labels = self.model._classes[self.model._exemplar_codes[idx]]
+
+        if self._new_index is not None:
+            new_dists, new_idx = self._new_index.kneighbors(
+                umap_points, n_neighbors=min(k, len(self._new_members)))
+            dists = np.hstack([dists, new_dists])
+            neighbour_labels = np.hstack([neighbour_labels, self._labels[self._new_members][new_idx]])
+
+            # k nearest over the saved and new exemplars together
+            order = np.argsort(dists, axis=1, kind="stable")[:, :k]
+            dists = np.take_along_axis(dists, order, axis=1)
+            neighbour_labels = np.take_along_axis(neighbour_labels, order, axis=1)
+
+        return _neighbour_vote(dists, neighbour_labels, self.model.max_distance)
+
+    def _assign_novel(self, embeddings):
+        """Vote of the new clusters' members in the original embedding space."""
+        if self._new_raw_index is None:
+            return np.full(len(embeddings), -1), np.zeros(len(embeddings))
+        dists, idx = self._new_raw_index.kneighbors(
+            embeddings, n_neighbors=min(self.n_neighbors, len(self._new_members)))
+        return _neighbour_vote(dists, self._labels[self._new_members][idx], self.max_raw_distance)
+
+    def _index_new_members(self):
+        self._new_index = NearestNeighbors(n_neighbors=self.n_neighbors).fit(self._points[self._new_members])
+        self._new_raw_index = NearestNeighbors(n_neighbors=self.n_neighbors, metric=self.model.reducer.metric)
+        self._new_raw_index.fit(self._raw[self._new_members])
+
+    def add(self, embeddings, ids=None):
+        """
+        Assign a batch of sentence embeddings (384-dim, as for predict_clusters).
+
+        Returns a DataFrame for the batch with 'id', 'cluster', 'confidence',
+        'meta_label' (NaN for new clusters) and 'status' ('assigned', 'new_cluster'
+        or 'pending' for points waiting in the residual pool).
+        """
+        embeddings = self.model.project(embeddings)  # the space UMAP and the novelty check use
+        umap_points = self.model.reducer.transform(embeddings).astype(np.float32)
+        n = len(umap_points)
+        start = len(self._ids)
+        ids = np.arange(start, start + n) if ids is None else np.asarray(ids)
+
+        labels, confidence = self._assign(umap_points)
+        novel = self._raw_nearest_distance(embeddings) > self.max_raw_distance
+        if novel.any():
+            labels[novel], confidence[novel] = self._assign_novel(embeddings[novel])
+        residual = (labels == -1) | (confidence < self.min_confidence)
+        labels = np.where(residual, -1, labels)
+
+        for name, values in (("ids", ids.astype(object)), ("points", umap_points), ("raw", embeddings),
+                             ("labels", labels), ("confidence", confidence), ("in_pool", residual),
+                             ("new_cluster", np.zeros(n, dtype=bool))):
+            self._buffers[name].append(values)
+        self._new_since_recluster += int(residual.sum())
+
+        print(f"Assigned {n - residual.sum():,} / {n:,} questions; residual pool: {self.pool_size:,}")
+        if self._new_since_recluster >= self.pool_threshold:
+            self.recluster_residual()
+
+        # The batch's rows as they are now (a re-clustering may have just placed some)
+        return self._frame(slice(start, start + n))
+
+    # ---- Residual pool ----------------------------------------------------
+
+    def recluster_residual(self):
+        """
+        Re-cluster the residual pool in the topic's UMAP space. Returns the
+        number of new clusters.
+        """
+        from clustering_analysis import recluster_noise
+
+        pool = np.flatnonzero(self._in_pool)
+        self._new_since_recluster = 0
+        min_cluster_size = (self.hdbscan_params or {}).get("min_cluster_size", 50)
+        if len(pool) < max(min_cluster_size, 2):
+            return 0
+
+        new_labels, _ = recluster_noise(
+            self._points[pool], np.full(len(pool), -1), self.hdbscan_params,
+            label_offset=self.next_label
+        )
+        found = new_labels != -1
+        n_new = len(np.unique(new_labels[found]))
+        if n_new == 0:
+            return 0
+
+        members = pool[found]
+        self._labels[members] = new_labels[found]
+        self._confidence[members] = 1.0
+        self._in_pool[members] = False
+        self.next_label = int(new_labels.max()) + 1
+
+        self._buffers["new_cluster"].values[members] = True
+        self._new_members = np.concatenate([self._new_members, members])
+        self._index_new_members()
+        return n_new
+
+    # ---- Results ----------------------------------------------------------
+
+    def _frame(self, rows):
+        """Assignments of the added questions in `rows` (a slice)."""
+        labels = self._labels[rows]
+        status = np.where(self._in_pool[rows], "pending", "assigned").astype(object)
+        status[self._buffers["new_cluster"].values[rows]] = "new_cluster"
+
+        df = pd.DataFrame({'id': self._ids[rows], 'cluster': labels,
+                           'confidence': self._confidence[rows], 'status': status})
+        meta = self.model.meta_labels(labels)
+        if meta is not None:
+            df.insert(3, 'meta_label', meta)
+        return df
+
+    def assignments(self):
+        """Current cluster of every question added so far."""
+        return self._frame(slice(None))
+
+    # ---- Persistence ------------------------------------------------------
+
+    def save_state(self, path):
+        """Write the added questions (UMAP and original embeddings), their labels and the pool to `path` (a folder)."""
+        os.makedirs(path, exist_ok=True)
+        np.savez(os.path.join(path, "incremental_state.npz"),
+                 ids=self._ids.astype(str) if len(self._ids) else np.empty(0, dtype=str),
+                 points=self._points, raw=self._raw if self._raw is not None else np.empty((0, 0)),
+                 labels=self._labels, confidence=self._confidence,
+                 in_pool=self._in_pool, new_members=self._new_members)
+        with open(os.path.join(path, "incremental_state.json"), "w") as f:
+            json.dump({"topic": self.model.topic, "next_label": self.next_label,
+                       "new_since_recluster": self._new_since_recluster}, f, indent=2)
+
+    def load_state(self, path):
+        """Restore a state written by save_state (ids come back as strings). Returns self."""
+        with open(os.path.join(path, "incremental_state.json")) as f:
+            meta = json.load(f)
+        if meta["topic"] != self.model.topic:
+            raise ValueError(f"{path} holds state for topic '{meta['topic']}', not '{self.model.topic}'.")
+
+        state = np.load(os.path.join(path, "incremental_state.npz"))
+        new_cluster = np.zeros(len(state["ids"]), dtype=bool)
+        new_cluster[state["new_members"]] = True
+        self._reset_buffers(ids=state["ids"].astype(object), points=state["points"],
+                            raw=state["raw"] if len(state["raw"]) else None, labels=state["labels"],
+                            confidence=state["confidence"], in_pool=state["in_pool"], new_cluster=new_cluster)
+        self._new_members = state["new_members"]
+        self.next_label = meta["next_label"]
+        self._new_since_recluster = meta["new_since_recluster"]
+        self._new_index = self._new_raw_index = None
+        if len(self._new_members):
+            self._index_new_members()
+        return self
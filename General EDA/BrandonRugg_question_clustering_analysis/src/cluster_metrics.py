@@ -0,0 +1,378 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import minimum_spanning_tree
+from scipy.special import logsumexp
+from sklearn.metrics import pairwise_distances
+
+# -------------------------------------------------------------------
+# Cluster quality metrics that scale to the full topic
+# -------------------------------------------------------------------
+
+def _chunk_rows(n_cols, working_memory):
+    """Rows per chunk so that a (rows, n_cols) float64 block fits in working_memory MB."""
+    return max(1, int(working_memory * 2**20 // (8 * max(n_cols, 1))))
+
+
+def effective_n_jobs(n_jobs):
+    """
+    Worker count for an n_jobs argument, as joblib reads it: None means all
+    cores, -1 all cores, -2 all but one, and so on (never below 1).
+    """
+    cores = os.cpu_count() or 1
+    if n_jobs is None or n_jobs == 0:
+        return cores
+    if n_jobs < 0:
+        return max(1, cores + 1 + n_jobs)
+    return int(n_jobs)
+
+
+def _map_chunks(func, n_rows, chunk_size, n_jobs):
+    """Run func(start, stop) over row chunks in a thread pool (numpy/BLAS release the GIL)."""
+    bounds = [(start, min(start + chunk_size, n_rows)) for start in range(0, n_rows, chunk_size)]
+    n_jobs = effective_n_jobs(n_jobs)
+    if n_jobs == 1 or len(bounds) <= 1:
+        return [func(start, stop) for start, stop in bounds]
+    with ThreadPoolExecutor(max_workers=min(n_jobs, len(bounds))) as executor:
+        return list(executor.map(lambda b: func(*b), bounds))
+
+
+def stratified_sample(labels, sample_size, min_per_cluster=10, random_state=42):
+    """
+    Seeded sample of point indices with every cluster represented: each
+    cluster gets a share proportional to its size, but at least
+    min_per_cluster points (or all of them if it is smaller). The result can
+    slightly exceed sample_size when many clusters are topped up.
+
+    Returns sorted indices into labels.
+    """
+    labels = np.asarray(labels)
+    if sample_size is None or sample_size >= len(labels):
+        return np.arange(len(labels))
+
+    codes, uniques = pd.factorize(labels, sort=True)
+    sizes = np.bincount(codes, minlength=len(uniques))
+    alloc = np.floor(sizes * sample_size / len(labels)).astype(np.int64)
+    alloc = np.minimum(np.maximum(alloc, min_per_cluster), sizes)
+
+    # Shuffle, regroup by cluster (stable), keep the first alloc[c] of each group
+    rng = np.random.default_rng(random_state)
+    perm = rng.permutation(len(labels))
+    perm = perm[np.argsort(codes[perm], kind="stable")]
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    rank = np.arange(len(perm)) - np.repeat(starts, sizes)
+    return np.sort(perm[rank < np.repeat(alloc, sizes)])
+
+
+# -------------------------------------------------------------------
+# Silhouette
+# -------------------------------------------------------------------
+
+def silhouette_values(X, labels, metric='cosine', sample_idx=None, n_jobs=None, working_memory=256):
+    """
+    Exact silhouette of each point in sample_idx (default: every point),
+    measured against all points in X, without an n x n distance matrix.
+
+    Per-cluster distance sums are all that is needed:
+      - metric='cosine': the sum of cosine distances from x to a cluster is
+        size - x . (sum of the cluster's unit vectors), so the whole
+        computation is O(n * n_clusters * dim).
+      - other metrics: distances are computed in row chunks of at most
+        `working_memory` MB and summed per cluster with a sparse indicator
+        product, across n_jobs threads.
+
+    Matches sklearn.metrics.silhouette_samples when sample_idx is None
+    (singleton clusters score 0).
+
+    Args:
+        X: (n, d) points (e.g. the UMAP embeddings), noise already removed.
+        labels: (n,) cluster labels.
+        metric (str): 'cosine' or any sklearn pairwise_distances metric.
+        sample_idx (optional): Indices of the points to score, e.g. from stratified_sample.
+
+    Returns an array of silhouette values, one per scored point.
+    """
+    X = np.asarray(X)
+    codes, uniques = pd.factorize(np.asarray(labels), sort=True)
+    n, k = len(codes), len(uniques)
+    if k < 2:
+        raise ValueError("Silhouette needs at least 2 clusters.")
+    sample_idx = np.arange(n) if sample_idx is None else np.asarray(sample_idx)
+    sizes = np.bincount(codes, minlength=k).astype(np.float64)
+
+    if metric == 'cosine':
+        X = X.astype(np.float64)
+        norms = np.linalg.norm(X, axis=1, keepdims=True)
+        U = X / np.where(norms == 0, 1, norms)
+        cluster_sums = np.zeros((k, U.shape[1]))
+        np.add.at(cluster_sums, codes, U)
+
+        def cluster_distance_sums(rows):
+            # Includes each point's distance to itself (1 - |u|^2), removed below
+            return sizes - U[rows] @ cluster_sums.T, 1 - np.einsum('ij,ij->i', U[rows], U[rows])
+        chunk_size = _chunk_rows(k, working_memory)
+    else:
+        indicator = sp.csr_matrix((np.ones(n), (np.arange(n), codes)), shape=(n, k))
+
+        def cluster_distance_sums(rows):
+            D = pairwise_distances(X[rows], X, metric=metric)
+            return np.asarray((indicator.T @ D.T).T), np.zeros(len(rows))
+        chunk_size = _chunk_rows(n, working_memory)
+
+    def score(start, stop):
+        rows = sample_idx[start:stop]
+        own = codes[rows]
+        sums, self_dist = cluster_distance_sums(rows)
+        sums = np.maximum(sums, 0)
+
+        own_size = sizes[own]
+        a = (sums[np.arange(len(rows)), own] - self_dist) / np.maximum(own_size - 1, 1)
+        mean_other = sums / sizes
+        mean_other[np.arange(len(rows)), own] = np.inf
+        b = mean_other.min(axis=1)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            s = (b - a) / np.maximum(a, b)
+        return np.where((own_size > 1) & np.isfinite(s), s, 0.0)
+
+    return np.concatenate(_map_chunks(score, len(sample_idx), chunk_size, n_jobs))
+
+
+# -------------------------------------------------------------------
+# Approximate density-based cluster validity (DBCV)
+# -------------------------------------------------------------------
+
+def _core_distances(D, dim):
+    """DBCV all-points core distance of each point, from its cluster's distance matrix (log-space)."""
+    m = len(D)
+    if m < 2:
+        return np.zeros(m)
+    off_diag = ~np.eye(m, dtype=bool)
+    log_inv = -np.log(np.maximum(D[off_diag].reshape(m, m - 1), 1e-12))
+    return np.exp(-(logsumexp(dim * log_inv, axis=1) - np.log(m - 1)) / dim)
+
+
+def _cluster_sparseness(D, core):
+    """Largest internal edge of the mutual reachability MST, and its internal nodes."""
+    m = len(D)
+    if m < 2:
+        return 0.0, np.ones(m, dtype=bool)
+    mreach = np.maximum(D, np.maximum.outer(core, core))
+    # The MST ignores zero weights, so duplicates get a tiny positive distance
+    mst = minimum_spanning_tree(np.maximum(mreach, 1e-12) * ~np.eye(m, dtype=bool)).tocoo()
+    degree = np.bincount(np.concatenate([mst.row, mst.col]), minlength=m)
+    internal = degree > 1
+    internal_edges = internal[mst.row] & internal[mst.col]
+    if not internal_edges.any():
+        return float(mst.data.max()), np.ones(m, dtype=bool)
+    return float(mst.data[internal_edges].max()), internal
+
+
+def approximate_dbcv(X, labels, metric='euclidean', max_points_per_cluster=200,
+                     random_state=42, n_jobs=None, working_memory=256):
+    """
+    Density-Based Clustering Validation (Moulavi et al., 2014) on a seeded
+    per-cluster sample, so the cost no longer grows with n^2.
+
+    For each cluster, at most max_points_per_cluster points are drawn. Core
+    distances, the mutual reachability MST (density sparseness) and the
+    minimum mutual reachability to other clusters (density separation) are
+    computed on those points only, across n_jobs threads.
+
+    Args:
+        X: (n, d) points, including noise.
+        labels: (n,) labels, -1 = noise. Noise lowers the score through the
+                cluster weights (cluster size / all points), as in DBCV.
+
+    Returns (dbcv, per_cluster) where per_cluster is a DataFrame with
+    cluster, sparseness, separation and validity (-1 to 1).
+    """
+    X = np.asarray(X)
+    labels = np.asarray(labels)
+    clustered = np.flatnonzero(labels != -1)
+    cluster_ids, counts = np.unique(labels[clustered], return_counts=True)
+    if len(cluster_ids) < 2:
+        raise ValueError("DBCV needs at least 2 clusters.")
+    dim = X.shape[1]
+
+    # Seeded sample of at most max_points_per_cluster points per cluster
+    rng = np.random.default_rng(random_state)
+    members = [np.flatnonzero(labels == c) for c in cluster_ids]
+    members = [m if len(m) <= max_points_per_cluster
+               else np.sort(rng.choice(m, max_points_per_cluster, replace=False)) for m in members]
+
+    def within(i):
+        D = pairwise_distances(X[members[i]], metric=metric)
+        core = _core_distances(D, dim)
+        sparseness, internal = _cluster_sparseness(D, core)
+        return core, sparseness, internal
+
+    n_jobs = effective_n_jobs(n_jobs)
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        per_cluster = list(executor.map(within, range(len(cluster_ids))))
+
+    # Separation: minimum mutual reachability between internal nodes of different clusters
+    points = np.concatenate([m[internal] for m, (_, _, internal) in zip(members, per_cluster)])
+    point_core = np.concatenate([core[internal] for core, _, internal in per_cluster])
+    point_cluster = np.concatenate([np.full(internal.sum(), i)
+                                    for i, (_, _, internal) in enumerate(per_cluster)])
+    P = X[points]
+
+    def nearest_other(start, stop):
+        D = pairwise_distances(P[start:stop], P, metric=metric)
+        mreach = np.maximum(D, np.maximum.outer(point_core[start:stop], point_core))
+        mreach[point_cluster[start:stop, None] == point_cluster[None, :]] = np.inf
+        return mreach.min(axis=1)
+
+    point_sep = np.concatenate(_map_chunks(nearest_other, len(P), _chunk_rows(len(P), working_memory), n_jobs))
+    separation = np.full(len(cluster_ids), np.inf)
+    np.minimum.at(separation, point_cluster, point_sep)
+
+    sparseness = np.array([s for _, s, _ in per_cluster])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        validity = (separation - sparseness) / np.maximum(separation, sparseness)
+    validity = np.nan_to_num(validity)
+
+    dbcv = float(np.sum(counts / len(labels) * validity))
+    table = pd.DataFrame({'cluster': cluster_ids, 'sparseness': sparseness,
+                          'separation': separation, 'validity': validity})
+    return dbcv, table
+
+
+# -------------------------------------------------------------------
+# Per-cluster cohesion / separation
+# -------------------------------------------------------------------
+
+def cluster_cohesion_separation(X, labels, metric='cosine', n_jobs=None, working_memory=256):
+    """
+    Centroid-based cohesion and separation, O(n * n_clusters * dim).
+
+    cohesion:   mean distance from a cluster's points to its centroid (lower is tighter)
+    separation: distance from the centroid to the nearest other centroid
+
+    For metric='cosine' centroids are means of the unit vectors. Noise (-1) is skipped.
+    Returns a DataFrame with cluster, size, cohesion and separation.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    labels = np.asarray(labels)
+    mask = labels != -1
+    X, labels = X[mask], labels[mask]
+    if metric == 'cosine':
+        norms = np.linalg.norm(X, axis=1, keepdims=True)
+        X = X / np.where(norms == 0, 1, norms)
+
+    codes, uniques = pd.factorize(labels, sort=True)
+    sizes = np.bincount(codes, minlength=len(uniques))
+    centroids = np.zeros((len(uniques), X.shape[1]))
+    np.add.at(centroids, codes, X)
+    centroids /= sizes[:, None]
+
+    def to_own_centroid(start, stop):
+        D = pairwise_distances(X[start:stop], centroids, metric=metric)
+        return D[np.arange(stop - start), codes[start:stop]]
+
+    dists = np.concatenate(_map_chunks(to_own_centroid, len(X), _chunk_rows(len(uniques), working_memory), n_jobs))
+    cohesion = np.bincount(codes, weights=dists, minlength=len(uniques)) / sizes
+
+    centroid_dists = pairwise_distances(centroids, metric=metric)
+    np.fill_diagonal(centroid_dists, np.inf)
+
+    return pd.DataFrame({'cluster': uniques, 'size': sizes, 'cohesion': cohesion,
+                         'separation': centroid_dists.min(axis=1) if len(uniques) > 1 else np.nan})
+
+
+# -------------------------------------------------------------------
+# All metrics in one call
+# -------------------------------------------------------------------
+
+def evaluate_clusters(
+        X,
+        labels,
+        metric='cosine',
+        sample_size=None,
+        min_per_cluster=10,
+        dbcv=True,
+        dbcv_metric='euclidean',
+        dbcv_points_per_cluster=200,
+        random_state=42,
+        n_jobs=None,
+        working_memory=256
+    ):
+    """
+    Score a clustering (e.g. the UMAP embeddings and HDBSCAN labels).
+
+    Args:
+        X: (n, d) points, including noise.
+        labels: (n,) cluster labels, -1 = noise (excluded from silhouette and
+                cohesion/separation).
+        metric (str): Metric for silhouette and cohesion/separation.
+        sample_size (int, optional): Score the silhouette of a stratified,
+                                     seeded sample of this many clustered
+                                     points (against all clustered points).
+                                     None = every point.
+        dbcv (bool): Also compute approximate_dbcv.
+        dbcv_metric (str): Metric for DBCV; HDBSCAN's (euclidean) by default.
+
+    Returns a dict:
+        n_points, n_clusters, noise_ratio, n_scored,
+        silhouette (mean over scored points; None with < 2 clusters),
+        dbcv (None if skipped or < 2 clusters),
+        per_cluster (DataFrame: cluster, size, cohesion, separation,
+                     silhouette, and DBCV sparseness/separation/validity),
+        timings (seconds per metric and total)
+    """
+    t_start = time.time()
+    X = np.asarray(X)
+    labels = np.asarray(labels)
+    mask = labels != -1
+    n_clusters = len(np.unique(labels[mask]))
+
+    result = {
+        'n_points': len(labels),
+        'n_clusters': n_clusters,
+        'noise_ratio': float((~mask).mean()) if len(labels) else 0.0,
+        'n_scored': 0,
+        'silhouette': None,
+        'dbcv': None,
+        'per_cluster': None,
+        'timings': {},
+    }
+    if n_clusters < 2:
+        result['timings']['total'] = time.time() - t_start
+        return result
+
+    X_clustered, labels_clustered = X[mask], labels[mask]
+
+    t0 = time.time()
+    sample_idx = stratified_sample(labels_clustered, sample_size, min_per_cluster, random_state)
+    values = silhouette_values(X_clustered, labels_clustered, metric=metric, sample_idx=sample_idx,
+                               n_jobs=n_jobs, working_memory=working_memory)
+    result['silhouette'] = float(values.mean())
+    result['n_scored'] = len(sample_idx)
+    result['timings']['silhouette'] = time.time() - t0
+
+    t0 = time.time()
+    per_cluster = cluster_cohesion_separation(X, labels, metric=metric, n_jobs=n_jobs,
+                                              working_memory=working_memory)
+    sil = pd.Series(values).groupby(labels_clustered[sample_idx]).mean()
+    per_cluster['silhouette'] = per_cluster['cluster'].map(sil)
+    result['timings']['cohesion_separation'] = time.time() - t0
+
+    if dbcv:
+        t0 = time.time()
+        result['dbcv'], dbcv_table = approximate_dbcv(
+            X, labels, metric=dbcv_metric, max_points_per_cluster=dbcv_points_per_cluster,
+            random_state=random_state, n_jobs=n_jobs, working_memory=working_memory
+        )
+        per_cluster = per_cluster.merge(
+            dbcv_table.rename(columns={'separation': 'density_separation'}), on='cluster', how='left'
+        )
+        result['timings']['dbcv'] = time.time() - t0
+
+    result['per_cluster'] = per_cluster
+    result['timings']['total'] = time.time() - t_start
+    return result
@@ -0,0 +1,251 @@
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from artifact_store import fingerprint
+from instrumentation import tracer
+
+# -------------------------------------------------------------------
+# Representative questions per cluster: nearest the centroid + boundary
+# -------------------------------------------------------------------
+
+class ClusterRepresentatives:
+    """
+    Centroids of one clustering run and every member's distance to its
+    centroid, computed once in row chunks (X may be memory-mapped):
+
+        reps = cluster_representatives(umap_embeddings, labels)
+        reps.table(n_central=5, n_boundary=2)   # one row per chosen member
+
+    Central members are the k nearest to the centroid. Boundary members are
+    taken from the band between the `boundary_band` quantiles of distance
+    within the cluster (the far edge, without its most extreme outliers) by
+    farthest-point selection, so they are spread around the cluster rather
+    than all on one side.
+
+    Args:
+        X: (n, d) points the clusters live in: UMAP embeddings (metric
+           'euclidean') or sentence embeddings (metric 'cosine').
+        labels: (n,) cluster labels.
+        metric (str): 'euclidean' or 'cosine'.
+        exclude_noise (bool): Give cluster -1 no representatives.
+        chunk_size (int): Rows read from X at a time.
+    """
+
+    def __init__(self, X, labels, metric='euclidean', exclude_noise=True, chunk_size=100_000):
+        if metric not in ('euclidean', 'cosine'):
+            raise ValueError(f"Unsupported metric '{metric}'. Use 'euclidean' or 'cosine'.")
+        self._X = X
+        self._X_ref = None
+        self.metric = metric
+        self._tables = {}
+
+        labels = np.asarray(labels)
+        codes, self.cluster_ids = pd.factorize(labels, sort=True)
+        if exclude_noise and len(self.cluster_ids) and self.cluster_ids[0] == -1:
+            codes = codes - 1  # -1 becomes code -1, i.e. no cluster
+            self.cluster_ids = self.cluster_ids[1:]
+        self.codes = codes
+        n_clusters = len(self.cluster_ids)
+        members = codes >= 0
+        self.sizes = np.bincount(codes[members], minlength=n_clusters)
+
+        with tracer.stage("cluster_centroids", rows_in=len(labels)) as rec:
+            # Grouped sum as a sparse (clusters x rows) indicator product, a chunk of rows at a time
+            sums = np.zeros((n_clusters, X.shape[1]), dtype=np.float64)
+            for start in range(0, len(labels), chunk_size):
+                block, block_codes = self._rows(start, start + chunk_size), codes[start:start + chunk_size]
+                rows = np.flatnonzero(block_codes >= 0)
+                indicator = sp.csr_matrix((np.ones(len(rows)), (block_codes[rows], rows)),
+                                          shape=(n_clusters, len(block)))
+                sums += indicator @ block
+            self.centroids = (sums / np.maximum(self.sizes, 1)[:, None]).astype(np.float32)
+            if metric == 'cosine':
+                self.centroids /= np.maximum(np.linalg.norm(self.centroids, axis=1, keepdims=True), 1e-12)
+
+            self.distance = np.full(len(labels), np.nan, dtype=np.float32)
+            for start in range(0, len(labels), chunk_size):
+                block, block_codes = self._rows(start, start + chunk_size), codes[start:start + chunk_size]
+                rows = np.flatnonzero(block_codes >= 0)
+                self.distance[start + rows] = self._distance(block[rows], self.centroids[block_codes[rows]])
+            rec["rows_out"] = n_clusters
+
+        # Members grouped by cluster, nearest the centroid first
+        member_rows = np.flatnonzero(members)
+        self.order = member_rows[np.lexsort((self.distance[member_rows], codes[member_rows]))]
+        self.starts = np.concatenate([[0], np.cumsum(self.sizes)[:-1]]).astype(np.int64)
+
+    @property
+    def X(self):
+        if self._X_ref is None:
+            return self._X
+        X = self._X_ref()
+        if X is None:
+            raise ReferenceError("The embeddings these representatives were computed on no longer exist.")
+        return X
+
+    def _hold_weakly(self):
+        """Keep only a weak reference to X (for the cache, which must not keep X alive)."""
+        self._X_ref = weakref.ref(self._X)
+        self._X = None
+
+    def _rows(self, start, stop):
+        block = np.asarray(self.X[start:stop], dtype=np.float32)
+        if self.metric == 'cosine':
+            block = block / np.maximum(np.linalg.norm(block, axis=1, keepdims=True), 1e-12)
+        return block
+
+    def _distance(self, a, b):
+        """Row-wise distance between equally shaped arrays (rows already unit length for cosine)."""
+        if self.metric == 'cosine':
+            return 1 - (a * b).sum(axis=-1)
+        return np.linalg.norm(a - b, axis=-1)
+
+    # ---- Selection ----------------------------------------------------------
+    def central(self, k):
+        """(n_clusters, k) rows nearest each centroid, nearest first; -1 pads small clusters."""
+        ranks = np.arange(k)
+        valid = ranks[None, :] < self.sizes[:, None]
+        positions = np.minimum(self.starts[:, None] + ranks[None, :], max(len(self.order) - 1, 0))
+        return np.where(valid, self.order[positions] if len(self.order) else -1, -1)
+
+    def boundary(self, k, skip=0, boundary_band=(0.75, 0.95), pool=32):
+        """
+        (n_clusters, k) diverse members from the outer band of each cluster;
+        -1 pads clusters with too few members. The `skip` nearest members
+        (e.g. those already shown as central) are never chosen.
+
+        Up to `pool` candidates per cluster, evenly spaced by distance rank
+        within the band, are compared; the first pick is the farthest from
+        the centroid, each next one the farthest from those already picked.
+        All clusters are processed together.
+        """
+        n_clusters = len(self.sizes)
+        if k <= 0 or n_clusters == 0:
+            return np.full((n_clusters, max(k, 0)), -1)
+
+        lo = np.maximum(np.floor(self.sizes * boundary_band[0]), skip)
+        hi = np.maximum(np.ceil(self.sizes * boundary_band[1]) - 1, lo)
+        ranks = np.rint(lo[:, None] + (hi - lo)[:, None] * np.linspace(0, 1, pool)[None, :]).astype(np.int64)
+        ranks = np.minimum(ranks, self.sizes[:, None] - 1)
+        valid = (ranks >= skip) & (ranks >= 0)
+        # Drop repeated ranks (small clusters): keep the first occurrence in each row
+        valid[:, 1:] &= ranks[:, 1:] != ranks[:, :-1]
+        rows = np.where(valid, self.order[np.clip(self.starts[:, None] + ranks, 0, max(len(self.order) - 1, 0))], 0)
+
+        points = self._rows_at(rows.ravel()).reshape(n_clusters, pool, -1)
+        chosen = np.full((n_clusters, k), -1)
+        min_dist = np.where(valid, np.inf, -np.inf)
+        # First pick: the candidate farthest from the centroid (highest rank)
+        score = np.where(valid, ranks, -1)
+        for step in range(k):
+            if step:
+                score = np.where(valid, min_dist, -np.inf)
+            pick = np.argmax(score, axis=1)
+            has_pick = np.take_along_axis(valid, pick[:, None], axis=1)[:, 0]
+            chosen[:, step] = np.where(has_pick, rows[np.arange(n_clusters), pick], -1)
+            valid[np.arange(n_clusters), pick] = False
+
+            picked = points[np.arange(n_clusters), pick][:, None, :]
+            min_dist = np.minimum(min_dist, self._distance(points, picked))
+        return chosen
+
+    def _rows_at(self, rows):
+        order = np.argsort(rows, kind="stable")
+        block = np.asarray(self.X[rows[order]], dtype=np.float32)
+        if self.metric == 'cosine':
+            block = block / np.maximum(np.linalg.norm(block, axis=1, keepdims=True), 1e-12)
+        out = np.empty_like(block)
+        out[order] = block
+        return out
+
+    def table(self, n_central=5, n_boundary=0):
+        """
+        One row per chosen member: cluster, role ('central' or 'boundary'),
+        rank within its role, row (index into X/labels) and distance to the
+        centroid. Cached per (n_central, n_boundary).
+        """
+        key = (n_central, n_boundary)
+        if key not in self._tables:
+            with tracer.stage("cluster_representatives", rows_in=len(self.sizes)) as rec:
+                parts = []
+                for role, rows in (("central", self.central(n_central)),
+                                   ("boundary", self.boundary(n_boundary, skip=n_central))):
+                    cluster_idx, rank = np.nonzero(rows >= 0)
+                    picked = rows[cluster_idx, rank]
+                    parts.append(pd.DataFrame({
+                        "cluster": self.cluster_ids[cluster_idx],
+                        "role": role,
+                        "rank": rank,
+                        "row": picked,
+                        "distance": self.distance[picked],
+                    }))
+                table = pd.concat(parts, ignore_index=True)
+                self._tables[key] = table.sort_values(["cluster", "role", "rank"], ascending=[True, False, True],
+                                                      kind="stable").reset_index(drop=True)
+                rec["rows_out"] = len(self._tables[key])
+        return self._tables[key]
+
+    def examples(self, texts, n_central=5, n_boundary=0):
+        """
+        {cluster: (central texts, boundary texts)}; `texts` is aligned with
+        the rows of X (e.g. df['Q_basic_clean'].to_numpy()).
+        """
+        table = self.table(n_central, n_boundary)
+        texts = np.asarray(texts, dtype=object)
+        result = {c: ([], []) for c in self.cluster_ids.tolist()}
+        for cluster, role, row in zip(table["cluster"].tolist(), table["role"], table["row"]):
+            result[cluster][0 if role == "central" else 1].append(texts[row])
+        return result
+
+# -------------------------------------------------------------------
+# One computation per clustering run
+# -------------------------------------------------------------------
+
+_RUNS = OrderedDict()
+MAX_CACHED_RUNS = 4
+
+
+def _matrix_key(X):
+    """
+    Shape, dtype, data pointer and a hash of up to 256 evenly spaced rows:
+    cheap next to the representatives themselves, and it changes when X is
+    rebuilt or (in all but the rarest cases) edited in place.
+    """
+    rows = np.unique(np.linspace(0, max(len(X) - 1, 0), num=min(len(X), 256)).astype(np.int64))
+    pointer = X.__array_interface__["data"][0] if hasattr(X, "__array_interface__") else None
+    return tuple(X.shape), str(X.dtype), pointer, fingerprint(np.asarray(X[rows]))
+
+
+def cluster_representatives(X, labels, metric='euclidean', exclude_noise=True):
+    """
+    ClusterRepresentatives for (X, labels), reused while X is alive and
+    unchanged and the labels are the same. Repeated summaries, previews and
+    prompt exports of the same run then only pay for the selection itself.
+
+    The cache holds the last MAX_CACHED_RUNS runs and only a weak reference
+    to each X: an entry is dropped as soon as its X is garbage collected, so
+    the cache never keeps an embedding matrix in memory.
+    """
+    labels = np.asarray(labels)
+    key = (id(X), metric, exclude_noise)
+    check = (_matrix_key(X), fingerprint(labels))
+    entry = _RUNS.get(key)
+    if entry is not None and entry[0] == check:
+        _RUNS.move_to_end(key)
+        return entry[1]
+
+    reps = ClusterRepresentatives(X, labels, metric=metric, exclude_noise=exclude_noise)
+    try:
+        weakref.finalize(X, _RUNS.pop, key, None)
+    except TypeError:
+        return reps  # e.g. a list: nothing to tie the cache to
+    reps._hold_weakly()
+    _RUNS[key] = (check, reps)
+    _RUNS.move_to_end(key)
+    while len(_RUNS) > MAX_CACHED_RUNS:
+        _RUNS.popitem(last=False)
+    return reps
@@ -0,0 +1,269 @@
+import contextlib
+import io
+import mmap
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from cluster_metrics import effective_n_jobs
+from instrumentation import tracer
+
+# -------------------------------------------------------------------
+# Worker side: one subsample fit on a shared, read-only embedding matrix
+# -------------------------------------------------------------------
+
+_EMBEDDINGS = None
+MODES = ("subsample", "bootstrap", "full")
+
+
+def _shared_source(embeddings, tmp_dir):
+    """
+    (path, dtype, shape, offset) of a file the workers can memory-map.
+    A top-level np.memmap (e.g. EmbeddingStore.vectors() or np.load(...,
+    mmap_mode='r')) is shared as is; anything else is written once to tmp_dir.
+    """
+    if (isinstance(embeddings, np.memmap) and isinstance(embeddings.base, mmap.mmap)
+            and embeddings.filename and embeddings.flags.c_contiguous):
+        return str(embeddings.filename), embeddings.dtype.str, embeddings.shape, embeddings.offset
+
+    path = os.path.join(tmp_dir, "embeddings.f32")
+    shared = np.memmap(path, dtype=np.float32, mode="w+", shape=tuple(embeddings.shape))
+    for start in range(0, len(embeddings), 100_000):
+        shared[start:start + 100_000] = np.asarray(embeddings[start:start + 100_000], dtype=np.float32)
+    shared.flush()
+    return path, shared.dtype.str, shared.shape, 0
+
+
+def _init_worker(source, threads):
+    """Open the shared matrix read-only and cap this worker's BLAS/numba threads."""
+    global _EMBEDDINGS
+    path, dtype, shape, offset = source
+    _EMBEDDINGS = np.memmap(path, dtype=np.dtype(dtype), mode="r", shape=tuple(shape), offset=offset)
+
+    from threadpoolctl import threadpool_limits
+    import numba
+
+    _init_worker.limits = threadpool_limits(limits=threads)  # kept alive for the worker's lifetime
+    numba.set_num_threads(min(threads, numba.config.NUMBA_NUM_THREADS))
+
+
+def _run_rows(n_rows, mode, sample_fraction, seed):
+    """Sorted rows of one run: a subsample without replacement, or the distinct rows of a bootstrap draw."""
+    rng = np.random.RandomState(seed)
+    if mode == "bootstrap":
+        return np.unique(rng.randint(0, n_rows, size=n_rows))
+    if mode == "subsample":
+        return np.sort(rng.choice(n_rows, size=int(n_rows * sample_fraction), replace=False))
+    if mode == "full":
+        return np.arange(n_rows)
+    raise ValueError(f"Unknown mode '{mode}'. Use 'subsample', 'bootstrap' or 'full'.")
+
+
+def _fit_run(run_id, mode, sample_fraction, seed, umap_params, hdbscan_params):
+    """Cluster one run's rows; returns (run_id, labels, seconds)."""
+    from clustering_analysis import cluster_with_umap_hdbscan
+
+    t0 = time.time()
+    rows = _run_rows(len(_EMBEDDINGS), mode, sample_fraction, seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        result_df, _, _ = cluster_with_umap_hdbscan(
+            None, embeddings=np.asarray(_EMBEDDINGS[rows], dtype=np.float32),
+            umap_params={**umap_params, "random_state": seed}, hdbscan_params=hdbscan_params,
+            random_state=seed, silhouette_sample=1_000)
+    return run_id, result_df["cluster"].to_numpy().astype(np.int32), time.time() - t0
+
+# -------------------------------------------------------------------
+# Matching clusters across runs
+# -------------------------------------------------------------------
+
+def match_clusters(reference_labels, rows, run_labels):
+    """
+    Jaccard similarity of member sets between reference clusters and the
+    clusters of one run that saw only `rows`. Reference clusters are compared
+    on their members among `rows`; noise (-1) is ignored on both sides.
+
+    Returns:
+        best_jaccard: (n_reference_clusters,) best match of each reference
+                      cluster (reference labels 0..n-1), 0 if none overlaps
+        run_to_reference: {run cluster: (reference cluster, jaccard)} for the
+                          reference cluster each run cluster overlaps most
+    """
+    n_ref = int(reference_labels.max()) + 1 if len(reference_labels) else 0
+    ref = reference_labels[rows]
+    run_ids, run_codes = np.unique(run_labels, return_inverse=True)
+    run_codes = np.where(run_labels == -1, -1, run_codes - int(run_ids[0] == -1))
+    run_ids = run_ids[run_ids != -1]
+
+    both = (ref != -1) & (run_codes != -1)
+    inter = sp.coo_matrix((np.ones(int(both.sum()), dtype=np.int64), (ref[both], run_codes[both])),
+                          shape=(n_ref, len(run_ids))).tocsr().tocoo()  # duplicates summed
+    ref_sizes = np.bincount(ref[ref != -1], minlength=n_ref)
+    run_sizes = np.bincount(run_codes[run_codes != -1], minlength=len(run_ids))
+    jaccard = inter.data / (ref_sizes[inter.row] + run_sizes[inter.col] - inter.data)
+
+    best_jaccard = np.zeros(n_ref)
+    np.maximum.at(best_jaccard, inter.row, jaccard)
+
+    # Most similar reference cluster of each run cluster
+    order = np.lexsort((-jaccard, inter.col))
+    first = order[np.r_[True, inter.col[order][1:] != inter.col[order][:-1]]] if len(order) else order
+    run_to_reference = {int(run_ids[inter.col[i]]): (int(inter.row[i]), float(jaccard[i])) for i in first}
+    return best_jaccard, run_to_reference
+
+# -------------------------------------------------------------------
+# Parallel stability analysis
+# -------------------------------------------------------------------
+
+def cluster_stability(
+        embeddings,
+        reference_labels=None,
+        n_runs=10,
+        mode="subsample",
+        sample_fraction=0.8,
+        umap_params=None,
+        hdbscan_params=None,
+        n_jobs=None,
+        min_jaccard=0.5,
+        min_agreement=0.5,
+        random_state=42
+    ):
+    """
+    How stable is each cluster? Re-cluster `n_runs` subsamples (or
+    bootstrap draws) of the embeddings in a process pool and match every
+    run's clusters to the reference clusters by Jaccard similarity of their
+    member sets (the clusterboot approach).
+
+    Workers memory-map one read-only copy of the embedding matrix (an
+    EmbeddingStore/np.load memmap is used in place, anything else is written
+    to a temporary file once) and each reads only its own rows. UMAP runs
+    single-threaded when seeded, so the runs are spread over the cores
+    rather than each using them in turn; BLAS and numba threads are capped at
+    cores / n_jobs per worker. Each worker holds one run's rows in memory.
+
+    Args:
+        embeddings: (n, dim) matrix, e.g. EmbeddingStore.vectors().
+        reference_labels: Labels of an existing run on all n rows (e.g.
+                          result_df['cluster']). If None, a run on all rows
+                          with seed `random_state` is added to the pool.
+        n_runs (int): Subsample / bootstrap fits.
+        mode (str): 'subsample' (sample_fraction of the rows, no
+                    replacement) or 'bootstrap' (the distinct rows of an n-row
+                    draw with replacement, about 63%; duplicates would distort
+                    HDBSCAN's densities) or 'full' (every row, only the seed
+                    changes).
+        umap_params, hdbscan_params: As for cluster_with_umap_hdbscan. Each run
+                                     uses its own seed.
+        n_jobs (int): Worker processes, at most n_runs (default or -1: one per
+                      core; -2: all cores but one, and so on).
+        min_jaccard (float): A reference cluster counts as recovered in a run,
+                             and a run cluster votes for it in the consensus,
+                             at this Jaccard similarity or above.
+        min_agreement (float): Share of a point's runs that must agree on its
+                               consensus cluster; below it the point is noise.
+
+    Returns:
+        stability: DataFrame per reference cluster: cluster, size,
+                   stability (mean best Jaccard over runs), jaccard_min,
+                   jaccard_std, recovered (share of runs >= min_jaccard)
+        consensus: DataFrame per row: reference label, consensus_label,
+                   agreement (share of the point's runs voting for it),
+                   n_runs (runs that sampled the point)
+        runs: DataFrame per run: run, seed, rows, n_clusters, noise_ratio, seconds
+    """
+    n_rows = len(embeddings)
+    # Checked here: a bad argument would otherwise only fail after every run has finished
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{mode}'. Use 'subsample', 'bootstrap' or 'full'.")
+    if mode == "subsample" and not 0 < sample_fraction <= 1:
+        raise ValueError(f"sample_fraction must be in (0, 1], got {sample_fraction}.")
+    if reference_labels is not None and len(reference_labels) != n_rows:
+        raise ValueError(
+            f"reference_labels has {len(reference_labels):,} labels but embeddings has {n_rows:,} rows. For a "
+            "sampled run, pass the embeddings of the clustered rows (e.g. embeddings[result_df['row_id']]).")
+
+    if umap_params is None:
+        umap_params = dict(n_neighbors=30, n_components=5, metric='cosine')
+    seeds = np.random.RandomState(random_state).randint(0, 2**31 - 1, size=n_runs).tolist()
+    tasks = [(run_id, mode, sample_fraction, seed) for run_id, seed in enumerate(seeds)]
+    if reference_labels is None:
+        tasks.insert(0, ("reference", "full", 1.0, random_state))
+
+    n_cores = os.cpu_count() or 1
+    n_jobs = min(effective_n_jobs(n_jobs), len(tasks))
+    threads = max(1, n_cores // n_jobs)
+
+    results, seconds = {}, {}
+    with tracer.stage("cluster_stability", rows_in=n_rows, n_runs=n_runs, n_jobs=n_jobs) as rec, \
+            tempfile.TemporaryDirectory(prefix="cluster_stability_") as tmp_dir:
+        source = _shared_source(embeddings, tmp_dir)
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=mp.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(source, threads)) as pool:
+            futures = [pool.submit(_fit_run, *task, umap_params, hdbscan_params) for task in tasks]
+            for future in as_completed(futures):
+                run_id, labels, run_seconds = future.result()
+                results[run_id], seconds[run_id] = labels, run_seconds
+                print(f"Run {run_id}: {len(set(labels.tolist()) - {-1})} clusters in {run_seconds:.1f}s")
+        rec["rows_out"] = n_runs
+
+    print(f"{len(tasks)} runs on {n_jobs} workers in {rec['wall_seconds']:.1f}s "
+          f"({sum(seconds.values()) / rec['wall_seconds']:.1f}x the back-to-back time)")
+
+    # ---- Reference labels as 0..n_clusters-1 ------------------------------
+    reference = np.asarray(results.pop("reference") if reference_labels is None else reference_labels)
+    ref_ids, ref_codes = np.unique(reference, return_inverse=True)
+    ref_codes = np.where(reference == -1, -1, ref_codes - int(ref_ids[0] == -1))
+    ref_ids = ref_ids[ref_ids != -1]
+    n_ref = len(ref_ids)
+
+    # ---- Match each run, collect consensus votes (column 0 = noise) ------
+    best = np.zeros((n_runs, n_ref))
+    vote_rows, vote_cols, run_stats = [], [], []
+    for run_id, seed in enumerate(seeds):
+        rows = _run_rows(n_rows, mode, sample_fraction, seed)
+        labels = results[run_id]
+        best[run_id], run_to_reference = match_clusters(ref_codes, rows, labels)
+
+        lookup = np.zeros(int(labels.max()) + 2, dtype=np.int64)  # index label + 1; noise -> 0
+        for run_cluster, (ref_cluster, jaccard) in run_to_reference.items():
+            if jaccard >= min_jaccard:
+                lookup[run_cluster + 1] = ref_cluster + 1
+        vote_rows.append(rows)
+        vote_cols.append(lookup[labels + 1])
+        run_stats.append({"run": run_id, "seed": seed, "rows": len(rows),
+                          "n_clusters": len(set(labels.tolist()) - {-1}),
+                          "noise_ratio": float((labels == -1).mean()), "seconds": seconds[run_id]})
+
+    stability = pd.DataFrame({
+        "cluster": ref_ids,
+        "size": np.bincount(ref_codes[ref_codes != -1], minlength=n_ref),
+        "stability": best.mean(axis=0),
+        "jaccard_min": best.min(axis=0),
+        "jaccard_std": best.std(axis=0),
+        "recovered": (best >= min_jaccard).mean(axis=0),
+    })
+
+    with tracer.stage("consensus", rows_in=n_rows) as rec:
+        vote_rows = np.concatenate(vote_rows)
+        votes = sp.csr_matrix((np.ones(len(vote_rows), dtype=np.int32), (vote_rows, np.concatenate(vote_cols))),
+                              shape=(n_rows, n_ref + 1))
+        n_sampled = np.bincount(vote_rows, minlength=n_rows)
+        winner = np.asarray(votes.argmax(axis=1)).ravel()
+        agreement = np.asarray(votes.max(axis=1).toarray()).ravel() / np.maximum(n_sampled, 1)
+        consensus_codes = np.where((agreement >= min_agreement) & (n_sampled > 0), winner - 1, -1)
+        consensus = pd.DataFrame({
+            "reference": reference,
+            "consensus_label": np.where(consensus_codes >= 0, ref_ids[np.maximum(consensus_codes, 0)], -1),
+            "agreement": agreement,
+            "n_runs": n_sampled,
+        })
+        rec["rows_out"] = int((consensus_codes >= 0).sum())
+
+    print(f"Mean cluster stability: {stability['stability'].mean():.3f}; "
+          f"{(stability['stability'] < min_jaccard).sum()} of {n_ref} clusters below {min_jaccard}")
+    return stability, consensus, pd.DataFrame(run_stats)
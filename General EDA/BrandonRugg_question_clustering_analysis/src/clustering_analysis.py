@@ -1,103 +1,385 @@
 from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components, minimum_spanning_tree
 from sklearn.feature_extraction.text import TfidfVectorizer
 import umap
 from sklearn.cluster import HDBSCAN
-from sklearn.metrics import silhouette_score
+from sklearn.metrics import pairwise_distances
+from sklearn.neighbors import NearestNeighbors
 import time
+import json
+from pathlib import Path
+
+from cluster_metrics import evaluate_clusters
+from cluster_representatives import cluster_representatives
+from embedding_compression import CompressedEmbeddings, compress_embeddings
+from instrumentation import tracer
 
 # -------------------------------------------------------------------
 # UMAP + HDBSCAN clustering
 # -------------------------------------------------------------------
 
+def _select_rows(df, embeddings, row_ids, sample_size, knn_graph, random_state):
+    """
+    The rows cluster_with_umap_hdbscan clusters: result_df (the sampled rows of
+    df, or their row ids) and X, their float32 embedding matrix.
+    """
+    # ---- Sampling (by position, same rows as df.sample) -----------------
+    if embeddings is not None:
+        row_ids = np.arange(len(embeddings)) if row_ids is None else np.asarray(row_ids)
+        n_rows = len(row_ids)
+        if df is not None and len(df) != n_rows:
+            raise ValueError(f"df has {len(df)} rows but row_ids has {n_rows}.")
+        invalid = (row_ids < 0) | (row_ids >= len(embeddings))
+        if invalid.any():
+            raise ValueError(f"{int(invalid.sum()):,} row_ids are outside the {len(embeddings):,} embeddings "
+                             "(-1 from EmbeddingStore.lookup means the text was never encoded; "
+                             "run store.get_or_encode(...) first).")
+    elif df is not None:
+        n_rows = len(df)
+    else:
+        raise ValueError("Provide df with an 'embedding' column or an embeddings matrix.")
+
+    if sample_size is not None and sample_size < n_rows:
+        if knn_graph is not None:
+            raise ValueError("knn_graph covers every row; it cannot be used with sample_size.")
+        sample_idx = np.random.RandomState(random_state).choice(n_rows, size=sample_size, replace=False)
+    else:
+        sample_idx = None
+
+    # ---- Select rows (one copy of the sampled rows only) -----------------
+    with tracer.stage("select_rows", rows_in=n_rows) as rec:
+        if df is not None:
+            result_df = df.iloc[sample_idx] if sample_idx is not None else df.copy(deep=False)
+
+        if embeddings is not None:
+            sampled_ids = row_ids[sample_idx] if sample_idx is not None else row_ids
+            if df is None:
+                result_df = pd.DataFrame({"row_id": sampled_ids})
+
+            if np.array_equal(sampled_ids, np.arange(len(embeddings))):
+                X = embeddings  # full matrix in order: UMAP reads the memory map directly
+            else:
+                X = embeddings[sampled_ids]
+            X = np.asarray(X, dtype=np.float32)
+        else:
+            X = np.asarray(np.vstack(result_df["embedding"].to_numpy()), dtype=np.float32)
+        rec["rows_out"] = len(X)
+
+    return result_df, X
+
+
 def cluster_with_umap_hdbscan(
         df,
         sample_size=None,         # e.g. 100_000
         umap_params=None,
         hdbscan_params=None,
         random_state=42,
-        silhouette_sample=10000   # number of points to subsample for silhouette
+        silhouette_sample=10000,  # clustered points to score for silhouette (None = all)
+        embeddings=None,          # (n, 384) float32 matrix, e.g. EmbeddingStore.vectors()
+        row_ids=None,             # row of `embeddings` for each row of df
+        knn_graph=None,           # (knn_indices, knn_dists) from build_knn_graph
+        compression=None,         # e.g. "float16", "int8", "pca64" (see compress_embeddings)
+        return_reducer=False,     # also return the fitted UMAP (for predict_clusters)
+        return_compressor=False,  # also return the compression the UMAP was fit behind
+        return_metrics=False      # also return the evaluate_clusters dict
     ):
     """
     Run UMAP + HDBSCAN on all data or a random sample.
 
+    Embeddings come either from df["embedding"] (one array per row) or, for
+    large topics, from a contiguous (memory-mapped) `embeddings` matrix. In the
+    second case `row_ids` maps each row of df to its row in the matrix
+    (defaults to 0..n-1), df may be None, and only the sampled rows are ever
+    read into memory.
+
+    A kNN graph from build_knn_graph/load_knn_graph (built over the same rows,
+    in the same order) skips UMAP's own neighbour search; it is truncated to
+    umap_params["n_neighbors"] and cannot be combined with sampling. (UMAP
+    cannot .transform() new points after fitting on a precomputed graph.)
+
+    `compression` compresses the selected rows before UMAP (see
+    embedding_compression.compare_compression for what each method changes).
+    `embeddings` may also be an already compressed matrix (CompressedEmbeddings).
+    Either way the reducer is fitted on the compressed vectors, so new
+    embeddings must be compressed the same way before UMAP.transform:
+    return_reducer=True then also requires return_compressor=True, and both
+    go to save_topic_files (TopicModel applies the compressor's project()).
+
+    Row selection, UMAP, HDBSCAN and the quality metrics are recorded as
+    stages on instrumentation.tracer.
+
     Returns:
-        result_df: copy of (subsampled) df with cluster labels
+        result_df: (subsampled) df with cluster labels. If df is None, a
+                   DataFrame with 'row_id' and 'cluster' columns.
         umap_embeddings: np.ndarray of reduced vectors
         clusterer: fitted HDBSCAN instance
-        silhouette: approximate silhouette score (excluding noise)
+        reducer: fitted UMAP instance (only if return_reducer=True)
+        compressor: CompressedEmbeddings.projector() of the compression used,
+                    or None (only if return_compressor=True)
+        metrics: evaluate_clusters result (only if return_metrics=True):
+                 silhouette, approximate DBCV, per-cluster scores and timings
     """
 
-    t0 = time.time()
+    compressor = embeddings if isinstance(embeddings, CompressedEmbeddings) else None
+    if return_reducer and (compressor is not None or compression is not None) and not return_compressor:
+        raise ValueError("The reducer is fit on compressed embeddings and cannot transform new ones without "
+                         "the compression: pass return_compressor=True (and save it with save_topic_files).")
+
+    with tracer.stage("cluster_with_umap_hdbscan") as run:
+        result_df, X = _select_rows(df, embeddings, row_ids, sample_size, knn_graph, random_state)
+        run["rows_in"] = len(X)
+
+        if compression is not None:
+            with tracer.stage("compress", rows_in=len(X), method=compression):
+                compressor = compress_embeddings(X, compression, random_state=random_state)
+                X = np.asarray(compressor)
+
+        # ---- Defaults ----------------------------------------------------
+        if umap_params is None:
+            umap_params = dict(
+                n_neighbors=30,
+                n_components=5,
+                metric='cosine',
+                random_state=random_state
+            )
 
-    # ---- Sampling --------------------------------------------------------
-    if sample_size is not None and sample_size < len(df):
-        sampled_df = df.sample(n=sample_size, random_state=random_state)
-    else:
-        sampled_df = df.copy()
-
-    # ---- Defaults --------------------------------------------------------
-    if umap_params is None:
-        umap_params = dict(
-            n_neighbors=30,
-            n_components=5,
-            metric='cosine',
-            random_state=random_state
-        )
-
-    if hdbscan_params is None:
-        hdbscan_params = dict(
-            min_cluster_size=250,
-            min_samples=10,
-            metric='euclidean',
-            cluster_selection_method='eom'
-        )
-
-    # ---- UMAP ------------------------------------------------------------
-    reducer = umap.UMAP(**umap_params)
-    X = np.vstack(sampled_df["embedding"].to_numpy()).astype("float32")
-    umap_embeddings = reducer.fit_transform(X)
-
-    # ---- HDBSCAN ---------------------------------------------------------
-    clusterer = HDBSCAN(**hdbscan_params)
-    labels = clusterer.fit_predict(umap_embeddings)
-
-    # ---- Attach results --------------------------------------------------
-    result_df = sampled_df.copy()
-    result_df["cluster"] = labels
+        if hdbscan_params is None:
+            hdbscan_params = dict(
+                min_cluster_size=250,
+                min_samples=10,
+                metric='euclidean',
+                cluster_selection_method='eom'
+            )
+
+        # ---- UMAP --------------------------------------------------------
+        with tracer.stage("umap", rows_in=len(X)):
+            if knn_graph is not None:
+                if len(knn_graph[0]) != len(X):
+                    raise ValueError(f"knn_graph has {len(knn_graph[0])} rows but the data has {len(X)}.")
+                n_neighbors = umap_params.get("n_neighbors", 15)
+                umap_params = {**umap_params, "precomputed_knn": truncate_knn_graph(knn_graph, n_neighbors)}
+
+            reducer = umap.UMAP(**umap_params)
+            umap_embeddings = reducer.fit_transform(X)
+
+        # ---- HDBSCAN -----------------------------------------------------
+        with tracer.stage("hdbscan", rows_in=len(X)) as rec:
+            clusterer = HDBSCAN(**hdbscan_params)
+            labels = clusterer.fit_predict(umap_embeddings)
+            rec["rows_out"] = int((labels != -1).sum())
+
+        # ---- Attach results ----------------------------------------------
+        result_df["cluster"] = labels
+        run["rows_out"] = rec["rows_out"]
 
     # ---- Diagnostics -----------------------------------------------------
     noise_ratio = (labels == -1).mean()
     n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
-    duration = time.time() - t0
 
-    print(f"Finished clustering in {duration:.1f} seconds")
+    print(f"Finished clustering in {run['wall_seconds']:.1f} seconds")
     print(f"Noise ratio: {noise_ratio:.2%}")
     print(f"Clusters found: {n_clusters}")
 
-    # ---- Approximate silhouette score -----------------------------------
-    labels_no_noise = labels[labels != -1]
-    emb_no_noise = umap_embeddings[labels != -1]
-    silhouette = None
-    if len(set(labels_no_noise)) > 1:
-        n_points = len(labels_no_noise)
-        if n_points > silhouette_sample:
-            # Subsample for speed
-            idx = np.random.choice(np.arange(n_points), size=silhouette_sample, replace=False)
-            silhouette = silhouette_score(emb_no_noise[idx], labels_no_noise[idx], metric='cosine')
-        else:
-            silhouette = silhouette_score(emb_no_noise, labels_no_noise, metric='cosine')
-        print(f"Approx. silhouette score (excluding noise): {silhouette:.3f}")
+    # ---- Cluster quality (seeded, stratified silhouette sample) ---------
+    with tracer.stage("cluster_metrics", rows_in=len(labels)):
+        metrics = evaluate_clusters(umap_embeddings, labels, metric='cosine',
+                                    sample_size=silhouette_sample, random_state=random_state)
+    if metrics['silhouette'] is not None:
+        print(f"Silhouette score (excluding noise, {metrics['n_scored']:,} points): {metrics['silhouette']:.3f}")
+        print(f"Approx. DBCV: {metrics['dbcv']:.3f}")
+
+    outputs = (result_df, umap_embeddings, clusterer)
+    if return_reducer:
+        outputs += (reducer,)
+    if return_compressor:
+        outputs += (compressor.projector() if compressor is not None else None,)
+    if return_metrics:
+        outputs += (metrics,)
+    return outputs
+
+# -------------------------------------------------------------------
+# Shared kNN graph for the clustering and 2D plotting UMAPs
+# -------------------------------------------------------------------
+
+def build_knn_graph(embeddings, n_neighbors=50, metric='cosine', random_state=42, n_jobs=-1):
+    """
+    Build an approximate kNN graph with the same NN-descent search UMAP runs
+    internally. Build it once with the largest n_neighbors you need (e.g. 50
+    for the 2D plot); smaller values are served by truncate_knn_graph.
+
+    Returns:
+        (knn_indices, knn_dists): arrays of shape (n, n_neighbors); each row
+                                  starts with the point itself.
+    """
+    # nearest_neighbors' numba code needs a writable array: copy read-only memmaps
+    # (np.load(..., mmap_mode='r'), EmbeddingStore.vectors())
+    X = np.require(embeddings, dtype=np.float32, requirements=["C", "W"])
+    angular = metric in ("cosine", "correlation")  # UMAP uses an angular forest for these
+
+    knn_indices, knn_dists, _ = umap.umap_.nearest_neighbors(
+        X, n_neighbors, metric, {}, angular,
+        np.random.RandomState(random_state),
+        low_memory=True, n_jobs=n_jobs
+    )
+    return knn_indices.astype(np.int32), knn_dists.astype(np.float32)
+
 
-    return result_df, umap_embeddings, clusterer
+def truncate_knn_graph(knn_graph, n_neighbors):
+    """
+    Return writable copies of the first n_neighbors columns of a kNN graph.
+    (UMAP edits the arrays it is given, so stored graphs are never passed directly.)
+    """
+    knn_indices, knn_dists = knn_graph[0], knn_graph[1]
+    if knn_indices.shape[1] < n_neighbors:
+        raise ValueError(f"Stored graph has {knn_indices.shape[1]} neighbours; {n_neighbors} requested.")
+    return (np.array(knn_indices[:, :n_neighbors], dtype=np.int32, order="C"),
+            np.array(knn_dists[:, :n_neighbors], dtype=np.float32, order="C"))
+
+
+def save_knn_graph(path, knn_graph, metric='cosine'):
+    """Save a kNN graph as .npy files in the folder `path`."""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    np.save(path / "knn_indices.npy", knn_graph[0])
+    np.save(path / "knn_dists.npy", knn_graph[1])
+    meta = {"n_rows": int(knn_graph[0].shape[0]), "n_neighbors": int(knn_graph[0].shape[1]), "metric": metric}
+    (path / "knn_meta.json").write_text(json.dumps(meta, indent=2))
+
+
+def load_knn_graph(path, n_neighbors=None):
+    """
+    Load a graph written by save_knn_graph, memory-mapped. If n_neighbors is
+    given, return a truncated in-memory copy instead.
+    """
+    path = Path(path)
+    knn_graph = (np.load(path / "knn_indices.npy", mmap_mode="r"),
+                 np.load(path / "knn_dists.npy", mmap_mode="r"))
+    if n_neighbors is not None:
+        return truncate_knn_graph(knn_graph, n_neighbors)
+    return knn_graph
+
+
+def umap_2d_projection(embeddings, knn_graph=None, n_neighbors=50, min_dist=0.1,
+                       metric='cosine', random_state=42):
+    """
+    2D UMAP used only for visualization. Pass the graph used for clustering
+    (built with at least n_neighbors) to skip the second neighbour search.
+    """
+    params = dict(n_components=2, n_neighbors=n_neighbors, min_dist=min_dist,
+                  metric=metric, random_state=random_state)
+    if knn_graph is not None:
+        params["precomputed_knn"] = truncate_knn_graph(knn_graph, n_neighbors)
+
+    return umap.UMAP(**params).fit_transform(np.asarray(embeddings, dtype=np.float32))
+
+# -------------------------------------------------------------------
+# Parameter sweep: UMAP once per setting, HDBSCAN grid in parallel
+# -------------------------------------------------------------------
+
+def _fit_hdbscan_config(umap_embeddings, hdbscan_params, silhouette_sample, random_state):
+    """Fit one HDBSCAN configuration and score it (runs in a worker process)."""
+    t0 = time.time()
+    labels = HDBSCAN(**hdbscan_params).fit_predict(umap_embeddings)
+    fit_seconds = time.time() - t0
+
+    # One thread per worker: the sweep already runs a process per configuration
+    metrics = evaluate_clusters(umap_embeddings, labels, metric='cosine', sample_size=silhouette_sample,
+                                random_state=random_state, n_jobs=1)
+
+    return {
+        'n_clusters': metrics['n_clusters'],
+        'noise_ratio': metrics['noise_ratio'],
+        'silhouette': metrics['silhouette'],
+        'dbcv': metrics['dbcv'],
+        'seconds': fit_seconds,
+        'metric_seconds': metrics['timings']['total'],
+    }
+
+
+def sweep_umap_hdbscan(
+        embeddings,
+        hdbscan_grid,
+        umap_grid=None,
+        knn_graph=None,
+        n_jobs=-1,
+        silhouette_sample=10000,
+        random_state=42
+    ):
+    """
+    Tune HDBSCAN without re-running UMAP for every configuration.
+
+    UMAP is fit once per entry of `umap_grid`; the reduced embeddings are then
+    shared read-only (memory-mapped by joblib) with a process pool that fits
+    every HDBSCAN configuration in parallel.
+
+    Args:
+        embeddings: (n, d) matrix (may be memory-mapped).
+        hdbscan_grid: dict of parameter -> list of values, e.g.
+                      {"min_cluster_size": [250, 500, 750], "min_samples": [5, 10]},
+                      or a list of such dicts (see sklearn's ParameterGrid).
+        umap_grid: list of umap_params dicts. Defaults to the
+                   cluster_with_umap_hdbscan defaults.
+        knn_graph: optional graph from build_knn_graph, reused by every UMAP fit.
+        n_jobs: worker processes for the HDBSCAN fits (-1 = all cores).
+
+    Returns:
+        results_df: one row per (umap_config, HDBSCAN config) with n_clusters,
+                    noise_ratio, silhouette (seeded stratified sample,
+                    excluding noise), approximate dbcv, seconds (HDBSCAN wall
+                    time), metric_seconds and umap_seconds
+        umap_embeddings: list of reduced embeddings, one per umap_grid entry
+    """
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import ParameterGrid
+
+    if umap_grid is None:
+        umap_grid = [dict(n_neighbors=30, n_components=5, metric='cosine', random_state=random_state)]
+
+    hdbscan_configs = [
+        {'metric': 'euclidean', 'cluster_selection_method': 'eom', **params}
+        for params in ParameterGrid(hdbscan_grid)
+    ]
+
+    X = np.asarray(embeddings, dtype=np.float32)
+    rows = []
+    reduced_all = []
+
+    for umap_config, umap_params in enumerate(umap_grid):
+        with tracer.stage("umap", rows_in=len(X), umap_config=umap_config) as rec:
+            params = dict(umap_params)
+            if knn_graph is not None:
+                params["precomputed_knn"] = truncate_knn_graph(knn_graph, params.get("n_neighbors", 15))
+            reduced = umap.UMAP(**params).fit_transform(X)
+        umap_seconds = rec["wall_seconds"]
+        reduced_all.append(reduced)
+        print(f"UMAP config {umap_config} {umap_params}: {umap_seconds:.1f} seconds, "
+              f"fitting {len(hdbscan_configs)} HDBSCAN configs")
+
+        # Worker processes do not report to the tracer: only wall time is recorded
+        with tracer.stage("hdbscan_grid", rows_in=len(X), umap_config=umap_config,
+                          n_configs=len(hdbscan_configs)):
+            scores = Parallel(n_jobs=n_jobs, max_nbytes='1M', mmap_mode='r')(
+                delayed(_fit_hdbscan_config)(reduced, hdbscan_params, silhouette_sample, random_state)
+                for hdbscan_params in hdbscan_configs
+            )
+
+        for hdbscan_params, score in zip(hdbscan_configs, scores):
+            rows.append({'umap_config': umap_config, **hdbscan_params, **score,
+                         'umap_seconds': umap_seconds})
+
+    return pd.DataFrame(rows), reduced_all
 
 # -------------------------------------------------------------------
 # Re-cluster members of noise cluster (-1) for re-integration with main clusters
 # -------------------------------------------------------------------
-def recluster_noise(umap_embeddings, labels, hdbscan_params=None):
+def recluster_noise(umap_embeddings, labels, hdbscan_params=None, label_offset=None):
     """
     Recluster noise points (-1) from a previous HDBSCAN run in the same UMAP space.
+    label_offset: first id for the new clusters (default labels.max() + 1), e.g.
+                  when labels only cover part of a topic (IncrementalClusterer).
     Returns: new labels (shifted to avoid collisions), HDBSCAN object
     """
     hdbscan_params = hdbscan_params or dict(min_cluster_size=50, min_samples=5, metric='euclidean', cluster_selection_method='eom')
@@ -105,12 +387,15 @@ def recluster_noise(umap_embeddings, labels, hdbscan_params=None):
     noise_mask = labels == -1
     noise_embeddings = umap_embeddings[noise_mask]
 
-    clusterer = HDBSCAN(**hdbscan_params)
-    noise_labels = clusterer.fit_predict(noise_embeddings)
+    with tracer.stage("recluster_noise", rows_in=len(noise_embeddings)) as rec:
+        clusterer = HDBSCAN(**hdbscan_params)
+        noise_labels = clusterer.fit_predict(noise_embeddings)
+        rec["rows_out"] = int((noise_labels != -1).sum())
 
     # Shift labels to avoid collisions with main clusters
-    max_label = labels.max()
-    noise_labels_shifted = np.where(noise_labels != -1, noise_labels + max_label + 1, -1)
+    if label_offset is None:
+        label_offset = labels.max() + 1
+    noise_labels_shifted = np.where(noise_labels != -1, noise_labels + label_offset, -1)
 
     # Output diagnostics
     noise_ratio = (noise_labels == -1).mean()
@@ -122,6 +407,189 @@ def recluster_noise(umap_embeddings, labels, hdbscan_params=None):
     return noise_labels_shifted, clusterer
 
 
+# -------------------------------------------------------------------
+# Multi-round noise reclustering on a shared kNN graph
+# -------------------------------------------------------------------
+
+def _connect_components(X, graph):
+    """
+    Join the connected components of a sparse kNN graph so HDBSCAN can run on
+    it. Components are linked along a minimum spanning tree of their
+    centroids, each link being the closest pair of points between the two
+    components (its true distance, so cluster stability is not distorted).
+    """
+    n_components, component = connected_components(graph, directed=False)
+    if n_components == 1:
+        return graph
+
+    sizes = np.bincount(component)
+    centroids = np.zeros((n_components, X.shape[1]))
+    np.add.at(centroids, component, X)
+    centroids /= sizes[:, None]
+    centroid_dists = np.maximum(pairwise_distances(centroids), 1e-12)
+    np.fill_diagonal(centroid_dists, 0)
+    tree = minimum_spanning_tree(centroid_dists).tocoo()
+
+    members = np.argsort(component, kind="stable")
+    starts = np.concatenate([[0], np.cumsum(sizes)])
+    rows, cols, dists = [], [], []
+    for a, b in zip(tree.row, tree.col):
+        points_a = members[starts[a]:starts[a + 1]]
+        points_b = members[starts[b]:starts[b + 1]]
+        if len(points_a) > len(points_b):
+            points_a, points_b = points_b, points_a
+        d, idx = NearestNeighbors(n_neighbors=1).fit(X[points_b]).kneighbors(X[points_a])
+        best = d[:, 0].argmin()
+        rows.append(points_a[best])
+        cols.append(points_b[idx[best, 0]])
+        dists.append(max(d[best, 0], 1e-12))
+
+    bridges = sp.csr_matrix((dists, (rows, cols)), shape=graph.shape)
+    return (graph + bridges + bridges.T).tocsr()
+
+
+def recluster_noise_rounds(
+        umap_embeddings,
+        labels,
+        schedule=None,
+        max_rounds=5,
+        min_gain=0.01,
+        n_neighbors=30,
+        label_offset=None
+    ):
+    """
+    Repeated recluster_noise: HDBSCAN is run on the points still labeled noise,
+    round after round, with one parameter set per round from `schedule` (the
+    last entry repeats). Stops after max_rounds, or once a round recovers less
+    than `min_gain` of all points (that round's clusters are kept).
+
+    The nearest neighbours of the noise points are searched once and reused:
+    each round HDBSCAN is fit on a sparse kNN distance graph (metric=
+    'precomputed') restricted to the remaining noise, and only points left
+    with too few neighbours are searched again. This replaces the dense
+    O(n^2) minimum spanning tree with one over the kNN graph, which gives
+    nearly the same clusters at a fraction of the cost. Disconnected parts of
+    the graph are joined by their closest pairs of points.
+
+    Args:
+        umap_embeddings: reduced embeddings of every point.
+        labels: cluster labels of every point (-1 = noise).
+        schedule (list of dict, optional): HDBSCAN min_cluster_size /
+            min_samples / cluster_selection_method per round. Defaults to
+            (50, 5), (30, 5), (20, 3).
+        max_rounds (int): Maximum number of rounds.
+        min_gain (float): Minimum share of all points a round must recover to continue.
+        n_neighbors (int): Neighbours kept per noise point (>= every min_samples).
+        label_offset (int, optional): First new cluster id (default labels.max() + 1).
+
+    Returns:
+        noise_labels: new labels for the original noise points, in order (as
+                      recluster_noise; -1 = still noise)
+        history: DataFrame with one row per round (params, noise before/after,
+                 clusters found, gain, knn/fit seconds)
+        lineage: DataFrame with one row per new cluster (round, size, params)
+    """
+    schedule = schedule or [
+        dict(min_cluster_size=50, min_samples=5),
+        dict(min_cluster_size=30, min_samples=5),
+        dict(min_cluster_size=20, min_samples=3),
+    ]
+    labels = np.asarray(labels)
+    next_label = labels.max() + 1 if label_offset is None else label_offset
+
+    noise_idx = np.flatnonzero(labels == -1)
+    X = np.asarray(umap_embeddings)[noise_idx]
+    n_neighbors = max(n_neighbors, *(p.get("min_samples", 5) for p in schedule))
+    noise_labels = np.full(len(noise_idx), -1)
+
+    # ---- Neighbours of every noise point, searched once ------------------
+    with tracer.stage("noise_knn", rows_in=len(X)) as rec:
+        k = min(n_neighbors, len(X) - 1)
+        knn_dists, knn_idx = NearestNeighbors(n_neighbors=k + 1).fit(X).kneighbors(X)
+        knn_dists, knn_idx = knn_dists[:, 1:], knn_idx[:, 1:]
+    knn_seconds = rec["wall_seconds"]
+
+    history, lineage = [], []
+    for round_num in range(1, max_rounds + 1):
+        t_round = time.time()
+        params = {'metric': 'euclidean', 'cluster_selection_method': 'eom',
+                  **schedule[min(round_num, len(schedule)) - 1]}
+        min_samples = params.get("min_samples") or params.get("min_cluster_size", 5)
+
+        active = np.flatnonzero(noise_labels == -1)
+        n_active = len(active)
+        if n_active <= max(params.get("min_cluster_size", 5), min_samples):
+            break
+
+        # ---- Restrict the shared graph to the remaining noise ------------
+        # The sparse HDBSCAN path counts min_samples without the point itself
+        fit_min_samples = max(min_samples - 1, 1)
+        with tracer.stage("noise_graph", rows_in=n_active, round=round_num) as graph_rec:
+            position = np.full(len(X), -1)
+            position[active] = np.arange(n_active)
+            nbr = position[knn_idx[active]]
+            keep = nbr != -1
+
+            # A point keeps its exact nearest remaining neighbours as long as
+            # enough of its shared list is left; otherwise search it again
+            short = np.flatnonzero(keep.sum(axis=1) < fit_min_samples)
+            keep[short] = False
+            rows = [np.repeat(np.arange(n_active), keep.sum(axis=1))]
+            cols = [nbr[keep]]
+            dists = [knn_dists[active][keep]]
+            if len(short):
+                k_round = min(k, n_active - 1)
+                d, i = NearestNeighbors(n_neighbors=k_round + 1).fit(X[active]).kneighbors(X[active[short]])
+                rows.append(np.repeat(short, k_round))
+                cols.append(i[:, 1:].ravel())
+                dists.append(d[:, 1:].ravel())
+
+            graph = sp.csr_matrix(
+                (np.maximum(np.concatenate(dists), 1e-12), (np.concatenate(rows), np.concatenate(cols))),
+                shape=(n_active, n_active)
+            )
+            graph = _connect_components(X[active], graph.maximum(graph.T).tocsr())
+        round_knn_seconds = graph_rec["wall_seconds"] + (knn_seconds if round_num == 1 else 0)
+
+        # ---- HDBSCAN on the sparse graph ----------------------------------
+        with tracer.stage("noise_hdbscan", rows_in=n_active, round=round_num) as rec:
+            fit_params = {**params, 'metric': 'precomputed', 'min_samples': fit_min_samples}
+            round_labels = HDBSCAN(**fit_params).fit_predict(graph)
+            rec["rows_out"] = int((round_labels != -1).sum())
+        fit_seconds = rec["wall_seconds"]
+
+        found = round_labels != -1
+        n_found = len(np.unique(round_labels[found]))
+        noise_labels[active[found]] = round_labels[found] + next_label
+
+        sizes = np.bincount(round_labels[found], minlength=n_found)
+        for c in range(n_found):
+            lineage.append({'cluster': next_label + c, 'round': round_num, 'size': int(sizes[c]),
+                            **{p: v for p, v in params.items() if p != 'metric'}})
+        next_label += n_found
+
+        gain = found.sum() / len(labels)
+        history.append({
+            'round': round_num,
+            **{p: v for p, v in params.items() if p != 'metric'},
+            'noise_before': n_active,
+            'noise_after': n_active - int(found.sum()),
+            'clusters_found': n_found,
+            'gain': gain,
+            'noise_ratio': (n_active - found.sum()) / len(labels),
+            'knn_seconds': round_knn_seconds,
+            'fit_seconds': fit_seconds,
+            'seconds': time.time() - t_round + (knn_seconds if round_num == 1 else 0),
+        })
+        print(f"Round {round_num}: {n_found} clusters, {found.sum():,} of {n_active:,} noise points "
+              f"recovered ({gain:.2%} of all points) in {history[-1]['seconds']:.1f}s")
+
+        if gain < min_gain:
+            break
+
+    return noise_labels, pd.DataFrame(history), pd.DataFrame(lineage)
+
+
 # -------------------------------------------------------------------
 # Print list of example questions from clusters
 # -------------------------------------------------------------------
@@ -134,9 +602,15 @@ def print_cluster_examples(
     examples_per_cluster=5,
     exclude_noise=True,
     random_examples=False,
+    embeddings=None,
+    metric='euclidean',
 ):
     """
     Print sample text examples from the largest clusters in a clustered DataFrame.
+
+    With `embeddings` (UMAP or sentence embeddings aligned with the rows of
+    df; see cluster_representatives for `metric`) the examples are the
+    questions nearest each cluster's centroid instead of the first rows.
     """
     if cluster_column not in df.columns:
         raise ValueError(f"Column '{cluster_column}' not found in DataFrame.")
@@ -154,11 +628,22 @@ def print_cluster_examples(
     # Select largest clusters
     top_clusters = cluster_counts.head(top_n).index.tolist()
 
+    central = None
+    if embeddings is not None:
+        reps = cluster_representatives(embeddings, df[cluster_column].to_numpy(), metric=metric,
+                                       exclude_noise=False)
+        central = reps.examples(df[text_column].to_numpy(), n_central=examples_per_cluster)
+
     # Print examples
     for cluster_id in top_clusters:
         size = cluster_counts[cluster_id]
         print(f"\n--- Cluster {cluster_id} (size={size}) ---")
 
+        if central is not None:
+            for q in central[cluster_id][0]:
+                print("-", q)
+            continue
+
         subset = df[df[cluster_column] == cluster_id]
 
         if random_examples:
@@ -176,6 +661,24 @@ def print_cluster_examples(
 # Summarize clusters with keywords
 # -------------------------------------------------------------------
 
+def _top_term_indices(scores, k):
+    """
+    scores.argsort()[-k:][::-1]: indices of the k highest scores, highest
+    first. When the top k scores are distinct, a partial sort finds them.
+    Otherwise (e.g. a cluster with fewer than k nonzero terms) the order of
+    equal scores is whatever the full argsort gives, so that is used.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    top = np.argpartition(scores, len(scores) - k)[len(scores) - k:]
+    kth = scores[top].min()
+    if len(np.unique(scores[top])) == k and np.count_nonzero(scores == kth) == 1:
+        return top[np.argsort(-scores[top])]
+    return scores.argsort()[-k:][::-1]
+
+
 def summarize_clusters(
     df,
     text_col='Q_basic_clean',
@@ -187,16 +690,32 @@ def summarize_clusters(
     sample_questions=0,      
     random_samples=False,    
     preview=False,            
-    sort_by_size=False        
+    sort_by_size=False,
+    random_state=None,
+    embeddings=None,
+    boundary_questions=0,
+    metric='euclidean'
 ):
     """
     Generate keyword summaries for clusters, optionally including:
       - meta-cluster labels
       - sample questions
       - printed preview
+
+    The corpus is vectorized once; per-cluster mean TF-IDF scores come from a
+    single sparse (clusters x rows) indicator-matrix product, so run time does
+    not grow with n_clusters x n_rows.
+
+    Sample questions are the first rows of each cluster, or a random draw
+    with random_samples. Given `embeddings` aligned with the rows of df (UMAP
+    embeddings with metric='euclidean', sentence embeddings with 'cosine'),
+    they are instead the questions nearest each cluster's centroid, plus
+    `boundary_questions` diverse ones from the cluster's edge (see
+    cluster_representatives; computed once per clustering run).
     
     Returns a DataFrame with:
-      ['cluster', 'size', 'keywords', (optional) 'meta_label', (optional) 'samples']
+      ['cluster', 'size', 'keywords', (optional) 'meta_label', (optional) 'samples',
+       (optional) 'boundary_samples']
     """
     
     # Stop words
@@ -205,48 +724,73 @@ def summarize_clusters(
     else:
         stop_words = list(ENGLISH_STOP_WORDS.union(set(extra_stop_words)))
 
-    # Fit TF-IDF on whole corpus
-    vectorizer = TfidfVectorizer(stop_words=stop_words, max_features=max_features)
-    vectorizer.fit(df[text_col])
-    terms = vectorizer.get_feature_names_out()
-    
-    cluster_rows = []
-    
-    for cluster_id in sorted(df[cluster_col].unique()):
-        subset = df[df[cluster_col] == cluster_id]
-        cluster_texts = subset[text_col]
-        
-        # TF-IDF keyword extraction
-        tfidf_matrix = vectorizer.transform(cluster_texts)
-        mean_scores = tfidf_matrix.mean(axis=0).A1
-        top_indices = mean_scores.argsort()[-top_n_words:][::-1]
-        top_terms = [terms[i] for i in top_indices]
-
-        # Base info
-        row = {
-            'cluster': cluster_id,
-            'size': len(subset),
-            'keywords': ", ".join(top_terms)
-        }
-
-        # Optional meta label
-        if meta_col is not None and meta_col in df.columns:
-            row['meta_label'] = subset[meta_col].iloc[0]
-
-        # Optional sampled questions
+    # Fit TF-IDF on whole corpus and transform it once
+    with tracer.stage("tfidf", rows_in=len(df)) as rec:
+        vectorizer = TfidfVectorizer(stop_words=stop_words, max_features=max_features)
+        tfidf_matrix = vectorizer.fit_transform(df[text_col])
+        terms = vectorizer.get_feature_names_out()
+        rec["n_terms"] = len(terms)
+
+    # Cluster membership as a sparse (n_clusters x n_rows) indicator matrix
+    codes, cluster_ids = pd.factorize(df[cluster_col], sort=True)
+    rows = np.flatnonzero(codes >= 0)
+    row_codes = codes[rows]
+    n_clusters = len(cluster_ids)
+    indicator = sp.csr_matrix(
+        (np.ones(len(rows)), (row_codes, rows)), shape=(n_clusters, len(df))
+    )
+    sizes = np.bincount(row_codes, minlength=n_clusters)
+
+    # Per-cluster mean TF-IDF, densified a block of clusters at a time
+    with tracer.stage("cluster_keywords", rows_in=len(rows)) as rec:
+        cluster_sums = (indicator @ tfidf_matrix).tocsr()
+        keywords = []
+        block = 64
+        for start in range(0, n_clusters, block):
+            mean_scores = cluster_sums[start:start + block].toarray() / sizes[start:start + block, None]
+            for scores in mean_scores:
+                top_indices = _top_term_indices(scores, top_n_words)
+                keywords.append(", ".join(terms[i] for i in top_indices))
+        rec["rows_out"] = n_clusters
+
+    summary = {
+        'cluster': cluster_ids.tolist(),
+        'size': sizes.tolist(),
+        'keywords': keywords
+    }
+
+    # Rows of each cluster in their original order, clusters one after another
+    grouped_rows = rows[np.argsort(row_codes, kind='stable')]
+    group_starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    # Optional meta label (first row of each cluster)
+    if meta_col is not None and meta_col in df.columns:
+        summary['meta_label'] = df[meta_col].iloc[grouped_rows[group_starts]].tolist()
+
+    # Optional representative questions: nearest the centroid / on the boundary
+    if embeddings is not None and (sample_questions > 0 or boundary_questions > 0):
+        reps = cluster_representatives(embeddings, df[cluster_col].to_numpy(), metric=metric,
+                                       exclude_noise=False)
+        examples = reps.examples(df[text_col].to_numpy(), sample_questions, boundary_questions)
         if sample_questions > 0:
-            if random_samples:
-                samples = subset[text_col].reset_index(drop=True).sample(
-                    min(sample_questions, len(subset))
-                ).tolist()
-            else:
-                samples = subset[text_col].head(sample_questions).tolist()
-            
-            row['samples'] = samples
-        
-        cluster_rows.append(row)
+            summary['samples'] = [examples[c][0] for c in summary['cluster']]
+        if boundary_questions > 0:
+            summary['boundary_samples'] = [examples[c][1] for c in summary['cluster']]
 
-    summary_df = pd.DataFrame(cluster_rows)
+    # Optional sampled questions (one groupby-style pass over all clusters)
+    elif sample_questions > 0:
+        if random_samples:
+            # Shuffle, then regroup stably: each cluster's rows in random order
+            shuffled = np.random.default_rng(random_state).permutation(rows)
+            grouped_rows = shuffled[np.argsort(codes[shuffled], kind='stable')]
+
+        texts = df[text_col].to_numpy()
+        summary['samples'] = [
+            texts[grouped_rows[begin:begin + min(sample_questions, size)]].tolist()
+            for begin, size in zip(group_starts, sizes)
+        ]
+
+    summary_df = pd.DataFrame(summary)
 
     # Sort by size if requested
     if sort_by_size:
@@ -263,6 +807,10 @@ def summarize_clusters(
                 print("Sample questions:")
                 for q in r['samples']:
                     print("  -", q)
+            if 'boundary_samples' in r:
+                print("Boundary questions:")
+                for q in r['boundary_samples']:
+                    print("  -", q)
 
     return summary_df
 
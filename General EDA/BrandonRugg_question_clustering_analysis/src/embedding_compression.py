@@ -0,0 +1,293 @@
+import contextlib
+import io
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import tracer
+
+# -------------------------------------------------------------------
+# Compressed embedding matrices (float16, int8, PCA)
+# -------------------------------------------------------------------
+
+METHODS = ["float32", "float16", "int8", "pca"]  # "pca" takes a width: "pca64", "pca128"
+
+
+def parse_method(method):
+    """'int8' -> ('int8', None), 'pca64' -> ('pca', 64)."""
+    match = re.fullmatch(r"(float32|float16|int8|pca)(\d+)?", str(method).lower())
+    if match is None or (match.group(1) == "pca") != (match.group(2) is not None):
+        raise ValueError(f"Unknown compression '{method}'. Expected one of float32, float16, int8 or pca<dims>.")
+    return match.group(1), int(match.group(2)) if match.group(2) else None
+
+
+class CompressedEmbeddings:
+    """
+    An (n, dim) embedding matrix held in a smaller representation.
+
+    Rows are decoded to float32 on access, so the object can be passed
+    wherever cluster_with_umap_hdbscan takes an `embeddings` matrix:
+
+        compressed = compress_embeddings(store.vectors(), "int8")
+        cluster_with_umap_hdbscan(None, embeddings=compressed)
+
+    Methods:
+        float16  half-precision copy (2 bytes per value)
+        int8     per-dimension scalar quantization: each dimension's
+                 [min, max] range is split into 256 steps (1 byte per value)
+        pca<k>   projection onto the top k singular vectors of the
+                 embeddings. The projection is not centred, so dot products
+                 (and the cosine geometry UMAP uses) are approximately kept.
+                 Rows decode to the k-dim projection, not back to 384 dims.
+    """
+
+    def __init__(self, method, codes, scale=None, offset=None, components=None):
+        self.method = method
+        self.codes = codes
+        self.scale = scale
+        self.offset = offset
+        self.components = components
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    @property
+    def nbytes(self):
+        """Bytes of the codes plus the decoding parameters."""
+        return self.codes.nbytes + sum(a.nbytes for a in (self.scale, self.offset, self.components) if a is not None)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def decode(self, codes):
+        """float32 rows for a block of codes."""
+        if self.method == "int8":
+            return (codes.astype(np.float32) + 128) * self.scale + self.offset
+        return np.asarray(codes, dtype=np.float32)
+
+    def __getitem__(self, rows):
+        return self.decode(self.codes[rows])
+
+    def __array__(self, dtype=None, copy=None):
+        out = np.empty(self.shape, dtype=np.float32)
+        for start in range(0, len(self), 100_000):
+            out[start:start + 100_000] = self[start:start + 100_000]
+        return out if dtype is None else out.astype(dtype, copy=False)
+
+    def projector(self):
+        """
+        The decoding parameters without the codes: enough to project() new
+        embeddings, and small enough to save next to a fitted UMAP.
+        """
+        codes = np.empty((0, self.shape[1]), dtype=self.codes.dtype)
+        return CompressedEmbeddings(self.method, codes, self.scale, self.offset, self.components)
+
+    def project(self, embeddings):
+        """Compress new embeddings the same way (TopicModel.transform does this for saved topics)."""
+        X = np.asarray(embeddings, dtype=np.float32)
+        if self.method == "int8":
+            codes = np.rint((X - self.offset) / self.scale) - 128
+            return self.decode(np.clip(codes, -128, 127).astype(np.int8))
+        if self.method == "pca":
+            return X @ self.components.T
+        return self.decode(X.astype(self.codes.dtype))
+
+    # ---- Save / load --------------------------------------------------------
+
+    def save(self, path):
+        """Save as .npy files plus compression.json in the folder `path`."""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in ("codes", "scale", "offset", "components"):
+            arr = getattr(self, name)
+            if arr is not None:
+                tmp = path / f"{name}.npy.tmp"
+                with open(tmp, "wb") as f:
+                    np.save(f, arr)
+                os.replace(tmp, path / f"{name}.npy")
+        meta = {"method": self.method, "n_rows": int(self.shape[0]), "dim": int(self.shape[1])}
+        (path / "compression.json").write_text(json.dumps(meta, indent=2))
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load a folder written by save(); the codes are memory-mapped."""
+        path = Path(path)
+        meta = json.loads((path / "compression.json").read_text())
+        arrays = {name: np.load(path / f"{name}.npy") for name in ("scale", "offset", "components")
+                  if (path / f"{name}.npy").exists()}
+        codes = np.load(path / "codes.npy", mmap_mode="r" if mmap else None)
+        return cls(meta["method"], codes, **arrays)
+
+
+def compress_embeddings(embeddings, method="int8", fit_sample=100_000, chunk_size=100_000, random_state=42):
+    """
+    Compress an embedding matrix in row chunks (it may be memory-mapped).
+
+    Args:
+        embeddings: (n, dim) matrix, e.g. EmbeddingStore.vectors().
+        method (str): float32 (no compression), float16, int8 or pca<k>, e.g. "pca64".
+        fit_sample (int): Rows the PCA projection is fitted on (seeded sample).
+        chunk_size (int): Rows compressed at a time.
+
+    Returns:
+        CompressedEmbeddings
+    """
+    method, n_components = parse_method(method)
+    n_rows, dim = embeddings.shape
+
+    scale = offset = components = None
+    if method == "int8":
+        lo = np.full(dim, np.inf, dtype=np.float32)
+        hi = np.full(dim, -np.inf, dtype=np.float32)
+        for start in range(0, n_rows, chunk_size):
+            block = np.asarray(embeddings[start:start + chunk_size], dtype=np.float32)
+            lo = np.minimum(lo, block.min(axis=0))
+            hi = np.maximum(hi, block.max(axis=0))
+        offset = lo
+        scale = np.maximum(hi - lo, np.finfo(np.float32).eps) / 255
+    elif method == "pca":
+        if n_components >= dim:
+            raise ValueError(f"pca{n_components} does not reduce {dim}-dim embeddings.")
+        from sklearn.decomposition import TruncatedSVD
+
+        rng = np.random.RandomState(random_state)
+        sample = np.sort(rng.choice(n_rows, size=fit_sample, replace=False)) if fit_sample < n_rows else slice(None)
+        svd = TruncatedSVD(n_components, algorithm="randomized", random_state=random_state)
+        svd.fit(np.asarray(embeddings[sample], dtype=np.float32))
+        components = svd.components_.astype(np.float32)
+
+    code_dtype = {"float32": np.float32, "float16": np.float16, "int8": np.int8, "pca": np.float32}[method]
+    codes = np.empty((n_rows, n_components or dim), dtype=code_dtype)
+    compressed = CompressedEmbeddings(method, codes, scale=scale, offset=offset, components=components)
+
+    with tracer.stage("compress_embeddings", rows_in=n_rows, method=method) as rec:
+        for start in range(0, n_rows, chunk_size):
+            block = np.asarray(embeddings[start:start + chunk_size], dtype=np.float32)
+            if method == "int8":
+                block = np.clip(np.rint((block - offset) / scale) - 128, -128, 127)
+            elif method == "pca":
+                block = block @ components.T
+            codes[start:start + len(block)] = block
+        rec["rows_out"] = n_rows
+
+    return compressed
+
+# -------------------------------------------------------------------
+# How much does compression change the clusters?
+# -------------------------------------------------------------------
+
+def _neighbour_recall(knn_indices, reference_indices):
+    """Share of each row's reference neighbours (excluding itself) also found in knn_indices."""
+    k = min(knn_indices.shape[1], reference_indices.shape[1]) - 1
+    found = 0
+    for start in range(0, len(knn_indices), 10_000):
+        a = knn_indices[start:start + 10_000, 1:k + 1]
+        b = reference_indices[start:start + 10_000, 1:k + 1]
+        found += int((a[:, :, None] == b[:, None, :]).any(axis=2).sum())
+    return found / (len(knn_indices) * k)
+
+
+def compare_compression(
+        embeddings,
+        methods=("float16", "int8", "pca128", "pca64"),
+        umap_params=None,
+        hdbscan_params=None,
+        sample_size=None,
+        random_state=42
+    ):
+    """
+    Cluster the embeddings once uncompressed and once per compression method,
+    and report what each representation costs and changes.
+
+    Every run builds its kNN graph with build_knn_graph (the step UMAP would
+    otherwise run internally) and then runs cluster_with_umap_hdbscan on it
+    with the same parameters and seed, so the differences come from the
+    representation alone.
+
+    Args:
+        embeddings: (n, dim) float32 matrix (may be memory-mapped).
+        methods: Compression methods to compare (see compress_embeddings).
+        umap_params, hdbscan_params: As for cluster_with_umap_hdbscan.
+        sample_size (int): Compare on a seeded sample of rows (None = all).
+
+    Returns:
+        DataFrame with one row per method (float32 first):
+            dim, stored_mb, compression_ratio, compress_seconds,
+            knn_input_mb      float32 matrix the kNN search and UMAP read
+            knn_seconds, knn_speedup, knn_peak_rss_mb,
+            knn_recall        share of the uncompressed neighbours found
+            cluster_seconds   UMAP + HDBSCAN on the precomputed graph
+            n_clusters, noise_ratio,
+            ari               adjusted Rand index against the float32 labels
+            ari_clustered     ARI on points that are clustered in both runs
+    """
+    from sklearn.metrics import adjusted_rand_score
+    from clustering_analysis import build_knn_graph, cluster_with_umap_hdbscan
+
+    if umap_params is None:
+        umap_params = dict(n_neighbors=30, n_components=5, metric='cosine', random_state=random_state)
+    n_neighbors = umap_params.get("n_neighbors", 15)
+
+    # Read the rows once into a writable array (a read-only memmap would be copied by every kNN build)
+    if sample_size is not None and sample_size < len(embeddings):
+        rows = np.sort(np.random.RandomState(random_state).choice(len(embeddings), size=sample_size, replace=False))
+        X = np.asarray(embeddings[rows], dtype=np.float32)
+    else:
+        X = np.require(embeddings, dtype=np.float32, requirements=["C", "W"])
+
+    # Compile UMAP's numba code first, so it is not timed as part of the float32 run
+    build_knn_graph(X[:2_000], n_neighbors=n_neighbors, metric=umap_params.get("metric", "euclidean"))
+
+    results = []
+    reference = None
+    for method in ["float32", *methods]:
+        with tracer.stage(f"compare_compression:{method}", rows_in=len(X)):
+            with tracer.stage("compress", method=method) as compress_rec:
+                compressed = compress_embeddings(X, method, random_state=random_state)
+                X_method = np.asarray(compressed)
+
+            with tracer.stage("knn", method=method) as knn_rec:
+                knn_graph = build_knn_graph(X_method, n_neighbors=n_neighbors,
+                                            metric=umap_params.get("metric", "euclidean"),
+                                            random_state=random_state)
+
+            with tracer.stage("cluster", method=method) as cluster_rec, \
+                    contextlib.redirect_stdout(io.StringIO()):
+                result_df, _, _ = cluster_with_umap_hdbscan(
+                    None, embeddings=X_method, umap_params=umap_params, hdbscan_params=hdbscan_params,
+                    knn_graph=knn_graph, random_state=random_state)
+            labels = result_df["cluster"].to_numpy()
+
+        if reference is None:
+            reference = {"labels": labels, "knn": knn_graph[0], "bytes": compressed.nbytes,
+                         "knn_seconds": knn_rec["wall_seconds"]}
+
+        both = (labels != -1) & (reference["labels"] != -1)
+        results.append({
+            "method": method,
+            "dim": compressed.shape[1],
+            "stored_mb": compressed.nbytes / 2**20,
+            "compression_ratio": reference["bytes"] / compressed.nbytes,
+            "compress_seconds": compress_rec["wall_seconds"],
+            "knn_input_mb": X_method.nbytes / 2**20,
+            "knn_seconds": knn_rec["wall_seconds"],
+            "knn_speedup": reference["knn_seconds"] / knn_rec["wall_seconds"],
+            "knn_peak_rss_mb": knn_rec.get("peak_rss_mb"),
+            "knn_recall": _neighbour_recall(knn_graph[0], reference["knn"]),
+            "cluster_seconds": cluster_rec["wall_seconds"],
+            "n_clusters": len(set(labels)) - (1 if -1 in labels else 0),
+            "noise_ratio": float((labels == -1).mean()),
+            "ari": adjusted_rand_score(reference["labels"], labels),
+            "ari_clustered": adjusted_rand_score(reference["labels"][both], labels[both]) if both.any() else None,
+        })
+        r = results[-1]
+        print(f"{method:<8} {r['dim']:>4} dims, {r['stored_mb']:>8.1f} MB ({r['compression_ratio']:.1f}x smaller), "
+              f"kNN {r['knn_seconds']:.1f}s ({r['knn_speedup']:.2f}x), recall {r['knn_recall']:.3f}, "
+              f"{r['n_clusters']} clusters, ARI {r['ari']:.3f}")
+
+    return pd.DataFrame(results)
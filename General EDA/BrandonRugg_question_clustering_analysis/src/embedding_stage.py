@@ -0,0 +1,412 @@
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+import duckdb
+import numpy as np
+
+from cleaning import clean_series
+
+# -------------------------------------------------------------------
+# Streaming, resumable embedding generation for a topic slice
+# -------------------------------------------------------------------
+
+MANIFEST_NAME = "manifest.json"
+
+TOPIC_QUESTIONS_QUERY = """
+    SELECT DISTINCT CAST(question_id AS BIGINT) AS question_id, question_content
+    FROM read_parquet(?)
+    WHERE question_topic IS NOT DISTINCT FROM ?
+      AND question_language = ?
+      AND question_content IS NOT NULL
+    ORDER BY question_id, question_content
+    OFFSET ?
+"""
+
+
+def _write_json_atomic(path, obj):
+    tmp = Path(f"{path}.tmp")
+    tmp.write_text(json.dumps(obj, indent=2))
+    os.replace(tmp, path)
+
+
+def _save_npy_atomic(path, arr):
+    tmp = Path(f"{path}.tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+
+def read_manifest(out_dir):
+    path = Path(out_dir) / MANIFEST_NAME
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def _iter_fixed_batches(reader, size):
+    """Re-chunk an Arrow RecordBatchReader into tables of exactly `size` rows (last may be short)."""
+    import pyarrow as pa
+
+    pending = []
+    n_pending = 0
+    for batch in reader:
+        pending.append(batch)
+        n_pending += batch.num_rows
+        while n_pending >= size:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, size)
+            rest = table.slice(size)
+            pending = rest.to_batches()
+            n_pending = rest.num_rows
+    if n_pending:
+        yield pa.Table.from_batches(pending)
+
+
+def encode_topic_shards(
+        parquet_path,
+        out_dir,
+        topic,
+        language='eng',
+        model_name='all-MiniLM-L6-v2',
+        model=None,
+        shard_size=50_000,
+        batch_size=64,
+        store=None,
+        streaming=False,
+        clean_workers=2,
+        queue_size=4,
+    ):
+    """
+    Stream the distinct questions of one topic from the parquet file, clean
+    them with minimal_clean and encode them shard by shard.
+
+    With streaming=True, reading, cleaning and encoding overlap: a reader
+    thread pulls shards from DuckDB, `clean_workers` threads clean them and
+    the encoder (this thread) consumes the cleaned shards in order. The
+    stages are connected by queues of at most `queue_size` shards, so a
+    stage that gets ahead blocks instead of filling memory. Throughput and
+    queue depth of each stage are printed at the end and saved as
+    manifest["stream_metrics"]; rows_per_second is per thread, measured
+    while the thread was busy. The encoder and DuckDB release the GIL;
+    minimal_clean does not, so extra clean workers mostly help hide the
+    cleaning behind encoding rather than run in parallel with each other.
+
+    Each shard is written to `out_dir` as shard_XXXXX.npy (float32 embeddings)
+    and shard_XXXXX_ids.npy (question_ids), and recorded in manifest.json once
+    complete. Re-running with the same arguments resumes after the last
+    completed shard. Only one shard is held in memory at a time.
+
+    Args:
+        parquet_path (str): Full WeFarm dataset as parquet.
+        out_dir (str): Folder for the shards and manifest.
+        topic (str or None): question_topic to encode (None = unlabeled).
+        language (str): question_language filter.
+        model_name (str): SentenceTransformer model to load if `model` is None.
+        model (optional): Object with a SentenceTransformer-style .encode().
+        shard_size (int): Questions per shard (the unit of resumption).
+        batch_size (int): Encoder batch size.
+        store (EmbeddingStore, optional): If given, texts already in the store
+                                          are not re-encoded.
+        streaming (bool): Overlap reading, cleaning and encoding (see above).
+        clean_workers (int): Cleaning threads in streaming mode.
+        queue_size (int): Shards each queue holds in streaming mode.
+
+    Returns the manifest dict.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    params = {
+        "parquet_path": str(parquet_path),
+        "topic": topic,
+        "language": language,
+        "model_name": model_name,
+        "shard_size": shard_size,
+        "cleaning": "minimal_clean",
+    }
+
+    manifest = read_manifest(out_dir)
+    if manifest is None:
+        manifest = {"params": params, "shards": [], "complete": False}
+    elif manifest["params"] != params:
+        raise ValueError(
+            f"{out_dir} holds shards for different parameters:\n"
+            f"  existing: {manifest['params']}\n  requested: {params}\n"
+            "Use a new out_dir or delete the old shards."
+        )
+
+    if manifest["complete"]:
+        print(f"All {len(manifest['shards'])} shards already encoded in {out_dir}.")
+        return manifest
+
+    done = len(manifest["shards"])
+    if done:
+        print(f"Resuming after {done} completed shards "
+              f"({sum(s['rows'] for s in manifest['shards']):,} questions).")
+
+    if model is None and store is None:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_name)
+
+    def encode(texts):
+        if store is not None:
+            embeddings = store.get_or_encode(texts, model=model, batch_size=batch_size,
+                                             show_progress_bar=False)
+        else:
+            embeddings = model.encode(texts, batch_size=batch_size, show_progress_bar=False)
+        return np.asarray(embeddings, dtype=np.float32)
+
+    # Rows have a fixed order, so completed shards can be skipped in SQL
+    query_params = [str(parquet_path), topic, language, done * shard_size]
+    if streaming:
+        manifest["stream_metrics"] = _stream_shards(out_dir, manifest, query_params, shard_size, encode,
+                                                    clean_workers, queue_size)
+    else:
+        con = duckdb.connect()
+        reader = con.execute(TOPIC_QUESTIONS_QUERY, query_params).fetch_record_batch(shard_size)
+        for shard_num, table in enumerate(_iter_fixed_batches(reader, shard_size), start=done):
+            t0 = time.time()
+            question_ids, texts = _clean_shard(table)
+            _write_shard(out_dir, manifest, shard_num, question_ids, encode(texts), t0)
+        con.close()
+
+    manifest["complete"] = True
+    _write_json_atomic(out_dir / MANIFEST_NAME, manifest)
+    return manifest
+
+
+def _clean_shard(table):
+    question_ids = table.column("question_id").to_numpy()
+    texts = clean_series(table.column("question_content").to_pandas(), mode="minimal").tolist()
+    return question_ids, texts
+
+
+def _write_shard(out_dir, manifest, shard_num, question_ids, embeddings, t0):
+    """Save one encoded shard and record it in the manifest (the unit of resumption)."""
+    name = f"shard_{shard_num:05d}"
+    _save_npy_atomic(out_dir / f"{name}.npy", embeddings)
+    _save_npy_atomic(out_dir / f"{name}_ids.npy", question_ids)
+
+    manifest["shards"].append({
+        "shard": shard_num,
+        "rows": len(question_ids),
+        "embeddings": f"{name}.npy",
+        "question_ids": f"{name}_ids.npy",
+        "seconds": round(time.time() - t0, 2),
+    })
+    _write_json_atomic(out_dir / MANIFEST_NAME, manifest)
+
+    total = sum(s["rows"] for s in manifest["shards"])
+    print(f"Shard {shard_num}: {len(question_ids):,} questions in {time.time() - t0:.1f}s ({total:,} total)")
+
+# -------------------------------------------------------------------
+# Streaming mode: reader -> clean workers -> encoder over bounded queues
+# -------------------------------------------------------------------
+
+_DONE = object()  # end-of-stream marker
+
+
+class StageMetrics:
+    """Work and waiting time of one streaming stage (summed over its threads)."""
+
+    def __init__(self, name, threads=1):
+        self.name = name
+        self.threads = threads
+        self.shards = 0
+        self.rows = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0   # blocked on an empty input or full output queue
+        self.queue_depths = []    # depth of the input queue at each get
+        self._lock = threading.Lock()
+
+    def add(self, rows, busy, wait, depth=None):
+        with self._lock:
+            self.shards += 1
+            self.rows += rows
+            self.busy_seconds += busy
+            self.wait_seconds += wait
+            if depth is not None:
+                self.queue_depths.append(depth)
+
+    def summary(self, wall_seconds):
+        # Per thread: minimal_clean holds the GIL, so clean threads do not add up
+        capacity = self.rows / self.busy_seconds if self.busy_seconds else None
+        return {
+            "stage": self.name,
+            "threads": self.threads,
+            "shards": self.shards,
+            "rows": self.rows,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "wait_seconds": round(self.wait_seconds, 3),
+            "rows_per_second": capacity,  # per thread, while busy
+            "utilization": self.busy_seconds / (wall_seconds * self.threads) if wall_seconds else None,
+            "mean_queue_depth": float(np.mean(self.queue_depths)) if self.queue_depths else None,
+            "max_queue_depth": max(self.queue_depths) if self.queue_depths else None,
+        }
+
+
+def _put(q, item, stop):
+    """Blocking put that gives up once `stop` is set. Returns the seconds spent waiting."""
+    t0 = time.perf_counter()
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            break
+        except queue.Full:
+            continue
+    return time.perf_counter() - t0
+
+
+def _get(q, stop):
+    """Blocking get that returns _DONE once `stop` is set. Returns (item, depth, seconds waited)."""
+    t0 = time.perf_counter()
+    depth = q.qsize()
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1), depth, time.perf_counter() - t0
+        except queue.Empty:
+            continue
+    return _DONE, depth, time.perf_counter() - t0
+
+
+def _stream_shards(out_dir, manifest, query_params, shard_size, encode, clean_workers, queue_size):
+    """Run the streaming mode of encode_topic_shards. Returns the per-stage metrics."""
+    read_q = queue.Queue(maxsize=queue_size)
+    clean_q = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+    metrics = {"read": StageMetrics("read"), "clean": StageMetrics("clean", clean_workers),
+               "encode": StageMetrics("encode")}
+
+    def reader():
+        try:
+            with duckdb.connect() as con:
+                batches = con.execute(TOPIC_QUESTIONS_QUERY, query_params).fetch_record_batch(shard_size)
+                tables = _iter_fixed_batches(batches, shard_size)
+                shard_num = len(manifest["shards"])
+                while True:
+                    t0 = time.perf_counter()
+                    table = next(tables, None)
+                    busy = time.perf_counter() - t0
+                    if table is None:
+                        break
+                    wait = _put(read_q, (shard_num, table), stop)
+                    metrics["read"].add(table.num_rows, busy, wait)
+                    shard_num += 1
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            for _ in range(clean_workers):
+                _put(read_q, _DONE, stop)
+
+    def cleaner():
+        try:
+            while True:
+                item, depth, wait = _get(read_q, stop)
+                if item is _DONE:
+                    break
+                shard_num, table = item
+                t0 = time.perf_counter()
+                question_ids, texts = _clean_shard(table)
+                busy = time.perf_counter() - t0
+                wait += _put(clean_q, (shard_num, question_ids, texts), stop)
+                metrics["clean"].add(len(texts), busy, wait, depth)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(clean_q, _DONE, stop)
+
+    threads = [threading.Thread(target=reader, daemon=True)]
+    threads += [threading.Thread(target=cleaner, daemon=True) for _ in range(clean_workers)]
+    t_start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    # Encode in shard order; cleaners can finish out of order
+    pending = {}
+    next_shard = len(manifest["shards"])
+    finished_cleaners = 0
+    try:
+        while finished_cleaners < clean_workers or pending:
+            if next_shard not in pending:
+                if finished_cleaners == clean_workers:
+                    raise RuntimeError(f"Shard {next_shard} was never cleaned.")
+                item, depth, wait = _get(clean_q, stop)
+                if item is _DONE:
+                    if stop.is_set():
+                        break
+                    finished_cleaners += 1
+                    continue
+                pending[item[0]] = (item, depth, wait)
+                continue
+
+            (shard_num, question_ids, texts), depth, wait = pending.pop(next_shard)
+            t0 = time.time()
+            embeddings = encode(texts)
+            metrics["encode"].add(len(texts), time.time() - t0, wait, depth)
+            _write_shard(out_dir, manifest, shard_num, question_ids, embeddings, t0)
+            next_shard += 1
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+
+    wall = time.perf_counter() - t_start
+    summary = [m.summary(wall) for m in metrics.values()]
+    rows = metrics["encode"].rows
+    print(f"\nStreamed {rows:,} questions in {wall:.1f}s ({rows / wall if wall else 0:,.0f} rows/s end to end)")
+    for m in summary:
+        capacity = f"{m['rows_per_second']:,.0f}" if m["rows_per_second"] else "-"
+        depth = f"{m['mean_queue_depth']:.1f}" if m["mean_queue_depth"] is not None else "-"
+        print(f"  {m['stage']:<7}{capacity:>10} rows/s per thread, busy {m['utilization']:.0%}, "
+              f"waiting {m['wait_seconds']:.1f}s, mean input queue {depth}")
+    return summary
+
+
+def iter_shards(out_dir):
+    """Yield (question_ids, embeddings) per completed shard; embeddings are memory-mapped."""
+    out_dir = Path(out_dir)
+    manifest = read_manifest(out_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No {MANIFEST_NAME} in {out_dir}.")
+
+    for shard in manifest["shards"]:
+        yield (np.load(out_dir / shard["question_ids"]),
+               np.load(out_dir / shard["embeddings"], mmap_mode="r"))
+
+
+def consolidate_shards(out_dir, filename="embeddings.npy"):
+    """
+    Copy completed shards into one contiguous (n, dim) float32 .npy file,
+    one shard at a time, and return it memory-mapped together with the
+    question_ids (ready for cluster_with_umap_hdbscan(embeddings=...)).
+    """
+    out_dir = Path(out_dir)
+    manifest = read_manifest(out_dir)
+    if manifest is None or not manifest["shards"]:
+        raise FileNotFoundError(f"No completed shards in {out_dir}.")
+
+    n_rows = sum(s["rows"] for s in manifest["shards"])
+    dim = np.load(out_dir / manifest["shards"][0]["embeddings"], mmap_mode="r").shape[1]
+
+    tmp = out_dir / f"{filename}.tmp"
+    matrix = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(n_rows, dim))
+    question_ids = np.empty(n_rows, dtype=np.int64)
+
+    start = 0
+    for ids, embeddings in iter_shards(out_dir):
+        matrix[start:start + len(ids)] = embeddings
+        question_ids[start:start + len(ids)] = ids
+        start += len(ids)
+    matrix.flush()
+    del matrix
+    os.replace(tmp, out_dir / filename)
+    _save_npy_atomic(out_dir / "question_ids.npy", question_ids)
+
+    return question_ids, np.load(out_dir / filename, mmap_mode="r")
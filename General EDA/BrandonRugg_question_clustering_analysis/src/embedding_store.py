@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+
+# -------------------------------------------------------------------
+# Content-addressed embedding cache
+# -------------------------------------------------------------------
+
+KEY_DTYPE = np.dtype("S16")  # 128-bit blake2b digest per text
+
+
+def text_key(text, model_name):
+    """Hash of the (cleaned) question text plus the model that embeds it."""
+    return hashlib.blake2b(f"{model_name}\n{text}".encode("utf-8"), digest_size=16).digest()
+
+
+def hash_texts(texts, model_name):
+    """Return an array of text_key digests (dtype S16), one per text."""
+    return np.array([text_key(t, model_name) for t in texts], dtype=KEY_DTYPE)
+
+
+class EmbeddingStore:
+    """
+    On-disk embedding cache keyed by a hash of the cleaned text + model name.
+
+    Each model gets its own folder under `root` with three files:
+        vectors.bin   raw (n, dim) matrix, one row per distinct text, append-only
+        keys.bin      one 16-byte text key per row, append-only
+        meta.json     model name, dimension and dtype
+
+    Only texts that have never been seen are encoded; re-runs, new topic
+    slices and repeated questions are served from the memory-mapped matrix.
+
+    Example:
+        store = EmbeddingStore(os.path.join(data_dir, "embeddings"), "all-MiniLM-L6-v2")
+        embeddings = store.get_or_encode(questions["Q_basic_clean"])
+    """
+
+    def __init__(self, root, model_name="all-MiniLM-L6-v2", dtype="float32"):
+        self.model_name = model_name
+        self.path = Path(root) / re.sub(r"[^\w.-]+", "_", model_name)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self._vectors_path = self.path / "vectors.bin"
+        self._keys_path = self.path / "keys.bin"
+        self._meta_path = self.path / "meta.json"
+
+        self.dim = None
+        self.dtype = np.dtype(dtype)
+        if self._meta_path.exists():
+            meta = json.loads(self._meta_path.read_text())
+            if meta["model_name"] != model_name:
+                raise ValueError(f"{self.path} holds embeddings for '{meta['model_name']}', not '{model_name}'.")
+            self.dim = meta["dim"]
+            self.dtype = np.dtype(meta["dtype"])
+
+        self._model = None
+        self._load_keys()
+
+    def __len__(self):
+        return len(self._keys)
+
+    # ---- Index ------------------------------------------------------------
+
+    def _load_keys(self):
+        n_keys = self._keys_path.stat().st_size // KEY_DTYPE.itemsize if self._keys_path.exists() else 0
+        n_vectors = 0
+        if self.dim is not None and self._vectors_path.exists():
+            n_vectors = self._vectors_path.stat().st_size // (self.dim * self.dtype.itemsize)
+
+        # Vectors are written before keys, so a crash mid-append can leave extra
+        # or partial rows behind. Trust the shorter of the two files.
+        n = min(n_keys, n_vectors)
+        self._truncate(n)
+
+        keys = np.fromfile(self._keys_path, dtype=KEY_DTYPE, count=n) if n else np.empty(0, KEY_DTYPE)
+        self._keys = keys
+        self._order = np.argsort(keys, kind="stable")
+        self._sorted_keys = keys[self._order]
+
+    def _truncate(self, n):
+        row_bytes = self.dim * self.dtype.itemsize if self.dim is not None else 0
+        for path, size in ((self._keys_path, n * KEY_DTYPE.itemsize),
+                           (self._vectors_path, n * row_bytes)):
+            if path.exists() and path.stat().st_size != size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+
+    def lookup_keys(self, keys):
+        """Return the store row of each key, or -1 if it has not been stored."""
+        keys = np.asarray(keys, dtype=KEY_DTYPE)
+        if len(self._sorted_keys) == 0:
+            return np.full(len(keys), -1, dtype=np.int64)
+
+        pos = np.searchsorted(self._sorted_keys, keys)
+        pos = np.minimum(pos, len(self._sorted_keys) - 1)
+        found = self._sorted_keys[pos] == keys
+        return np.where(found, self._order[pos], -1).astype(np.int64)
+
+    def lookup(self, texts):
+        """Return the store row of each text, or -1 if it has not been encoded."""
+        return self.lookup_keys(hash_texts(texts, self.model_name))
+
+    # ---- Read -------------------------------------------------------------
+
+    def vectors(self):
+        """Read-only memory map of every stored vector, shape (len(store), dim)."""
+        if len(self) == 0:
+            return np.empty((0, self.dim or 0), dtype=self.dtype)
+        return np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(len(self), self.dim))
+
+    # ---- Write ------------------------------------------------------------
+
+    def add(self, texts, embeddings):
+        """
+        Append embeddings for texts that are not stored yet (e.g. to seed the
+        store from an existing .npz file). Returns the number of rows added.
+        """
+        embeddings = np.asarray(embeddings)
+        keys = hash_texts(texts, self.model_name)
+        if len(keys) != len(embeddings):
+            raise ValueError(f"Got {len(keys)} texts but {len(embeddings)} embeddings.")
+
+        new = self.lookup_keys(keys) == -1
+        _, first = np.unique(keys, return_index=True)
+        new_first = first[new[first]]
+        new_first.sort()
+        return self._append(keys[new_first], embeddings[new_first])
+
+    def _append(self, keys, embeddings):
+        if len(keys) == 0:
+            return 0
+
+        if self.dim is None:
+            self.dim = int(embeddings.shape[1])
+            meta = {"model_name": self.model_name, "dim": self.dim, "dtype": self.dtype.name}
+            tmp = self._meta_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(meta, indent=2))
+            os.replace(tmp, self._meta_path)
+        elif embeddings.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dim embeddings, got {embeddings.shape[1]}.")
+
+        # Append in place: vectors first, then keys (see _load_keys)
+        with open(self._vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(embeddings, dtype=self.dtype).tobytes())
+        with open(self._keys_path, "ab") as f:
+            f.write(keys.tobytes())
+
+        self._keys = np.concatenate([self._keys, keys])
+        self._order = np.argsort(self._keys, kind="stable")
+        self._sorted_keys = self._keys[self._order]
+        return len(keys)
+
+    # ---- Encode -----------------------------------------------------------
+
+    def _get_model(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def encode_missing(self, texts, model=None, batch_size=64, show_progress_bar=True):
+        """
+        Encode only the distinct texts that are not in the store yet and append
+        them. Returns the store row of every text.
+
+        Args:
+            texts: Iterable of cleaned question texts (e.g. df['Q_basic_clean']).
+            model (optional): Object with a SentenceTransformer-style .encode().
+                              Defaults to SentenceTransformer(model_name).
+        """
+        texts = list(texts)
+        keys = hash_texts(texts, self.model_name)
+        rows = self.lookup_keys(keys)
+
+        missing = np.flatnonzero(rows == -1)
+        if len(missing):
+            _, first = np.unique(keys[missing], return_index=True)
+            to_encode = np.sort(missing[first])
+            print(f"Encoding {len(to_encode):,} new texts ({len(texts) - len(missing):,} of {len(texts):,} cached)")
+
+            model = model if model is not None else self._get_model()
+            embeddings = model.encode(
+                [texts[i] for i in to_encode],
+                batch_size=batch_size,
+                show_progress_bar=show_progress_bar
+            )
+            self._append(keys[to_encode], np.asarray(embeddings))
+            rows = self.lookup_keys(keys)
+
+        return rows
+
+    def get_or_encode(self, texts, model=None, batch_size=64, show_progress_bar=True):
+        """
+        Return an in-memory (len(texts), dim) float32 array of embeddings,
+        encoding only texts that have never been seen before.
+        """
+        rows = self.encode_missing(texts, model=model, batch_size=batch_size,
+                                   show_progress_bar=show_progress_bar)
+        return np.asarray(self.vectors()[rows], dtype=np.float32)
@@ -0,0 +1,279 @@
+"""
+Per-stage instrumentation for the clustering pipeline.
+
+The pipeline modules (cleaning, clustering_analysis, processing_and_visualization)
+record their stages on the shared `tracer`:
+
+    from instrumentation import tracer, trace_run
+
+    with trace_run("../traces/maize", profile=True):   # maize.json, maize.csv, maize.prof
+        result_df, umap_embeddings, clusterer = cluster_with_umap_hdbscan(df)
+
+    tracer.to_frame()   # one row per stage
+
+Each stage records wall time, CPU time, peak RSS, bytes read and rows in/out.
+CPU time and memory are for the whole process (all threads), so they include
+the BLAS/numba threads UMAP and HDBSCAN start. Work done in child processes
+(sweep_umap_hdbscan, preprocess_series with n_jobs > 1) shows up in wall time
+only.
+"""
+import cProfile
+import csv
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+# -------------------------------------------------------------------
+# Process counters (Linux /proc; other platforms fall back to getrusage)
+# -------------------------------------------------------------------
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss():
+    """Resident set size of this process in bytes (None if unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        pass
+    try:
+        import resource
+        # Only the lifetime peak is available here (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if peak > 1 << 32 else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def bytes_read():
+    """Bytes this process has read through read()/pread() calls so far (None if unavailable)."""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+# -------------------------------------------------------------------
+# Stage tracer
+# -------------------------------------------------------------------
+
+FIELDS = [
+    "stage", "parent", "depth", "start", "wall_seconds", "cpu_seconds",
+    "peak_rss_mb", "rss_delta_mb", "bytes_read", "rows_in", "rows_out",
+]
+
+
+class StageTracer:
+    """
+    Collects one record per stage. Stages nest: a stage opened inside another
+    (in the same thread) records it as its parent, and the outer stage's
+    numbers include the inner ones. Each thread keeps its own stack of open
+    stages, so stages opened from worker threads (e.g. clean_series in
+    encode_topic_shards' cleaner threads) are recorded side by side rather
+    than inside each other.
+
+    Peak RSS is sampled by a background thread every `sample_interval`
+    seconds while any stage is open (plus at every stage start and end), so
+    short allocation spikes between samples can be missed.
+
+    Args:
+        enabled (bool): Record stages. When False, stage() only times the block
+                        (wall/CPU seconds on the yielded dict) and keeps no record.
+        verbose (bool): Print a one-line summary as each stage ends.
+        sample_interval (float): Seconds between RSS samples.
+    """
+
+    def __init__(self, enabled=True, verbose=False, sample_interval=0.05):
+        self.enabled = enabled
+        self.verbose = verbose
+        self.sample_interval = sample_interval
+        self.records = []
+        self._local = threading.local()  # .open: this thread's stack of open stages
+        self._states = []                # open stages of all threads (for the sampler)
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._stop = None
+
+    def reset(self):
+        """Drop the recorded stages and restart the clock."""
+        self.records = []
+        self._origin = time.perf_counter()
+
+    # ---- Peak memory sampling -------------------------------------------
+    def _sample(self):
+        rss = current_rss()
+        if rss is None:
+            return
+        with self._lock:
+            for state in self._states:
+                state["peak"] = max(state["peak"], rss)
+
+    def _run_sampler(self, stop):
+        while not stop.wait(self.sample_interval):
+            self._sample()
+
+    def _open_stage(self, state):
+        """Register an open stage; the first one starts the sampler thread."""
+        with self._lock:
+            self._states.append(state)
+            if self._sampler is None:
+                # Each sampler has its own stop event, so a stopping one never races a new one
+                self._stop = threading.Event()
+                self._sampler = threading.Thread(target=self._run_sampler, args=(self._stop,), daemon=True)
+                self._sampler.start()
+
+    def _close_stage(self, state):
+        """Unregister a stage; the last one stops the sampler thread."""
+        sampler = None
+        with self._lock:
+            self._states.remove(state)
+            if not self._states:
+                sampler, self._sampler = self._sampler, None
+                self._stop.set()
+        if sampler is not None:
+            sampler.join()  # outside the lock: the sampler takes it in _sample()
+
+    def _thread_stack(self):
+        if not hasattr(self._local, "open"):
+            self._local.open = []
+        return self._local.open
+
+    # ---- Stages -----------------------------------------------------------
+    @contextmanager
+    def stage(self, name, rows_in=None, **fields):
+        """
+        Time a block of code. Yields the stage's record (a dict), so the block
+        can fill in rows_out or extra fields:
+
+            with tracer.stage("hdbscan", rows_in=len(X)) as rec:
+                labels = clusterer.fit_predict(X)
+                rec["rows_out"] = int((labels != -1).sum())
+
+        wall_seconds etc. are filled in when the block exits (also on error).
+        """
+        record = {"stage": name, "rows_in": rows_in, "rows_out": None, **fields}
+        if not self.enabled:
+            # Callers read their own stage's times back; keep those, record nothing
+            cpu0 = time.process_time()
+            t0 = time.perf_counter()
+            try:
+                yield record
+            finally:
+                record["wall_seconds"] = time.perf_counter() - t0
+                record["cpu_seconds"] = time.process_time() - cpu0
+            return
+
+        rss = current_rss()
+        state = {"peak": rss or 0}
+        stack = self._thread_stack()
+        record["parent"] = stack[-1]["record"]["stage"] if stack else None
+        record["depth"] = len(stack)
+        state["record"] = record
+        stack.append(state)
+        self._open_stage(state)
+
+        read0 = bytes_read()
+        cpu0 = time.process_time()
+        t0 = time.perf_counter()
+        record["start"] = round(t0 - self._origin, 4)
+        try:
+            yield record
+        finally:
+            record["wall_seconds"] = time.perf_counter() - t0
+            record["cpu_seconds"] = time.process_time() - cpu0
+            read1 = bytes_read()
+            record["bytes_read"] = read1 - read0 if read0 is not None and read1 is not None else None
+
+            self._sample()
+            end_rss = current_rss()
+            stack.remove(state)
+            self._close_stage(state)
+
+            record["peak_rss_mb"] = state["peak"] / 2**20 if rss is not None else None
+            record["rss_delta_mb"] = (end_rss - rss) / 2**20 if rss is not None else None
+            with self._lock:
+                self.records.append(record)
+
+            if self.verbose:
+                self._print(record)
+
+    @staticmethod
+    def _print(record):
+        line = (f"{'  ' * record['depth']}[{record['stage']}] {record['wall_seconds']:.2f}s wall, "
+                f"{record['cpu_seconds']:.2f}s cpu")
+        if record["peak_rss_mb"] is not None:
+            line += f", peak {record['peak_rss_mb']:,.0f} MB"
+        if record["rows_in"] is not None:
+            line += f", {record['rows_in']:,} rows in"
+        if record["rows_out"] is not None:
+            line += f", {record['rows_out']:,} rows out"
+        print(line)
+
+    # ---- Output ---------------------------------------------------------
+    def to_frame(self):
+        """Recorded stages as a DataFrame, in start order."""
+        df = pd.DataFrame(self.records)
+        if df.empty:
+            return pd.DataFrame(columns=FIELDS)
+        extra = [c for c in df.columns if c not in FIELDS]
+        return df[FIELDS + extra].sort_values("start", kind="stable").reset_index(drop=True)
+
+    def write_json(self, path):
+        records = sorted(self.records, key=lambda r: r["start"])
+        Path(path).write_text(json.dumps(records, indent=2, default=str))
+
+    def write_csv(self, path):
+        records = sorted(self.records, key=lambda r: r["start"])
+        columns = FIELDS + [c for c in dict.fromkeys(k for r in records for k in r) if c not in FIELDS]
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(records)
+
+    @contextmanager
+    def profile(self, path):
+        """Run the block under cProfile and dump the stats to `path` (open with pstats/snakeviz)."""
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+
+
+tracer = StageTracer()
+
+
+@contextmanager
+def trace_run(path_prefix, profile=False, name="run"):
+    """
+    Reset the shared tracer, run the block as one top-level stage and write
+    {path_prefix}.json and {path_prefix}.csv (and {path_prefix}.prof if
+    profile=True). The files are written even if the block raises.
+    """
+    path_prefix = Path(path_prefix)
+    path_prefix.parent.mkdir(parents=True, exist_ok=True)
+    tracer.reset()
+
+    try:
+        if profile:
+            with tracer.profile(f"{path_prefix}.prof"), tracer.stage(name) as record:
+                yield record
+        else:
+            with tracer.stage(name) as record:
+                yield record
+    finally:
+        tracer.write_json(f"{path_prefix}.json")
+        tracer.write_csv(f"{path_prefix}.csv")
@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+from cleaning import clean_series
+from instrumentation import tracer
+
+# -------------------------------------------------------------------
+# MinHash signatures of character shingles
+# -------------------------------------------------------------------
+
+def _mix64(x):
+    """splitmix64 finalizer: spreads packed shingle bytes over all 64 bits (wraps mod 2**64)."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _shingle_codes(texts, shingle_size):
+    """
+    Every `shingle_size`-byte window of every text, packed into one uint64
+    per window, plus the index of the first window of each text. Texts
+    shorter than a shingle are padded with spaces, so each has at least one.
+    """
+    if not 1 <= shingle_size <= 8:
+        raise ValueError("shingle_size must be between 1 and 8 bytes.")
+    encoded = [t.encode("utf-8").ljust(shingle_size) for t in texts]
+    lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+    buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+
+    # Window i starts at byte i; keep the windows that do not cross into the next text
+    n_windows = len(buffer) - shingle_size + 1
+    codes = np.zeros(n_windows, dtype=np.uint64)
+    for j in range(shingle_size):
+        codes = (codes << np.uint64(8)) | buffer[j:j + n_windows]
+    text_starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    position = np.arange(len(buffer)) - np.repeat(text_starts, lengths)
+    last_start = np.repeat(lengths - shingle_size, lengths)
+    keep = position[:n_windows] <= last_start[:n_windows]
+
+    n_per_text = lengths - shingle_size + 1
+    offsets = np.concatenate([[0], np.cumsum(n_per_text)[:-1]])
+    return codes[keep], offsets
+
+
+def minhash_signatures(texts, num_perm=64, shingle_size=4, random_state=42, chunk_size=20_000):
+    """
+    (len(texts), num_perm) uint32 MinHash signatures of the texts' byte
+    shingles. The share of equal columns between two rows estimates the
+    Jaccard similarity of their shingle sets.
+
+    Shingles are packed bytes, mixed once and then hashed with num_perm
+    random multiply-add functions (mod 2**64, top 32 bits kept), all in
+    numpy, a chunk of texts at a time.
+    """
+    rng = np.random.RandomState(random_state)
+    a = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)  # odd
+    b = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64)
+
+    texts = list(texts)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    with np.errstate(over="ignore"):
+        for start in range(0, len(texts), chunk_size):
+            codes, offsets = _shingle_codes(texts[start:start + chunk_size], shingle_size)
+            codes = _mix64(codes)
+            for p in range(num_perm):
+                h = (codes * a[p] + b[p]) >> np.uint64(32)
+                signatures[start:start + len(offsets), p] = np.minimum.reduceat(h, offsets)
+    return signatures
+
+# -------------------------------------------------------------------
+# LSH banding -> near-duplicate groups
+# -------------------------------------------------------------------
+
+def lsh_bands(num_perm, threshold):
+    """
+    (bands, rows) with bands * rows == num_perm whose LSH threshold
+    (1 / bands) ** (1 / rows) is closest to `threshold`.
+    """
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - threshold))
+
+
+def near_duplicate_groups(texts, threshold=0.8, num_perm=64, shingle_size=4, random_state=42):
+    """
+    Group texts whose estimated Jaccard similarity (of byte shingles) is at
+    least `threshold`, in time linear in the number of texts.
+
+    Identical texts are grouped first. The distinct texts are then bucketed
+    by LSH bands of their MinHash signatures. Each text in a bucket is
+    compared with the bucket's first text, and the pair is kept if their
+    signatures agree on at least `threshold` of their columns. Groups are
+    the connected components of the kept pairs, so a group can chain texts
+    that are each close to a neighbour but not to every member.
+
+    Args:
+        texts: Cleaned texts (e.g. clean_series(..., mode="full")).
+        threshold (float): Minimum estimated Jaccard similarity.
+        num_perm (int): MinHash functions per text.
+        shingle_size (int): Shingle length in bytes (1-8).
+
+    Returns:
+        np.ndarray of group ids (0..n_groups-1), one per text, numbered in
+        order of each group's first text.
+    """
+    texts = pd.Series(texts, dtype=object).fillna("")
+    codes, uniques = pd.factorize(texts)
+
+    with tracer.stage("minhash", rows_in=len(uniques), num_perm=num_perm) as rec:
+        signatures = minhash_signatures(uniques, num_perm, shingle_size, random_state)
+        rec["rows_out"] = len(signatures)
+
+    bands, rows = lsh_bands(num_perm, threshold)
+    n = len(uniques)
+    pairs_i, pairs_j = [], []
+    with tracer.stage("lsh", rows_in=n, bands=bands, rows=rows) as rec:
+        empty = np.asarray([len(t.strip()) == 0 for t in uniques], dtype=bool)
+        for band in range(bands):
+            # One key per band (collisions only add candidates, which are checked below)
+            key = np.zeros(n, dtype=np.uint64)
+            with np.errstate(over="ignore"):
+                for col in range(band * rows, (band + 1) * rows):
+                    key = _mix64(key ^ signatures[:, col].astype(np.uint64))
+            _, first, bucket = np.unique(key, return_index=True, return_inverse=True)
+            head = first[bucket]
+            candidates = np.flatnonzero((head != np.arange(n)) & ~empty & ~empty[head])
+            similarity = (signatures[candidates] == signatures[head[candidates]]).mean(axis=1)
+            keep = candidates[similarity >= threshold]
+            pairs_i.append(keep)
+            pairs_j.append(head[keep])
+        pairs_i = np.concatenate(pairs_i)
+        pairs_j = np.concatenate(pairs_j)
+        rec["rows_out"] = len(pairs_i)
+
+    graph = sp.coo_matrix((np.ones(len(pairs_i), dtype=np.int8), (pairs_i, pairs_j)), shape=(n, n))
+    _, unique_groups = connected_components(graph, directed=False)
+
+    # Renumber groups by their first text
+    groups = unique_groups[codes]
+    _, first_row, groups = np.unique(groups, return_index=True, return_inverse=True)
+    order = np.argsort(np.argsort(first_row, kind="stable"), kind="stable")
+    return order[groups]
+
+# -------------------------------------------------------------------
+# Collapse to one representative per group, expand labels back
+# -------------------------------------------------------------------
+
+def collapse_near_duplicates(df, text_col='question_content', threshold=0.8, num_perm=64, shingle_size=4,
+                             random_state=42):
+    """
+    Keep one row per group of near-duplicate questions, so each group is
+    embedded and clustered once.
+
+    Texts are cleaned with clean_text (clean_series mode="full") before
+    hashing, so prefixes, Q-number references and OptOut tails do not keep
+    repeats apart; typos are absorbed by the shingle overlap. The
+    representative of a group is its most common cleaned text (first row
+    on ties).
+
+    Returns:
+        representatives: the representative rows of df, in group order, with
+                         'dup_group' and 'dup_count' (rows in the group) columns
+        groups: np.ndarray, the group of every row of df (an index into
+                representatives); see expand_labels
+    """
+    with tracer.stage("collapse_near_duplicates", rows_in=len(df)) as rec:
+        cleaned = clean_series(df[text_col], mode="full")
+        groups = near_duplicate_groups(cleaned.to_numpy(), threshold, num_perm, shingle_size, random_state)
+
+        # Most common cleaned text of each group, then its first row
+        rows = pd.DataFrame({"group": groups, "text": pd.factorize(cleaned)[0], "row": np.arange(len(groups))})
+        rows["n"] = rows.groupby(["group", "text"])["row"].transform("size")
+        rep_rows = (rows.sort_values(["group", "n", "row"], ascending=[True, False, True])
+                    .drop_duplicates("group")["row"].to_numpy())
+
+        representatives = df.iloc[rep_rows].copy()
+        representatives["dup_group"] = np.arange(len(rep_rows))
+        representatives["dup_count"] = np.bincount(groups, minlength=len(rep_rows))
+        rec["rows_out"] = len(representatives)
+
+    print(f"Collapsed {len(df):,} questions into {len(representatives):,} groups "
+          f"({1 - len(representatives) / max(len(df), 1):.1%} fewer rows to embed and cluster)")
+    return representatives, groups
+
+
+def expand_labels(groups, representative_labels):
+    """Labels for every original row, from one label per group (e.g. the clustered representatives)."""
+    return np.asarray(representative_labels)[groups]
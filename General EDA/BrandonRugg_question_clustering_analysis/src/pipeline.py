@@ -0,0 +1,584 @@
+"""
+Cluster the questions of many topics in one unattended, restartable run.
+
+Usage (from src/):
+    python pipeline.py ../data/full.parquet ../data/pipeline --topics chicken,maize,unlabeled
+    python pipeline.py ../data/full.parquet ../data/pipeline --topics all --min-questions 1000 \\
+        --max-memory-gb 48 --cores 16
+    python pipeline.py ../data/full.parquet ../data/pipeline --config params.json --force cluster
+
+Every topic runs through the same stages as the clustering notebooks:
+
+    load        distinct questions of the topic/language (DuckDB)
+    clean       clean_series(mode="minimal"), i.e. minimal_clean
+    dedup       collapse_near_duplicates: one representative per group of near-duplicates
+    embed       SentenceTransformer embeddings of the representatives (optionally
+                cached in an EmbeddingStore)
+    cluster     cluster_with_umap_hdbscan on the representatives
+    recluster   recluster_noise, merged back into the cluster labels
+    summarize   summarize_clusters over every question (the topic name is an extra stop word)
+    project_2d  umap_2d_projection for the plots
+    save        save_question_clusters -> OUT_DIR/clusters/question_clusters_{topic}.parquet,
+                every question with its representative's cluster and coordinates
+
+Each stage's fingerprint is a hash of its parameters and the fingerprints of
+the stages it reads, starting from the source file's size and modification
+time. Outputs are saved in an ArtifactStore per topic (OUT_DIR/topics/{topic}),
+so a re-run skips every stage whose outputs are up to date. It only recomputes
+what changed parameters (see --config) or a failure left unfinished.
+
+Topics run concurrently, each in its own process with BLAS/numba threads
+capped at its core share. The scheduler starts the largest topics first and
+only starts a topic while the memory estimates (--kb-per-question per
+question) and cores of the running topics stay within --max-memory-gb and
+--cores. Topics start strictly in that order: when the next topic does not
+fit yet, smaller ones wait behind it rather than take its place. A topic
+too large for the memory cap runs alone. Logs go to
+OUT_DIR/logs/{topic}.log, stage traces to OUT_DIR/traces/{topic}.json/.csv,
+and the outcome of every topic to OUT_DIR/pipeline_status.json.
+"""
+import argparse
+import copy
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from artifact_store import ArtifactStore, fingerprint
+from instrumentation import trace_run
+from processing_and_visualization import _full_dataset_reader
+
+# -------------------------------------------------------------------
+# Stage parameters
+# -------------------------------------------------------------------
+
+# Bump to invalidate every saved stage after a change to the stage code
+PIPELINE_VERSION = 1
+
+UNLABELED = "unlabeled"  # topic name for questions without a question_topic
+
+DEFAULT_PARAMS = {
+    "load": {"language": "eng"},
+    "clean": {"mode": "minimal"},
+    "dedup": {"threshold": 0.8, "num_perm": 64, "shingle_size": 4},  # threshold None = no collapsing
+    "embed": {"model_name": "all-MiniLM-L6-v2", "batch_size": 64},
+    "cluster": {
+        "sample_size": None,
+        "umap_params": {"n_neighbors": 30, "n_components": 5, "metric": "cosine", "random_state": 42},
+        # min_cluster_size None = n_questions // 100, clipped to [25, 250]
+        "hdbscan_params": {"min_cluster_size": None, "min_samples": 10, "metric": "euclidean",
+                           "cluster_selection_method": "eom"},
+    },
+    "recluster": {"hdbscan_params": None},  # None = recluster_noise's defaults
+    "summarize": {"top_n_words": 5, "sample_questions": 5, "extra_stop_words": []},
+    "project_2d": {"n_neighbors": 50, "min_dist": 0.1, "metric": "cosine", "random_state": 42},
+    "save": {},
+}
+
+
+def load_params(config_path=None):
+    """DEFAULT_PARAMS updated (per stage, one level deep) from a JSON config file."""
+    params = copy.deepcopy(DEFAULT_PARAMS)
+    if config_path is not None:
+        overrides = json.loads(Path(config_path).read_text())
+        unknown = set(overrides) - set(params)
+        if unknown:
+            raise ValueError(f"Unknown stages in {config_path}: {sorted(unknown)}")
+        for stage, values in overrides.items():
+            params[stage].update(values)
+    return params
+
+
+def topic_dirname(topic):
+    return re.sub(r"[^\w.-]+", "_", topic)
+
+# -------------------------------------------------------------------
+# Stages
+# -------------------------------------------------------------------
+
+def _load(run, params):
+    reader, path = _full_dataset_reader(run.source)
+    # Same trimmed topic as count_topic_questions, so every counted row is loaded
+    topic = "NULLIF(TRIM(question_topic), '')"
+    topic_filter = f"{topic} IS NULL" if run.topic == UNLABELED else f"{topic} = ?"
+    query = f"""
+        SELECT DISTINCT ON (question_id) question_id, question_content
+        FROM (
+            SELECT TRY_CAST(question_id AS BIGINT) AS question_id, question_content
+            FROM {reader}
+            WHERE question_language = ?
+              AND {topic_filter}
+              AND question_content IS NOT NULL
+        )
+        WHERE question_id IS NOT NULL
+        ORDER BY question_id, question_content
+    """
+    args = [path, params["language"]] + ([] if run.topic == UNLABELED else [run.topic])
+    with duckdb.connect() as con:
+        questions = con.execute(query, args).fetch_df()
+    return {"questions": questions}
+
+
+def _clean(run, params):
+    from cleaning import clean_series
+
+    questions = run.output("load", "questions")
+    cleaned = pd.DataFrame({
+        "question_id": questions["question_id"],
+        "Q_basic_clean": clean_series(questions["question_content"], mode=params["mode"]),
+    })
+    return {"questions": cleaned}
+
+
+def _dedup(run, params):
+    from near_duplicates import collapse_near_duplicates
+
+    questions = run.output("load", "questions")
+    if params["threshold"] is None:
+        groups = np.arange(len(questions))
+        representatives = questions.assign(dup_count=1)
+    else:
+        representatives, groups = collapse_near_duplicates(
+            questions, "question_content", threshold=params["threshold"],
+            num_perm=params["num_perm"], shingle_size=params["shingle_size"])
+    return {
+        "groups": pd.DataFrame({"question_id": questions["question_id"], "group": groups}),
+        # Group g is row g: its question row, question_id and number of questions
+        "representatives": pd.DataFrame({
+            "row": representatives.index.to_numpy(),
+            "question_id": representatives["question_id"].to_numpy(),
+            "dup_count": representatives["dup_count"].to_numpy(),
+        }),
+    }
+
+
+def _expand(run, labels):
+    """
+    Every question of the topic with its group's cluster, and the position of
+    the group in `labels` (-1 for groups left out by sampling, which are dropped).
+    """
+    groups = run.output("dedup", "groups")
+    position = np.full(len(run.output("dedup", "representatives")), -1)
+    position[labels["row_id"].to_numpy()] = np.arange(len(labels))
+    expanded = groups.assign(position=position[groups["group"].to_numpy()])
+    expanded = expanded[expanded["position"] >= 0]
+    expanded["cluster"] = labels["cluster"].to_numpy()[expanded["position"].to_numpy()]
+    return expanded
+
+
+def _embed(run, params):
+    rows = run.output("dedup", "representatives")["row"].to_numpy()
+    texts = run.output("clean", "questions")["Q_basic_clean"].to_numpy()[rows].tolist()
+
+    if run.embedding_cache is None:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(params["model_name"])
+        embeddings = model.encode(texts, batch_size=params["batch_size"], show_progress_bar=False)
+        return {"embeddings": np.asarray(embeddings, dtype=np.float32)}
+
+    # The store's files are append-only and shared by every topic: one writer at a time
+    import fcntl
+    from embedding_store import EmbeddingStore
+
+    cache = Path(run.embedding_cache)
+    cache.mkdir(parents=True, exist_ok=True)
+    with open(cache / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        store = EmbeddingStore(cache, params["model_name"])
+        embeddings = store.get_or_encode(texts, batch_size=params["batch_size"], show_progress_bar=False)
+    return {"embeddings": embeddings}
+
+
+def _cluster(run, params):
+    from clustering_analysis import cluster_with_umap_hdbscan
+
+    embeddings = run.output("embed", "embeddings")
+    hdbscan_params = dict(params["hdbscan_params"])
+    if hdbscan_params.get("min_cluster_size") is None:
+        hdbscan_params["min_cluster_size"] = min(250, max(25, len(embeddings) // 100))
+
+    result_df, umap_embeddings, _ = cluster_with_umap_hdbscan(
+        None, embeddings=embeddings, sample_size=params["sample_size"],
+        umap_params=params["umap_params"], hdbscan_params=hdbscan_params)
+
+    # One row per clustered representative; row_id is its group
+    representatives = run.output("dedup", "representatives")
+    row_ids = result_df["row_id"].to_numpy()
+    labels = pd.DataFrame({
+        "row_id": row_ids,
+        "question_id": representatives["question_id"].to_numpy()[row_ids],
+        "dup_count": representatives["dup_count"].to_numpy()[row_ids],
+        "cluster": result_df["cluster"].to_numpy(),
+    })
+    return {"labels": labels, "umap_embeddings": np.asarray(umap_embeddings, dtype=np.float32)}
+
+
+def _recluster(run, params):
+    from clustering_analysis import recluster_noise
+
+    labels = run.output("cluster", "labels").copy()
+    cluster = labels["cluster"].to_numpy().copy()
+    n_noise = int((cluster == -1).sum())
+
+    min_size = (params["hdbscan_params"] or {}).get("min_cluster_size", 50)
+    if n_noise < 2 * min_size:
+        print(f"Skipping recluster_noise: only {n_noise} noise points")
+    else:
+        umap_embeddings = np.asarray(run.output("cluster", "umap_embeddings"))
+        noise_labels, _ = recluster_noise(umap_embeddings, cluster, hdbscan_params=params["hdbscan_params"])
+        cluster[cluster == -1] = noise_labels
+    labels["cluster"] = cluster
+    return {"labels": labels}
+
+
+def _summarize(run, params):
+    from clustering_analysis import summarize_clusters
+
+    # Every question counts, so cluster sizes and keywords weigh repeated questions
+    expanded = _expand(run, run.output("recluster", "labels"))
+    texts = run.output("clean", "questions")["Q_basic_clean"].to_numpy()
+    df = pd.DataFrame({"Q_basic_clean": texts[expanded.index.to_numpy()], "cluster": expanded["cluster"].to_numpy()})
+    df = df[df["cluster"] != -1]
+    if df.empty:
+        return {"summary": pd.DataFrame(columns=["cluster", "size", "keywords"])}
+
+    extra_stop_words = list(params["extra_stop_words"])
+    if run.topic != UNLABELED:
+        extra_stop_words.append(run.topic.lower())
+    summary = summarize_clusters(df, top_n_words=params["top_n_words"], extra_stop_words=extra_stop_words,
+                                 sample_questions=params["sample_questions"], random_samples=True,
+                                 random_state=42)
+    return {"summary": summary}
+
+
+def _project_2d(run, params):
+    from clustering_analysis import umap_2d_projection
+
+    embeddings = run.output("embed", "embeddings")
+    row_ids = run.output("cluster", "labels")["row_id"].to_numpy()
+    X = embeddings if np.array_equal(row_ids, np.arange(len(embeddings))) else embeddings[row_ids]
+    return {"embedding_2d": np.asarray(umap_2d_projection(X, **params), dtype=np.float32)}
+
+
+def _save(run, params):
+    from processing_and_visualization import save_question_clusters
+
+    expanded = _expand(run, run.output("recluster", "labels"))
+    # Meta-clusters are assigned by hand later; until then every clustered question is in meta-cluster 0
+    df = pd.DataFrame({
+        "question_id": expanded["question_id"].to_numpy(),
+        "cluster": expanded["cluster"].to_numpy(),
+        "meta_label": np.where(expanded["cluster"].to_numpy() == -1, -1, 0),
+    })
+    embedding_2d = np.asarray(run.output("project_2d", "embedding_2d"))[expanded["position"].to_numpy()]
+    folder = Path(run.out_dir) / "clusters"
+    folder.mkdir(parents=True, exist_ok=True)
+    save_question_clusters(df, embedding_2d, run.topic_dir, folder=folder)
+    return {"cluster_file": {"path": f"clusters/question_clusters_{run.topic_dir}.parquet", "rows": len(df)}}
+
+
+# (name, stages it reads, function, names of its outputs)
+STAGES = [
+    ("load", [], _load, ["questions"]),
+    ("clean", ["load"], _clean, ["questions"]),
+    ("dedup", ["load"], _dedup, ["groups", "representatives"]),
+    ("embed", ["clean", "dedup"], _embed, ["embeddings"]),
+    ("cluster", ["embed", "dedup"], _cluster, ["labels", "umap_embeddings"]),
+    ("recluster", ["cluster"], _recluster, ["labels"]),
+    ("summarize", ["recluster", "clean", "dedup"], _summarize, ["summary"]),
+    ("project_2d", ["embed", "cluster"], _project_2d, ["embedding_2d"]),
+    ("save", ["recluster", "project_2d", "dedup"], _save, ["cluster_file"]),
+]
+STAGE_NAMES = [name for name, *_ in STAGES]
+
+# -------------------------------------------------------------------
+# One topic
+# -------------------------------------------------------------------
+
+def source_fingerprint(source):
+    """Fingerprint of the input data: size and modification time of the file (or dataset.json)."""
+    path = Path(source)
+    if path.is_dir():
+        path = path / "dataset.json"
+    stat = path.stat()
+    return fingerprint(str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+
+
+class TopicRun:
+    """
+    The stages of one topic. Stage fingerprints only depend on the
+    parameters and the source fingerprint, so which stages are up to date is
+    known before any data is loaded; outputs of earlier stages are loaded
+    from the topic's ArtifactStore when a later stage first reads them.
+    """
+
+    def __init__(self, source, out_dir, topic, params, source_fp=None, embedding_cache=None):
+        self.source = source
+        self.out_dir = Path(out_dir)
+        self.topic = topic
+        self.topic_dir = topic_dirname(topic)
+        self.params = params
+        self.embedding_cache = embedding_cache
+        self.store = ArtifactStore(self.out_dir / "topics" / self.topic_dir)
+        self._outputs = {}
+
+        source_fp = source_fp or source_fingerprint(source)
+        self.fingerprints = {}
+        for name, reads, _, _ in STAGES:
+            upstream = [self.fingerprints[r] for r in reads]
+            self.fingerprints[name] = fingerprint(PIPELINE_VERSION, name, topic, params[name],
+                                                  upstream or [source_fp])
+
+    def stage_status(self, name):
+        """'hit' if every output of the stage is saved from its current fingerprint."""
+        outputs = next(o for n, _, _, o in STAGES if n == name)
+        statuses = {self.store.status(f"{name}/{o}", self.fingerprints[name]) for o in outputs}
+        if name == "save" and statuses == {"hit"}:
+            path = self.out_dir / self.store.load("save/cluster_file")["path"]
+            return "hit" if path.exists() else "missing"
+        return statuses.pop() if len(statuses) == 1 else "stale"
+
+    def is_up_to_date(self):
+        return all(self.stage_status(name) == "hit" for name in STAGE_NAMES)
+
+    def output(self, stage, name):
+        key = f"{stage}/{name}"
+        if key not in self._outputs:
+            self._outputs[key] = self.store.load(key)
+        return self._outputs[key]
+
+    def run(self, force=()):
+        """
+        Run the stages that are not up to date (and every stage in `force`
+        plus the stages after it). Returns {stage: 'skipped' or 'ran'}.
+        """
+        forced = False
+        result = {}
+        for name, _, func, _ in STAGES:
+            forced = forced or name in force
+            if not forced and self.stage_status(name) == "hit":
+                result[name] = "skipped"
+                print(f"[{self.topic}] {name}: up to date")
+                continue
+
+            t0 = time.time()
+            outputs = func(self, self.params[name])
+            for output_name, obj in outputs.items():
+                key = f"{name}/{output_name}"
+                self.store.save(key, obj, fingerprint=self.fingerprints[name])
+                self._outputs[key] = obj
+            result[name] = "ran"
+            print(f"[{self.topic}] {name}: done in {time.time() - t0:.1f}s")
+        return result
+
+# -------------------------------------------------------------------
+# Scheduling many topics
+# -------------------------------------------------------------------
+
+def count_topic_questions(source, language="eng"):
+    """Distinct questions per topic (NULL topic -> UNLABELED), largest first."""
+    reader, path = _full_dataset_reader(source)
+    with duckdb.connect() as con:
+        counts = con.execute(f"""
+            SELECT COALESCE(NULLIF(TRIM(question_topic), ''), ?) AS topic,
+                   COUNT(DISTINCT question_id) AS n_questions
+            FROM {reader}
+            WHERE question_language = ? AND question_content IS NOT NULL
+            GROUP BY ALL
+            ORDER BY n_questions DESC, topic
+        """, [UNLABELED, path, language]).fetch_df()
+    return counts
+
+
+def estimate_resources(n_questions, kb_per_question=5.0, max_cores_per_topic=4):
+    """
+    Memory (GB) and cores to reserve for a topic. About 5 KB per question
+    covers the float32 embeddings and their copy, UMAP's kNN and fuzzy
+    graphs and HDBSCAN; small topics get one core, larger ones one more per
+    50k questions up to max_cores_per_topic.
+    """
+    memory_gb = 0.75 + n_questions * kb_per_question / 2**20
+    cores = int(min(max_cores_per_topic, max(1, n_questions // 50_000)))
+    return memory_gb, cores
+
+
+def _write_status(path, status):
+    tmp = Path(f"{path}.tmp")
+    tmp.write_text(json.dumps(status, indent=2))
+    os.replace(tmp, path)
+
+
+def _peak_rss_mb(trace_path):
+    try:
+        records = json.loads(Path(trace_path).read_text())
+        return next(r["peak_rss_mb"] for r in records if r["stage"] == "pipeline")
+    except (OSError, ValueError, StopIteration, KeyError):
+        return None
+
+
+def run_topics(source, out_dir, topics, params, config_path=None, max_memory_gb=16.0, cores=None,
+               kb_per_question=5.0, max_cores_per_topic=4, force=(), embedding_cache=None, poll_seconds=1.0):
+    """
+    Run every topic in its own worker process under the memory and core caps,
+    starting them largest first, in order (see the module docstring).
+
+    Args:
+        topics (DataFrame): 'topic' and 'n_questions' columns (count_topic_questions).
+        params (dict): Stage parameters (load_params); workers re-read them
+                       from config_path.
+        max_memory_gb (float): Cap on the summed memory estimates of running topics.
+        cores (int): Cap on the summed cores of running topics (default: all).
+        force (iterable): Stages to re-run (with everything after them) in every topic.
+
+    Returns a DataFrame with one row per topic: status ('up to date', 'done'
+    or 'failed'), return code, seconds, estimated memory and the measured
+    peak RSS.
+    """
+    out_dir = Path(out_dir)
+    for folder in ("logs", "traces"):
+        (out_dir / folder).mkdir(parents=True, exist_ok=True)
+    cores = cores or os.cpu_count() or 1
+    status_path = out_dir / "pipeline_status.json"
+    status = json.loads(status_path.read_text()) if status_path.exists() else {}
+    source_fp = source_fingerprint(source)
+
+    pending = []
+    for topic, n_questions in zip(topics["topic"], topics["n_questions"]):
+        run = TopicRun(source, out_dir, topic, params, source_fp=source_fp)
+        if not force and run.is_up_to_date():
+            status[topic] = {**status.get(topic, {}), "status": "up to date"}
+            continue
+        memory_gb, topic_cores = estimate_resources(n_questions, kb_per_question, min(max_cores_per_topic, cores))
+        pending.append({"topic": topic, "n_questions": int(n_questions),
+                        "memory_gb": memory_gb, "cores": topic_cores})
+    _write_status(status_path, status)
+    print(f"{len(topics) - len(pending)} topics up to date, {len(pending)} to run "
+          f"(max {max_memory_gb:g} GB, {cores} cores)")
+
+    pending.sort(key=lambda job: job["memory_gb"], reverse=True)
+    running = {}
+    while pending or running:
+        # Start pending topics in order while they fit; a topic over the cap runs alone.
+        # No backfilling past a topic that does not fit yet, so large topics are not left to the end.
+        used_memory = sum(job["memory_gb"] for job in running.values())
+        used_cores = sum(job["cores"] for job in running.values())
+        for job in list(pending):
+            fits = used_memory + job["memory_gb"] <= max_memory_gb and used_cores + job["cores"] <= cores
+            if not fits and running:
+                break
+            if job["memory_gb"] > max_memory_gb:
+                print(f"Warning: '{job['topic']}' needs ~{job['memory_gb']:.1f} GB, over the cap; running it alone")
+            process = _start_worker(source, out_dir, job, config_path, force, embedding_cache)
+            running[process.pid] = {**job, "process": process, "start": time.time()}
+            pending.remove(job)
+            used_memory += job["memory_gb"]
+            used_cores += job["cores"]
+            print(f"Started {job['topic']} ({job['n_questions']:,} questions, "
+                  f"~{job['memory_gb']:.1f} GB, {job['cores']} cores)")
+
+        time.sleep(poll_seconds)
+        for pid, job in list(running.items()):
+            returncode = job["process"].poll()
+            if returncode is None:
+                continue
+            del running[pid]
+            job["process"].log.close()
+            topic_dir = topic_dirname(job["topic"])
+            status[job["topic"]] = {
+                "status": "done" if returncode == 0 else "failed",
+                "returncode": returncode,
+                "seconds": round(time.time() - job["start"], 1),
+                "n_questions": job["n_questions"],
+                "memory_gb_estimate": round(job["memory_gb"], 2),
+                "peak_rss_mb": _peak_rss_mb(out_dir / "traces" / f"{topic_dir}.json"),
+                "log": f"logs/{topic_dir}.log",
+            }
+            _write_status(status_path, status)
+            print(f"{'Finished' if returncode == 0 else 'FAILED'} {job['topic']} in "
+                  f"{status[job['topic']]['seconds']:.0f}s ({len(pending)} pending, {len(running)} running)")
+
+    return pd.DataFrame([{"topic": t, **status[t]} for t in topics["topic"]])
+
+
+def _start_worker(source, out_dir, job, config_path, force, embedding_cache):
+    """Start `python pipeline.py --worker TOPIC ...` with its threads capped at the topic's cores."""
+    env = dict(os.environ)
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMBA_NUM_THREADS"):
+        env[var] = str(job["cores"])
+
+    cmd = [sys.executable, str(Path(__file__).resolve()), str(source), str(out_dir), "--worker", job["topic"]]
+    if config_path is not None:
+        cmd += ["--config", str(config_path)]
+    if force:
+        cmd += ["--force", ",".join(force)]
+    if embedding_cache is not None:
+        cmd += ["--embedding-cache", str(embedding_cache)]
+
+    log = open(Path(out_dir) / "logs" / f"{topic_dirname(job['topic'])}.log", "a")
+    log.write(f"\n==== {time.strftime('%Y-%m-%d %H:%M:%S')} {' '.join(cmd)}\n")
+    log.flush()
+    process = subprocess.Popen(cmd, env=env, stdout=log, stderr=subprocess.STDOUT,
+                               cwd=Path(__file__).resolve().parent)
+    process.log = log
+    return process
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", help="Full dataset (.parquet/.csv) or a question_dataset.py folder")
+    parser.add_argument("out_dir", help="Folder for the stage outputs, cluster files, logs and traces")
+    parser.add_argument("--topics", default="all",
+                        help=f"Comma-separated topics ('{UNLABELED}' = no topic), or 'all'")
+    parser.add_argument("--min-questions", type=int, default=1_000, help="With --topics all, skip smaller topics")
+    parser.add_argument("--config", help="JSON file of per-stage parameter overrides (see DEFAULT_PARAMS)")
+    parser.add_argument("--force", default="", help=f"Comma-separated stages to re-run, from {STAGE_NAMES}")
+    parser.add_argument("--max-memory-gb", type=float, default=16.0)
+    parser.add_argument("--cores", type=int, default=None, help="Cores for all topics together (default: all)")
+    parser.add_argument("--max-cores-per-topic", type=int, default=4)
+    parser.add_argument("--kb-per-question", type=float, default=5.0, help="Memory estimate per question")
+    parser.add_argument("--embedding-cache", help="EmbeddingStore folder shared by all topics")
+    parser.add_argument("--worker", metavar="TOPIC", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    params = load_params(args.config)
+    force = [s.strip() for s in args.force.split(",") if s.strip()]
+    unknown = set(force) - set(STAGE_NAMES)
+    if unknown:
+        parser.error(f"Unknown stages {sorted(unknown)}. Expected some of {STAGE_NAMES}.")
+
+    if args.worker is not None:
+        run = TopicRun(args.source, args.out_dir, args.worker, params, embedding_cache=args.embedding_cache)
+        with trace_run(Path(args.out_dir) / "traces" / run.topic_dir, name="pipeline"):
+            run.run(force=force)
+        return
+
+    counts = count_topic_questions(args.source, params["load"]["language"])
+    if args.topics == "all":
+        topics = counts[counts["n_questions"] >= args.min_questions]
+    else:
+        requested = [t.strip() for t in args.topics.split(",") if t.strip()]
+        missing = set(requested) - set(counts["topic"])
+        if missing:
+            print(f"No {params['load']['language']} questions for {sorted(missing)}; skipping them")
+        topics = counts[counts["topic"].isin(requested)]
+
+    result = run_topics(args.source, args.out_dir, topics, params, config_path=args.config,
+                        max_memory_gb=args.max_memory_gb, cores=args.cores,
+                        kb_per_question=args.kb_per_question, max_cores_per_topic=args.max_cores_per_topic,
+                        force=force, embedding_cache=args.embedding_cache)
+    failed = result[result["status"] == "failed"]
+    print(f"\n{(result['status'] != 'failed').sum()} topics done or up to date, {len(failed)} failed")
+    for _, row in failed.iterrows():
+        print(f"  {row['topic']}: see {Path(args.out_dir) / row['log']}")
+    sys.exit(1 if len(failed) else 0)
+
+
+if __name__ == "__main__":
+    main()
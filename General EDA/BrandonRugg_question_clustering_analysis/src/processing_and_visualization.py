@@ -1,5 +1,4 @@
 import os
-import joblib
 import pandas as pd
 import numpy as np
 import duckdb
@@ -7,41 +6,52 @@ from pathlib import Path
 import matplotlib.pyplot as plt
 import seaborn as sns
 from IPython.display import HTML
+import base64
 import io
 import sys
+
+from artifact_store import ArtifactStore, content_fingerprint, fingerprint as artifact_fingerprint, save_topic_artifacts
+from question_dataset import DATASET_READER, dataset_glob, is_question_dataset
+from instrumentation import tracer
+
 # -------------------------------------------------------------------
-# Quick save various files in data directory if they do not already exist
+# Quick save various files in data directory unless already saved unchanged
 # -------------------------------------------------------------------
-def quick_save_file(data_dir, filename, obj):
+def quick_save_file(data_dir, filename, obj, overwrite=False, compress=False):
     """
-    Save an object to the specified data directory if it does not already exist.
-    Automatically handles pandas DataFrames and NumPy arrays for optimal speed.
-    
+    Save an object to the specified data directory through its ArtifactStore.
+    pandas DataFrames are saved as .parquet, NumPy arrays as .npy (memory-mappable
+    with ArtifactStore(data_dir).load), other objects as joblib .pkl files.
+
+    The write is atomic and recorded in data_dir/artifact_manifest.json with
+    a fingerprint of the content, so a re-run skips the save only when the
+    same object was already saved, and replaces stale or broken files.
+
     Parameters:
         data_dir (str): Directory where the file should be saved.
-        filename (str): Name of the file (include extension, e.g., .pkl, .parquet, .npy).
-        obj: Object to save. If filename ends with .parquet, obj must be a pandas DataFrame.
-             If obj is a NumPy array, it will be saved as .npy for speed if possible.
+        filename (str): Name of the file; the extension is chosen from the object type.
+        obj: Object to save.
+        overwrite (bool): Save even if an identical copy (or an untracked file
+                          with this name from before the manifest) exists.
+        compress (bool): zstd-compress arrays / zlib-compress pickles.
     """
-    path = os.path.join(data_dir, filename)
-    
-    if os.path.exists(path):
-        print(f"{filename} already exists. Skipping save.")
-        return
-
-    # Handle pandas DataFrames
-    if isinstance(obj, pd.DataFrame) or filename.endswith(".parquet"):
-        obj.to_parquet(path)
-    # Handle NumPy arrays
-    elif isinstance(obj, np.ndarray):
-        # Ensure .npy extension for speed
-        if not filename.endswith(".npy"):
-            path = os.path.splitext(path)[0] + ".npy"
-        np.save(path, obj)
-    # Fallback for other objects
-    else:
-        joblib.dump(obj, path)  # turn off compression for speed
-    
+    store = ArtifactStore(data_dir)
+    name = os.path.splitext(filename)[0]
+    content = content_fingerprint(obj)
+    status = store.status(name, content)
+
+    if not overwrite:
+        if status == "hit":
+            print(f"{filename} already saved with the same content. Skipping save.")
+            return
+        if status == "missing" and os.path.exists(os.path.join(data_dir, filename)):
+            print(f"{filename} already exists (saved before the artifact manifest). "
+                  "Skipping save; pass overwrite=True to replace it.")
+            return
+    if status in ("stale", "invalid"):
+        print(f"{filename} is {status}. Saving again.")
+
+    path = store.save(name, obj, fingerprint=content, compress=compress)
     print(f"Saved {os.path.basename(path)}")
 
 
@@ -49,33 +59,55 @@ def quick_save_file(data_dir, filename, obj):
 # Save output of UMAP and HDBSCAN clustering for a set topic
 # -------------------------------------------------------------------
 
-def save_topic_files(data_dir, topic, clusterer, umap_embedding, df):
+def save_topic_files(data_dir, topic, clusterer, umap_embedding, df, reducer=None,
+                     fingerprint=None, compress=False, overwrite=False, compressor=None):
     """
-    Saves the clusterer, UMAP embedding, and clustered DataFrame for a given topic.
-    
+    Saves the clusterer, UMAP embedding, and clustered DataFrame for a given topic
+    as one version in the ArtifactStore at data_dir:
+
+        data_dir/{topic}/{fingerprint}/umap_embedding.npy   (memory-mapped on load)
+        data_dir/{topic}/{fingerprint}/clustered_df.parquet
+        data_dir/{topic}/{fingerprint}/hdbscan_model.pkl
+        data_dir/{topic}/{fingerprint}/umap_reducer.pkl
+        data_dir/{topic}/{fingerprint}/compressor.pkl       (if the UMAP was fit on compressed embeddings)
+
+    The fingerprint defaults to a hash of the clustered DataFrame and the
+    UMAP/HDBSCAN parameters, so re-running with other parameters saves a new
+    version instead of leaving the old files in place. The saved version
+    becomes the topic's latest (what TopicModel loads).
+
     Parameters:
         data_dir (str): Directory where files should be saved.
-        topic (str): Topic name used in filenames.
+        topic (str): Topic name.
         clusterer: The clustering model object to save (e.g., HDBSCAN).
-        umap_embedding: The UMAP embedding object to save.
+        umap_embedding: The UMAP embedding array to save.
         df: The clustered DataFrame to save as parquet.
+        reducer (optional): The fitted UMAP model (cluster_with_umap_hdbscan(..., return_reducer=True)).
+                            Needed to assign new questions with predict_clusters.
+        fingerprint (str, optional): Version key, e.g. artifact_store.fingerprint(embeddings, umap_params, hdbscan_params).
+        compress (bool): zstd-compress the embedding (then it is not memory-mapped) and zlib-compress the models.
+        overwrite (bool): Save again even if this version is already saved.
+        compressor (optional): The embedding compression the reducer was fit behind
+                               (cluster_with_umap_hdbscan(..., return_compressor=True)).
+
+    Returns the fingerprint.
     """
+    compression = [] if compressor is None else [
+        compressor.method, compressor.scale, compressor.offset, compressor.components]
+    fingerprint = fingerprint or artifact_fingerprint(df, clusterer, reducer, *compression)
     files_to_save = {
-        f"{topic}_hdbscan_model.pkl": clusterer,
-        f"{topic}_umap_embedding.pkl": umap_embedding,
-        f"{topic}_clustered_df.parquet": df
+        "umap_embedding": np.asarray(umap_embedding),
+        "clustered_df": df,
+        "hdbscan_model": clusterer,
     }
+    if reducer is not None:
+        files_to_save["umap_reducer"] = reducer
+    if compressor is not None:
+        files_to_save["compressor"] = compressor
 
-    for filename, obj in files_to_save.items():
-        path = os.path.join(data_dir, filename)
-        if not os.path.exists(path):
-            if filename.endswith(".parquet"):
-                obj.to_parquet(path)
-            else:
-                joblib.dump(obj, path)
-            print(f"Saved {filename}")
-        else:
-            print(f"{filename} already exists. Skipping save.")
+    save_topic_artifacts(ArtifactStore(data_dir), topic, files_to_save, fingerprint,
+                         compress=compress, overwrite=overwrite)
+    return fingerprint
 
 # -------------------------------------------------------------------
 # Save minimal question cluster data with UMAP embeddings to be reattached to full dataset
@@ -115,46 +147,122 @@ def save_question_clusters(df, embedding_2d, topic, folder='../data'):
 # -------------------------------------------------------------------
 
 
-def load_clustered_questions(full_path, cluster_path, topic):
+def _full_dataset_reader(full_path):
     """
-    Load the large WeFarm 'full dataset' (e.g. "b0cd514b-b9cc-4972-a0c2-c91726e6d825.csv", CSV or Parquet) and join it with the cluster
-    annotation file (always Parquet). Returns a Pandas DataFrame of the joined data.
+    FROM-clause reader for the full dataset and the path to bind to it. A
+    folder built by question_dataset.py is read from its questions table.
     """
+    if is_question_dataset(full_path):
+        return DATASET_READER, dataset_glob(full_path, "questions")
 
-    full_path = Path(full_path)
-    cluster_path = Path(cluster_path)
+    suffix = Path(full_path).suffix.lower()
+    if suffix in ['.csv', '.txt']:
+        return "read_csv_auto(?, HEADER=True)", Path(full_path).as_posix()
+    elif suffix in ['.parquet']:
+        return "read_parquet(?)", Path(full_path).as_posix()
+    raise ValueError(f"Unsupported full dataset file type: {suffix}")
 
-    con = duckdb.connect()
 
-    # Detect the format of the full dataset
-    if full_path.suffix.lower() in ['.csv', '.txt']:
-        full_reader = f"read_csv_auto('{full_path.as_posix()}', HEADER=True)"
-    elif full_path.suffix.lower() in ['.parquet']:
-        full_reader = f"read_parquet('{full_path.as_posix()}')"
-    else:
-        raise ValueError(f"Unsupported full dataset file type: {full_path.suffix}")
+def load_clustered_topics(full_path, cluster_paths, language='eng', con=None):
+    """
+    Load several topics' cluster files and join them with the full WeFarm
+    dataset (CSV or Parquet) in one scan of the full file.
 
-    # Build WHERE clause for topic
-    if topic is None:
-        where_clause = "WHERE f.question_topic IS NULL AND f.question_language = 'eng'"
-    else:
-        where_clause = f"WHERE f.question_topic = '{topic}' AND f.question_language = 'eng'"
+    Only question_id, question_content, question_topic and question_language
+    are read from the full dataset. Repeated rows (one per response) are
+    removed in SQL with DISTINCT ON before the join, and the joined result
+    comes back as a single Arrow table sorted by topic, which is sliced into
+    one DataFrame per topic.
 
-    # Cluster labels are always Parquet
-    cluster_reader = f"read_parquet('{cluster_path.as_posix()}')"
+    Parameters:
+        full_path (str): Full dataset (.csv/.txt or .parquet), or a folder built
+                         with question_dataset.py (only the matching
+                         language/topic partitions are read; question_id is BIGINT).
+        cluster_paths (dict): {topic: cluster parquet path}, e.g. the
+                              question_clusters_{topic}.parquet files written by
+                              save_question_clusters. Use None for unlabeled questions.
+        language (str): question_language to keep.
+        con (duckdb connection, optional): Connection to reuse. A new one is
+                                           opened (and closed) if omitted.
+
+    Returns a dict {topic: DataFrame} with question_id, question_content,
+    cluster, meta_label, umap_x and umap_y, in the order of cluster_paths.
+    """
+    topics = list(cluster_paths)
+    if not topics:
+        return {}
+    full_reader, full_param = _full_dataset_reader(full_path)
+
+    # One branch per cluster file, tagged with its position and topic
+    cluster_union = "\n        UNION ALL\n".join(
+        f"        SELECT {i} AS topic_idx, ?::VARCHAR AS topic, question_id, cluster, meta_label, umap_x, umap_y\n"
+        f"        FROM read_parquet(?)"
+        for i in range(len(topics))
+    )
+    # Topic filter on the bare column, so parquet/partition pruning applies
+    named_topics = [t for t in topics if t is not None]
+    topic_filters = []
+    if named_topics:
+        topic_filters.append(f"question_topic IN ({', '.join('?' * len(named_topics))})")
+    if None in cluster_paths:
+        topic_filters.append("question_topic IS NULL")
 
     query = f"""
-    SELECT f.question_id, f.question_content, c.cluster, c.meta_label, c.umap_x, c.umap_y
-    FROM {full_reader} AS f
-    RIGHT JOIN {cluster_reader} AS c
-    ON f.question_id = c.question_id
-    {where_clause}
+    WITH clusters AS (
+{cluster_union}
+    ),
+    questions AS (
+        SELECT DISTINCT ON (question_topic, question_id)
+            question_id, question_content, question_topic
+        FROM {full_reader}
+        WHERE question_language = ?
+          AND ({' OR '.join(topic_filters)})
+    )
+    SELECT c.topic_idx, f.question_id, f.question_content, c.cluster, c.meta_label, c.umap_x, c.umap_y
+    FROM questions AS f
+    JOIN clusters AS c
+      ON f.question_id = c.question_id
+     AND f.question_topic IS NOT DISTINCT FROM c.topic
+    ORDER BY c.topic_idx, c.question_id
     """
 
-    df = con.execute(query).df()
-    df = df.drop_duplicates(subset='question_id', keep='first')
+    params = []
+    for topic in topics:
+        params += [topic, Path(cluster_paths[topic]).as_posix()]
+    params += [full_param, language, *named_topics]
+
+    own_con = con is None
+    con = con or duckdb.connect()
+    try:
+        with tracer.stage("load_clustered_topics_query", n_topics=len(topics)) as rec:
+            table = con.execute(query, params).fetch_arrow_table()
+            rec["rows_out"] = table.num_rows
+    finally:
+        if own_con:
+            con.close()
+
+    # Rows are sorted by topic_idx, so each topic is a contiguous slice
+    counts = np.bincount(table.column('topic_idx').to_numpy(), minlength=len(topics))
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    table = table.drop_columns(['topic_idx'])
+
+    with tracer.stage("load_clustered_topics_to_pandas", rows_in=table.num_rows) as rec:
+        frames = {
+            topic: table.slice(offsets[i], counts[i]).to_pandas()
+            for i, topic in enumerate(topics)
+        }
+        rec["rows_out"] = table.num_rows
+    return frames
+
+
+def load_clustered_questions(full_path, cluster_path, topic, con=None):
+    """
+    Load the large WeFarm 'full dataset' (e.g. "b0cd514b-b9cc-4972-a0c2-c91726e6d825.csv", CSV or Parquet) and join it with the cluster
+    annotation file (always Parquet). Returns a Pandas DataFrame of the joined data.
 
-    return df
+    To load several topics, use load_clustered_topics so the full dataset is scanned once.
+    """
+    return load_clustered_topics(full_path, {topic: cluster_path}, con=con)[topic]
 
 # -------------------------------------------------------------------
 # Plot metacluster distribution with raw counts and percentages
@@ -222,6 +330,20 @@ def plot_metacluster_distribution(df, label_col='meta_label_titles', noise_col='
 import pandas as pd
 import plotly.express as px
 
+def _meta_color_map(ordered_labels, noise_val=-1, noise_color='lightgray'):
+    """Plotly qualitative colors in label order, with the noise label in noise_color."""
+    qual_colors = px.colors.qualitative.Plotly
+    color_map = {}
+    i = 0
+    for label in ordered_labels:
+        if label == noise_val:
+            color_map[label] = noise_color
+        else:
+            color_map[label] = qual_colors[i % len(qual_colors)]
+            i += 1
+    return color_map
+
+
 def plot_umap_centroids(df, cluster_col='cluster', meta_col='meta_label', title_col='meta_label_titles',
                          umap_x_col='umap_x', umap_y_col='umap_y', 
                          size_scale=2.0, size_max=120, title="Centroid Map of Clusters in 2D UMAP Space",
@@ -263,15 +385,7 @@ def plot_umap_centroids(df, cluster_col='cluster', meta_col='meta_label', title_
     centroids[meta_col] = centroids[meta_col].cat.set_categories(ordered_labels, ordered=True)
 
     # Color map
-    qual_colors = px.colors.qualitative.Plotly
-    color_map = {}
-    i = 0
-    for label in ordered_labels:
-        if label == noise_val:
-            color_map[label] = noise_color
-        else:
-            color_map[label] = qual_colors[i % len(qual_colors)]
-            i += 1
+    color_map = _meta_color_map(ordered_labels, noise_val, noise_color)
 
     # Legend labels: just human-readable titles
     centroids['legend_title'] = centroids[title_col]
@@ -331,6 +445,201 @@ def plot_umap_centroids(df, cluster_col='cluster', meta_col='meta_label', title_
     fig.show()
 
 
+# -------------------------------------------------------------------
+#  Binned density map of every question in 2D UMAP space
+# -------------------------------------------------------------------
+
+def _padded_range(lo, hi):
+    pad = (hi - lo) * 0.01 or 0.5
+    return [float(lo) - pad, float(hi) + pad]
+
+
+def bin_umap_density(source, group_col='meta_label', umap_x_col='umap_x', umap_y_col='umap_y',
+                     bins=600, x_range=None, y_range=None, con=None):
+    """
+    Count questions per (group, y bin, x bin) on a bins x bins grid.
+
+    A DataFrame is binned with numpy. A parquet path (or list of paths, e.g.
+    the question_clusters_{topic}.parquet files) is binned in DuckDB, so only
+    the grid comes back to Python, whatever the number of points. Passing
+    x_range/y_range bins just that window at full grid resolution (zooming in).
+
+    Returns:
+        counts: (n_groups, bins, bins) int64 array, rows = y bins (lowest y first)
+        groups: group values, in sorted order (matching counts)
+        x_edges, y_edges: bin edges (bins + 1 each)
+    """
+    if isinstance(source, pd.DataFrame):
+        x = source[umap_x_col].to_numpy(dtype=np.float64)
+        y = source[umap_y_col].to_numpy(dtype=np.float64)
+        x_range = x_range or _padded_range(x.min(), x.max())
+        y_range = y_range or _padded_range(y.min(), y.max())
+
+        inside = (x >= x_range[0]) & (x < x_range[1]) & (y >= y_range[0]) & (y < y_range[1])
+        codes, groups = pd.factorize(source[group_col], sort=True)
+        bx = ((x[inside] - x_range[0]) / (x_range[1] - x_range[0]) * bins).astype(np.int64)
+        by = ((y[inside] - y_range[0]) / (y_range[1] - y_range[0]) * bins).astype(np.int64)
+        flat = (codes[inside] * bins + np.minimum(by, bins - 1)) * bins + np.minimum(bx, bins - 1)
+        counts = np.bincount(flat, minlength=len(groups) * bins * bins).reshape(len(groups), bins, bins)
+        groups = np.asarray(groups)
+    else:
+        paths = [Path(p).as_posix() for p in ([source] if isinstance(source, (str, Path)) else source)]
+        own_con = con is None
+        con = con or duckdb.connect()
+        try:
+            if x_range is None or y_range is None:
+                x0, x1, y0, y1 = con.execute(
+                    f"SELECT MIN({umap_x_col}), MAX({umap_x_col}), MIN({umap_y_col}), MAX({umap_y_col}) "
+                    f"FROM read_parquet(?)", [paths]
+                ).fetchone()
+                x_range = x_range or _padded_range(x0, x1)
+                y_range = y_range or _padded_range(y0, y1)
+
+            binned = con.execute(f"""
+                SELECT {group_col} AS grp,
+                       LEAST(CAST(FLOOR(({umap_y_col} - $y0) / $dy) AS INTEGER), $last) AS by,
+                       LEAST(CAST(FLOOR(({umap_x_col} - $x0) / $dx) AS INTEGER), $last) AS bx,
+                       COUNT(*) AS n
+                FROM read_parquet($paths)
+                WHERE {umap_x_col} >= $x0 AND {umap_x_col} < $x1
+                  AND {umap_y_col} >= $y0 AND {umap_y_col} < $y1
+                GROUP BY ALL
+            """, {
+                "paths": paths, "last": bins - 1,
+                "x0": x_range[0], "x1": x_range[1], "dx": (x_range[1] - x_range[0]) / bins,
+                "y0": y_range[0], "y1": y_range[1], "dy": (y_range[1] - y_range[0]) / bins,
+            }).df()
+        finally:
+            if own_con:
+                con.close()
+
+        codes, groups = pd.factorize(binned["grp"], sort=True)
+        counts = np.zeros((len(groups), bins, bins), dtype=np.int64)
+        counts[codes, binned["by"].to_numpy(), binned["bx"].to_numpy()] = binned["n"].to_numpy()
+        groups = np.asarray(groups)
+
+    x_edges = np.linspace(x_range[0], x_range[1], bins + 1)
+    y_edges = np.linspace(y_range[0], y_range[1], bins + 1)
+    return counts, groups, x_edges, y_edges
+
+
+def density_image(counts, colors, background=(255, 255, 255)):
+    """
+    Blend per-group counts into one RGB image: each pixel takes the
+    count-weighted mix of its groups' colors, and its opacity over the
+    background grows with log(total count).
+
+    Parameters:
+        counts: (n_groups, ny, nx) array from bin_umap_density
+        colors: one color per group (hex or CSS name)
+    Returns a (ny, nx, 3) uint8 array (row 0 = lowest y bin).
+    """
+    from matplotlib.colors import to_rgb
+
+    rgb = np.array([to_rgb(c) for c in colors]) * 255
+    total = counts.sum(axis=0)
+    mixed = np.einsum('gyx,gc->yxc', counts, rgb) / np.maximum(total, 1)[..., None]
+
+    alpha = np.log1p(total) / np.log1p(total.max() or 1)
+    alpha = np.where(total > 0, 0.25 + 0.75 * alpha, 0)[..., None]
+    image = alpha * mixed + (1 - alpha) * np.asarray(background, dtype=np.float64)
+    return np.clip(np.rint(image), 0, 255).astype(np.uint8)
+
+
+def plot_umap_density(source, group_col='meta_label', title_col='meta_label_titles', meta_titles=None,
+                      umap_x_col='umap_x', umap_y_col='umap_y', bins=600, x_range=None, y_range=None,
+                      title="Question Density in 2D UMAP Space", noise_val=-1, noise_color='lightgray',
+                      interactive=False, con=None):
+    """
+    Plot every question in 2D UMAP space as a binned density image, colored
+    by meta-cluster (same colors as plot_umap_centroids). The browser only
+    receives one bins x bins image, so the cost does not depend on the number
+    of questions; a DataFrame of ~1M rows or the parquet cluster files can be
+    passed directly.
+
+    To look closer, pass x_range/y_range: the window is re-binned at full
+    resolution. With interactive=True (needs ipywidgets/anywidget in Jupyter)
+    a FigureWidget is returned that re-bins whenever you zoom or pan.
+
+    Parameters:
+        source: DataFrame or parquet path(s) with UMAP coordinates and group_col.
+        group_col (str): Column to color by (e.g. 'meta_label' or 'cluster').
+        title_col (str): Column with readable titles for the legend (DataFrame only).
+        meta_titles (dict, optional): {group value: title}, e.g. for parquet input.
+        bins (int): Grid size along each axis.
+        x_range, y_range (list, optional): [min, max] window to bin.
+        noise_val: Value representing noise; drawn in noise_color.
+    """
+    import plotly.graph_objects as go
+
+    counts, groups, x_edges, y_edges = bin_umap_density(
+        source, group_col, umap_x_col, umap_y_col, bins=bins, x_range=x_range, y_range=y_range, con=con)
+    color_map = _meta_color_map(list(groups), noise_val, noise_color)
+    colors = [color_map[g] for g in groups]
+
+    # Legend titles: explicit mapping, else the DataFrame's title column
+    titles = dict(meta_titles or {})
+    if isinstance(source, pd.DataFrame) and title_col in source.columns and not titles:
+        titles = source.drop_duplicates(group_col).set_index(group_col)[title_col].to_dict()
+
+    def image_trace(counts, x_edges, y_edges):
+        # Sent as a PNG data URI: a few hundred KB instead of a nested list of pixels
+        buffer = io.BytesIO()
+        plt.imsave(buffer, density_image(counts, colors), format='png')
+        source = "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+        dx, dy = x_edges[1] - x_edges[0], y_edges[1] - y_edges[0]
+        return go.Image(source=source, x0=x_edges[0] + dx / 2, dx=dx,
+                        y0=y_edges[0] + dy / 2, dy=dy, hoverinfo='skip')
+
+    fig = go.Figure(image_trace(counts, x_edges, y_edges))
+
+    # One empty marker trace per group, so the image gets a legend
+    for g, color, group_counts in zip(groups, colors, counts):
+        n = int(group_counts.sum())
+        fig.add_trace(go.Scatter(x=[None], y=[None], mode='markers', marker=dict(color=color, size=10),
+                                 name=f"{titles.get(g, g)} ({n:,})"))
+
+    fig.update_layout(
+        title=f"<b>{title}</b>",
+        width=800,
+        height=800,
+        legend_title="Meta-Cluster",
+        plot_bgcolor='white',
+        xaxis=dict(range=[x_edges[0], x_edges[-1]], showgrid=False, title=umap_x_col),
+        yaxis=dict(range=[y_edges[0], y_edges[-1]], autorange=False, showgrid=False, title=umap_y_col,
+                   scaleanchor="x", scaleratio=1),
+        legend=dict(yanchor="top", y=1, xanchor="left", x=1.02)
+    )
+
+    if not interactive:
+        fig.show()
+        return fig
+
+    widget = go.FigureWidget(fig)
+
+    def rebin(layout, x_window, y_window):
+        counts, window_groups, x_edges, y_edges = bin_umap_density(
+            source, group_col, umap_x_col, umap_y_col, bins=bins,
+            x_range=list(x_window), y_range=list(y_window), con=con)
+        # Keep the full-view group order, so colors stay put
+        counts = _align_groups(counts, window_groups, groups)
+        new = image_trace(counts, x_edges, y_edges)
+        with widget.batch_update():
+            widget.data[0].update(source=new.source, x0=new.x0, dx=new.dx, y0=new.y0, dy=new.dy)
+
+    widget.layout.on_change(rebin, 'xaxis.range', 'yaxis.range')
+    return widget
+
+
+def _align_groups(counts, groups, all_groups):
+    """Reorder/zero-fill counts from a zoomed-in window to the full view's groups."""
+    aligned = np.zeros((len(all_groups),) + counts.shape[1:], dtype=counts.dtype)
+    index = {g: i for i, g in enumerate(all_groups)}
+    for i, g in enumerate(groups):
+        aligned[index[g]] = counts[i]
+    return aligned
+
+
 # -------------------------------------------------------------------
 #  Wrapper function to make scrollable output display on GitHub
 # -------------------------------------------------------------------
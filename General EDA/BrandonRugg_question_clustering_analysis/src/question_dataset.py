@@ -0,0 +1,216 @@
+"""
+Build a typed, partitioned copy of the WeFarm dataset.
+
+Usage:
+    python question_dataset.py SOURCE OUT_DIR              # SOURCE = raw .csv or converted .parquet
+    python question_dataset.py SOURCE OUT_DIR --overwrite
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import duckdb
+
+# -------------------------------------------------------------------
+# Column types for the raw (all-VARCHAR) export
+# -------------------------------------------------------------------
+
+# Everything not listed stays VARCHAR. TRY_CAST turns malformed values into NULL
+# instead of failing the build (the raw CSV already needed ignore_errors).
+COLUMN_TYPES = {
+    "question_id": "BIGINT",
+    "question_user_id": "BIGINT",
+    "question_sent": "TIMESTAMPTZ",
+    "question_user_dob": "DATE",
+    "question_user_created_at": "TIMESTAMPTZ",
+    "response_id": "BIGINT",
+    "response_user_id": "BIGINT",
+    "response_sent": "TIMESTAMPTZ",
+    "response_user_dob": "DATE",
+    "response_user_created_at": "TIMESTAMPTZ",
+}
+
+PARTITION_COLUMNS = ("question_language", "question_topic")
+
+QUESTION_COLUMNS = [
+    "question_id", "question_user_id", "question_content", "question_sent",
+    "question_user_type", "question_user_status", "question_user_country_code",
+    "question_user_gender", "question_user_dob", "question_user_created_at",
+]
+
+RESPONSE_COLUMNS = [
+    "question_id", "response_id", "response_user_id", "response_language",
+    "response_content", "response_topic", "response_sent",
+    "response_user_type", "response_user_status", "response_user_country_code",
+    "response_user_gender", "response_user_dob", "response_user_created_at",
+]
+
+TABLES = ("questions", "responses")
+INFO_NAME = "dataset.json"
+
+
+def _cast(column):
+    if column in COLUMN_TYPES:
+        return f"TRY_CAST({column} AS {COLUMN_TYPES[column]})"
+    return column
+
+
+def _typed(column):
+    return f"{_cast(column)} AS {column}"
+
+
+def _source_reader(source_path):
+    suffix = Path(source_path).suffix.lower()
+    if suffix in ['.csv', '.txt']:
+        # Same options parquet_conversion.ipynb uses for the raw export
+        return "read_csv_auto(?, HEADER=True, ignore_errors=true, sample_size=-1, all_varchar=true)"
+    elif suffix in ['.parquet']:
+        return "read_parquet(?)"
+    raise ValueError(f"Unsupported source file type: {suffix}")
+
+
+# -------------------------------------------------------------------
+# Read the built dataset
+# -------------------------------------------------------------------
+
+# Partition values are always strings; without hive_types a topic like "123"
+# would be auto-cast to a number
+DATASET_READER = (
+    "read_parquet(?, hive_partitioning=true, "
+    "hive_types={'question_language': VARCHAR, 'question_topic': VARCHAR})"
+)
+
+
+def is_question_dataset(path):
+    return (Path(path) / INFO_NAME).exists()
+
+
+def dataset_glob(dataset_dir, table="questions"):
+    """Glob over one table's partition files, for DATASET_READER."""
+    if table not in TABLES:
+        raise ValueError(f"Unknown table '{table}'. Expected one of {TABLES}.")
+    return (Path(dataset_dir) / table / "*" / "*" / "*.parquet").as_posix()
+
+
+# -------------------------------------------------------------------
+# Build
+# -------------------------------------------------------------------
+
+def build_question_dataset(source_path, out_dir, overwrite=False, row_group_size=100_000, con=None):
+    """
+    Write the full dataset as two Hive-partitioned parquet tables, typed and
+    sorted so that topic loads and cluster joins read only what they need:
+
+        out_dir/questions/question_language=eng/question_topic=maize/data_0.parquet
+        out_dir/responses/question_language=eng/question_topic=maize/data_0.parquet
+        out_dir/dataset.json
+
+    questions has one row per question_id within each language/topic partition
+    (a question tagged with several topics appears in each of them), with the
+    asker's columns and n_responses. responses has the distinct response rows,
+    partitioned by the language/topic of the question they answer. Files are
+    sorted by question_id (then response_id), so row-group min/max statistics
+    skip most row groups in a join against a cluster file. Empty topics are
+    stored as NULL (question_topic=__HIVE_DEFAULT_PARTITION__).
+
+    Parameters:
+        source_path (str): Raw export (.csv) or its all-VARCHAR parquet conversion.
+        out_dir (str): Folder for the dataset.
+        overwrite (bool): Rebuild if out_dir already holds a dataset.
+        row_group_size (int): Rows per parquet row group.
+        con (duckdb connection, optional): Connection to reuse.
+
+    Returns the dataset info dict (also written to dataset.json).
+    """
+    out_dir = Path(out_dir)
+    if is_question_dataset(out_dir) and not overwrite:
+        print(f"Dataset already exists at {out_dir}. Skipping build.")
+        return json.loads((out_dir / INFO_NAME).read_text())
+    out_dir.mkdir(parents=True, exist_ok=True)
+    source_path = Path(source_path).as_posix()
+
+    own_con = con is None
+    con = con or duckdb.connect()
+
+    partitions = """
+        question_language,
+        NULLIF(TRIM(question_topic), '') AS question_topic
+    """
+    question_cols = ",\n        ".join(
+        f"any_value({_cast(c)}) AS {c}" for c in QUESTION_COLUMNS[1:]
+    )
+    queries = {
+        "questions": f"""
+            SELECT
+                {_typed("question_id")},
+                {question_cols},
+                COUNT(DISTINCT response_id)::INTEGER AS n_responses,
+                {partitions}
+            FROM {_source_reader(source_path)}
+            WHERE TRY_CAST(question_id AS BIGINT) IS NOT NULL
+            GROUP BY ALL
+            ORDER BY question_language, question_topic, question_id
+        """,
+        "responses": f"""
+            SELECT DISTINCT
+                {", ".join(_typed(c) for c in RESPONSE_COLUMNS)},
+                {partitions}
+            FROM {_source_reader(source_path)}
+            WHERE TRY_CAST(question_id AS BIGINT) IS NOT NULL
+              AND response_id IS NOT NULL
+            ORDER BY question_language, question_topic, question_id, response_id
+        """,
+    }
+
+    info = {"source": source_path, "row_group_size": row_group_size,
+            "partitioned_by": list(PARTITION_COLUMNS), "tables": {}}
+    try:
+        # Partitioned writes keep the ORDER BY within each file
+        con.execute("SET preserve_insertion_order = true")
+        for table, query in queries.items():
+            t0 = time.time()
+            final = out_dir / table
+            tmp = out_dir / f"{table}.tmp"
+            shutil.rmtree(tmp, ignore_errors=True)
+
+            con.execute(f"""
+                COPY ({query}) TO '{tmp.as_posix().replace("'", "''")}'
+                (FORMAT PARQUET, PARTITION_BY ({", ".join(PARTITION_COLUMNS)}),
+                 ROW_GROUP_SIZE {int(row_group_size)}, COMPRESSION ZSTD)
+            """, [source_path])
+
+            shutil.rmtree(final, ignore_errors=True)
+            os.replace(tmp, final)
+
+            n_rows, n_partitions = con.execute(
+                f"SELECT COUNT(*), COUNT(DISTINCT (question_language, question_topic)) FROM {DATASET_READER}",
+                [dataset_glob(out_dir, table)]
+            ).fetchone()
+            info["tables"][table] = {"rows": n_rows, "partitions": n_partitions}
+            print(f"Wrote {table}: {n_rows:,} rows in {n_partitions:,} partitions ({time.time() - t0:.1f}s)")
+    finally:
+        if own_con:
+            con.close()
+
+    info["types"] = {c: COLUMN_TYPES.get(c, "VARCHAR") for c in dict.fromkeys(QUESTION_COLUMNS + RESPONSE_COLUMNS)}
+    (out_dir / INFO_NAME).write_text(json.dumps(info, indent=2))
+    return info
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", help="Raw .csv export or its .parquet conversion")
+    parser.add_argument("out_dir", help="Folder for the partitioned dataset")
+    parser.add_argument("--overwrite", action="store_true")
+    parser.add_argument("--row-group-size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    build_question_dataset(args.source, args.out_dir, overwrite=args.overwrite,
+                           row_group_size=args.row_group_size)
+
+
+if __name__ == "__main__":
+    main()